@@ -0,0 +1,589 @@
+import Circuit
+import Gate
+import KDF
+import Node
+import OT_Extension
+import Utilities
+import Vector_Evaluator
+import Wire
+import YGC
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import sys
+import threading
+import time
+
+
+"""
+Author: Chris Murphy (crm4042@g.rit.edu)
+"""
+
+# Network Information
+HOST = "127.0.0.1"
+PORT = 13024
+
+# The version of the format of the results, which changes when a measurement does
+FORMAT = 3
+SEED = 0
+
+# The synthetic circuits, with the share of each gate type of a mix
+SIZES = [1024, 4096, 16384]
+QUICK_SIZES = [256, 1024]
+MIXES = {"xor_heavy": {Circuit.XOR_GATE: .7, Circuit.AND_GATE: .25, Circuit.INV_GATE: .05},
+         "and_heavy": {Circuit.XOR_GATE: .25, Circuit.AND_GATE: .7, Circuit.INV_GATE: .05}}
+INPUT_BITS = 64
+OUTPUT_BITS = 32
+
+# The amount of work behind each measurement, each of which is the best of REPEATS runs
+REPEATS = 3
+GATES = 2000
+HASHES = 100000
+KDF_ROWS = 100000
+BASE_OTS = 16
+EC_OTS = 128
+EXTENDED_OTS = 4096
+NODE_BYTES = 1 << 24
+MESSAGE_SIZES = [1 << 10, 1 << 16, 1 << 20]
+INSTANCES = {"adder": 64, "comparator": 64}
+SYNTHETIC_INSTANCES = 2
+PARALLEL_GATES = 1 << 15
+PROCESS_COUNTS = [1, 2, 4, 8, 16, 32]
+
+# The most seconds a case's session may take, and how often its parties are checked for crashing
+SESSION_TIMEOUT = 600
+SESSION_POLL = .5
+
+ports = itertools.count(PORT, 2)
+
+
+def best(measure, repeats=REPEATS):
+
+    """
+    Runs a measurement a number of times and keeps the fastest
+
+    :param measure:             function    Runs the work and returns the seconds it took
+    :param repeats:             int         The number of runs
+    :return:                    float       The fewest seconds
+    """
+
+    return min(measure() for _ in range(repeats))
+
+
+def run_pair(sender, receiver):
+
+    """
+    Runs the two parties of a protocol over a pair of connected nodes in this
+    process, with the sender in a thread of its own
+
+    :param sender:              function    Runs the sender over its node and the partner's address
+    :param receiver:            function    Runs the receiver over its node and the partner's address
+    :return:                                The receiver's result
+    """
+
+    port = next(ports)
+    addrs = [(HOST, port), (HOST, port+1)]
+    nodes = [Node.Node(*addr) for addr in addrs]
+    thread = threading.Thread(target=nodes[0].connect, args=([addrs[1]],))
+    thread.start()
+    nodes[1].connect([addrs[0]])
+    thread.join()
+
+    try:
+        thread = threading.Thread(target=sender, args=(nodes[0], addrs[1]))
+        thread.start()
+        result = receiver(nodes[1], addrs[0])
+        thread.join()
+    finally:
+        for node in nodes:
+            node.close()
+
+    return result
+
+
+def bench_hash():
+
+    """
+    Measures Utilities.hash on the inputs of a garbled row, and each KDF backend
+
+    :return:                    dict    The hashes per second and bytes per second of
+                                        Utilities.hash and the rows per second of each KDF
+    """
+
+    data = [os.urandom(64) for _ in range(HASHES)]
+
+    def measure():
+        start = time.perf_counter()
+        for datum in data:
+            Utilities.hash(datum)
+        return time.perf_counter()-start
+
+    seconds = best(measure)
+    results = {"hashes_per_second": HASHES/seconds, "bytes_per_second": 64*HASHES/seconds, "kdf": dict()}
+
+    rows = [(os.urandom(32), tweak) for tweak in range(KDF_ROWS)]
+    for name in KDF.available():
+        kdf = KDF.get(name)
+
+        def measure():
+            start = time.perf_counter()
+            kdf.derive_batch(rows, Wire.LABEL_BYTES)
+            return time.perf_counter()-start
+
+        results["kdf"][name] = {"rows_per_second": KDF_ROWS/best(measure)}
+
+    return results
+
+
+def bench_gates():
+
+    """
+    Measures the garbling of single gates of each kind by Gate.Gate
+
+    :return:                    dict    The gates garbled per second of each kind
+    """
+
+    kinds = {"and": (Gate.AND, False, False), "and_free_xor": (Gate.AND, True, False),
+             "and_half_gates": (Gate.AND, True, True), "or": (Gate.OR, False, False),
+             "xor": (Gate.XOR, False, False), "xor_free_xor": (Gate.XOR, True, False),
+             "not_free_xor": (Gate.NOT, True, False)}
+
+    results = dict()
+    for kind, (truth_table, free_xor, half_gates) in kinds.items():
+        arity = len(next(iter(truth_table())))
+
+        def measure():
+            delta = Wire.random_delta() if free_xor else None
+            wires = [([Wire.Wire(delta) for _ in range(arity)], Wire.Wire(delta)) for _ in range(GATES)]
+            start = time.perf_counter()
+            for index, (inputs, output) in enumerate(wires):
+                Gate.Gate(index, truth_table(), inputs, output, half_gates=half_gates)
+            return time.perf_counter()-start
+
+        results[kind] = {"gates_per_second": GATES/best(measure)}
+
+    return results
+
+
+def bench_parallel_garbling(process_counts=None, num_gates=PARALLEL_GATES):
+
+    """
+    Measures garbling a synthetic circuit across pools of more and more processes,
+    up to the number of CPUs, with one process garbling without a pool
+
+    :param process_counts:      list    The numbers of processes, or None for those of
+                                        PROCESS_COUNTS up to the number of CPUs
+    :param num_gates:           int     The number of gates of the circuit
+    :return:                    dict    The gates garbled per second of each layout by the
+                                        number of processes
+    """
+
+    if process_counts is None:
+        process_counts = [count for count in PROCESS_COUNTS if count <= (os.cpu_count() or 1)]
+    compiled = synthetic_circuit(num_gates, MIXES["and_heavy"])
+    layouts = {"rows": (False, False), "half_gates": (True, True)}
+
+    results = dict()
+    for layout, (free_xor, half_gates) in layouts.items():
+        results[layout] = dict()
+        for processes in process_counts:
+            pool = multiprocessing.Pool(processes) if processes > 1 else None
+            try:
+                def measure():
+                    circuit = Circuit.Circuit(compiled, {}, Wire.random_delta() if free_xor else None, half_gates)
+                    start = time.perf_counter()
+                    for _ in circuit.chunks(YGC.CHUNK_SIZE, pool, processes):
+                        pass
+                    return time.perf_counter()-start
+
+                results[layout][processes] = {"gates_per_second": num_gates/best(measure)}
+            finally:
+                if pool is not None:
+                    pool.close()
+                    pool.join()
+
+    return results
+
+
+def bench_ot():
+
+    """
+    Measures each engine of OT between two nodes, and the OT extension without
+    and with its base OTs
+
+    :return:                    dict    The OTs per second of each engine
+    """
+
+    prime = Utilities.MODP_2048_PRIME
+    generator = Utilities.MODP_2048_GENERATOR
+    uniform2, uniform1 = sorted(random.randint(1, prime-1) for _ in range(2))
+
+    def base_ot(engine, count):
+        secrets1 = [random.getrandbits(128) for _ in range(count)]
+        secrets2 = [random.getrandbits(128) for _ in range(count)]
+        choices = [random.randint(1, 2) for _ in range(count)]
+
+        def sender(node, partner_addr):
+            OT_Extension.BASE_OTS[engine][0](node, partner_addr, prime, generator, uniform1, uniform2, secrets1,
+                                             secrets2).protocol()
+
+        def receiver(node, partner_addr):
+            start = time.perf_counter()
+            OT_Extension.BASE_OTS[engine][1](node, partner_addr, prime, generator, uniform1, uniform2,
+                                             choices).protocol()
+            return time.perf_counter()-start
+
+        return count/best(lambda: run_pair(sender, receiver))
+
+    def extension(include_setup):
+        secrets1 = [random.getrandbits(128) for _ in range(EXTENDED_OTS)]
+        secrets2 = [random.getrandbits(128) for _ in range(EXTENDED_OTS)]
+        choices = [random.randint(0, 1) for _ in range(EXTENDED_OTS)]
+
+        def sender(node, partner_addr):
+            ot = OT_Extension.IKNP_Sender(node, partner_addr, prime, generator, uniform1, uniform2, [], [])
+            ot.setup()
+            ot.extend(node.open_channel(), secrets1, secrets2)
+
+        def receiver(node, partner_addr):
+            start = time.perf_counter()
+            ot = OT_Extension.IKNP_Receiver(node, partner_addr, prime, generator, uniform1, uniform2, [])
+            ot.setup()
+            if not include_setup:
+                start = time.perf_counter()
+            ot.extend(node.open_channel(), choices)
+            return time.perf_counter()-start
+
+        return EXTENDED_OTS/best(lambda: run_pair(sender, receiver))
+
+    return {"parakh": {"ots_per_second": base_ot("parakh", BASE_OTS)},
+            "ec": {"ots_per_second": base_ot("ec", EC_OTS)},
+            "iknp": {"ots_per_second": extension(False)},
+            "iknp_with_base_ots": {"ots_per_second": extension(True)}}
+
+
+def bench_node():
+
+    """
+    Measures the bytes per second that one node sends another, for messages of
+    each size
+
+    :return:                    dict    The bytes per second of each message size
+    """
+
+    results = dict()
+    for size in MESSAGE_SIZES:
+        message = os.urandom(size)
+        count = max(1, NODE_BYTES // size)
+
+        def sender(node, partner_addr):
+            for _ in range(count):
+                node.send_messages({partner_addr: message})
+
+        def receiver(node, partner_addr):
+            start = time.perf_counter()
+            for index in range(count):
+                node.get_message_at(index, release=True)
+            return time.perf_counter()-start
+
+        results[str(size)] = {"bytes_per_second": size*count/best(lambda: run_pair(sender, receiver))}
+
+    return results
+
+
+def synthetic_circuit(num_gates, mix, seed=SEED):
+
+    """
+    Generates a random circuit with a mix of gate types. Each gate reads wires
+    that are set before it, and the outputs of the last gates are the outputs
+    of the circuit.
+
+    :param num_gates:           int                 The number of gates
+    :param mix:                 dict                The share of each gate type code
+    :param seed:                int                 The seed of the circuit
+    :return:                    Compiled_Circuit    The circuit
+    """
+
+    rng = random.Random(seed)
+    num_inputs = 2*INPUT_BITS
+    compiled = Circuit.Compiled_Circuit(num_inputs+num_gates, [INPUT_BITS, INPUT_BITS], [OUTPUT_BITS])
+    types = rng.choices(list(mix.keys()), list(mix.values()), k=num_gates)
+    for index, gate_type in enumerate(types):
+        output = num_inputs+index
+        compiled.add_gate(gate_type, rng.randrange(output), rng.randrange(output), output)
+    return compiled
+
+
+def expected_outputs(case):
+
+    """
+    Evaluates the circuit of a case in the clear, which is the expected output
+    of the protocol
+
+    :param case:                dict    The case, from make_cases
+    :return:                    dict    The output of each output gate by gate number
+    """
+
+    compiled = case["compiled"]
+    inputs = {**case["generator_inputs"], **case["evaluator_inputs"]}
+    return dict(zip(compiled.output_gates(), compiled.evaluate(inputs)))
+
+
+def make_cases(sizes):
+
+    """
+    Builds the circuits to measure, which are the synthetic circuits of each size
+    and mix, the adder and the comparator. Each case builds a freshly garbled
+    circuit from the generator's inputs.
+
+    :param sizes:               list    The numbers of gates of the synthetic circuits
+    :return:                    dict    The topology, the build function, the inputs of each
+                                        party and the number of gates of each case by name
+    """
+
+    rng = random.Random(SEED)
+    cases = dict()
+
+    for mix_name, mix in MIXES.items():
+        for size in sizes:
+            compiled = synthetic_circuit(size, mix)
+            generator_inputs = {wire: rng.randint(0, 1) for wire in compiled.input_wires(0)}
+            evaluator_inputs = {wire: rng.randint(0, 1) for wire in compiled.input_wires(1)}
+
+            cases[mix_name+"_"+str(size)] = {"compiled": compiled, "generator_inputs": generator_inputs,
+                                             "evaluator_inputs": evaluator_inputs, "gates": size,
+                                             "instances": SYNTHETIC_INSTANCES}
+
+    cases["adder"] = {"compiled": YGC.adder_circuit(), "generator_inputs": {0: 1, 2: 1}, "evaluator_inputs": {1: 0},
+                      "gates": 5, "instances": INSTANCES["adder"]}
+    cases["comparator"] = {"compiled": YGC.comparator_circuit(), "generator_inputs": {0: 1, 2: 0},
+                           "evaluator_inputs": {1: 0, 3: 1}, "gates": 7, "instances": INSTANCES["comparator"]}
+
+    for case in cases.values():
+        case["build"] = lambda inputs, compiled=case["compiled"]: YGC.garble(compiled, inputs)
+
+    return cases
+
+
+def bench_circuit(case, kdf=KDF.DEFAULT):
+
+    """
+    Measures the garbling and the evaluation of a circuit apart from the network,
+    with the vector evaluator as well when numpy is installed.
+
+    :param case:                dict    The case, from make_cases
+    :param kdf:                 str     The name of the KDF to garble with
+    :return:                    dict    The gates per second of garbling and of each evaluator,
+                                        the bytes of the garbled circuit and whether the outputs
+                                        are correct, or the error that an evaluation raised
+    """
+
+    def garble():
+        start = time.perf_counter()
+        circuit = case["build"](case["generator_inputs"])
+        for _ in circuit.chunks(YGC.CHUNK_SIZE):
+            pass
+        return time.perf_counter()-start
+
+    garble_seconds = best(garble)
+
+    # The evaluators run on the chunks that the generator would send
+    circuit = case["build"](case["generator_inputs"])
+    inputs = {**case["evaluator_inputs"], **circuit.inputs}
+    expected = expected_outputs(case)
+    messages = [YGC.YGC_Circuit_Generator.aggregate(chunk, case["compiled"], True)
+                for chunk in circuit.chunks(YGC.CHUNK_SIZE)]
+
+    results = {"gates": case["gates"], "garble_gates_per_second": case["gates"]/garble_seconds,
+               "garbled_bytes": sum(len(Node.frame(message)) for message in messages)}
+    evaluators = {"evaluate": YGC.YGC_Circuit_Evaluator}
+    if Vector_Evaluator.numpy is not None:
+        evaluators["vector_evaluate"] = Vector_Evaluator.YGC_Vector_Evaluator
+    for name, evaluator_class in evaluators.items():
+        try:
+            evaluate_seconds, outputs = evaluate_chunks(evaluator_class, case["compiled"], circuit, inputs,
+                                                        messages, kdf)
+        except Exception as error:
+            results.update({"correct": False, "error": repr(error)})
+            return results
+        results[name+"_gates_per_second"] = case["gates"]/evaluate_seconds
+        results["correct"] = results.get("correct", True) and outputs == expected
+
+    return results
+
+
+def evaluate_chunks(evaluator_class, compiled, circuit, inputs, messages, kdf=KDF.DEFAULT):
+
+    """
+    Evaluates the chunks of a garbled circuit, starting from the labels of the
+    inputs as after the OTs
+
+    :param evaluator_class:     type                The class of the evaluator's protocol
+    :param compiled:            Compiled_Circuit    The circuit
+    :param circuit:             Circuit             The garbled circuit
+    :param inputs:              dict                The value of each input wire
+    :param messages:            list                The chunks that the generator sends
+    :param kdf:                 str                 The name of the KDF the circuit is garbled with
+    :return:                    tuple               The seconds the evaluation took and the outputs
+    """
+
+    evaluator = evaluator_class.__new__(evaluator_class)
+    evaluator.kdf = KDF.get(kdf)
+    evaluator.compiled = compiled
+    evaluator.first_output = compiled.output_wires().start
+    labels = {wire: circuit.label_value(wire, value) for wire, value in inputs.items()}
+    evaluator.load_inputs(compiled.num_wires, labels)
+
+    start = time.perf_counter()
+    outputs = evaluator.decode_constants(labels, YGC.YGC_Circuit_Generator.constant_outputs(circuit))
+    for gate_start, _, topology, decoding_bits, layout, rows in messages:
+        garbled_table = evaluator.tables(rows, topology, layout)
+        outputs.update(evaluator.decode(evaluator.evaluate(gate_start, garbled_table, topology), decoding_bits))
+        evaluator.release(topology[4])
+    return time.perf_counter()-start, outputs
+
+
+def run_session(party_num, port, sizes, name, queue):
+
+    """
+    Runs the instances of a case in a session, as one of its parties
+
+    :param party_num:           int     The party number
+    :param port:                int     The generator's port, which the evaluator's follows
+    :param sizes:               list    The numbers of gates of the synthetic circuits
+    :param name:                str     The name of the case
+    :param queue:               Queue   Receives the generator's evaluations per second and
+                                        whether its outputs are correct
+    :return:                    None
+    """
+
+    case = make_cases(sizes)[name]
+    prime = Utilities.MODP_2048_PRIME
+    generator = Utilities.MODP_2048_GENERATOR
+    uniform1, uniform2 = 2, 1
+
+    # The Circuit generator
+    if party_num == 0:
+        session = YGC.YGC_Generator_Session(HOST, port, HOST, port+1, prime, generator, uniform1, uniform2)
+        try:
+            circuits = [case["build"](case["generator_inputs"]) for _ in range(case["instances"])]
+            expected = expected_outputs(case)
+            results = session.run_batch(circuits)
+        finally:
+            session.close()
+        queue.put((session.evaluations_per_second(), all(result == expected for result in results)))
+
+    # The Circuit evaluator
+    else:
+        session = YGC.YGC_Evaluator_Session(HOST, port+1, HOST, port, prime, generator, uniform1, uniform2)
+        try:
+            session.run_batch(case["evaluator_inputs"] for _ in range(case["instances"]))
+        finally:
+            session.close()
+
+
+def bench_sessions(cases, sizes, timeout=SESSION_TIMEOUT):
+
+    """
+    Measures the throughput of each case over the network, with the parties in
+    processes of their own. A case whose parties crash or run out of time fails
+    rather than stalling the rest.
+
+    :param cases:               dict    The cases, from make_cases
+    :param sizes:               list    The numbers of gates of the synthetic circuits
+    :param timeout:             float   The most seconds a case's session may take
+    :return:                    dict    The evaluations per second of each case and whether
+                                        its outputs are correct
+    """
+
+    results = dict()
+    for name in cases.keys():
+        port = next(ports)
+        outcomes = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=run_session, args=(party_num, port, sizes, name, outcomes))
+                     for party_num in range(2)]
+        for process in processes:
+            process.start()
+
+        outcome = None
+        deadline = time.monotonic()+timeout
+        try:
+            while outcome is None and time.monotonic() < deadline:
+                try:
+                    outcome = outcomes.get(timeout=SESSION_POLL)
+                except queue.Empty:
+                    if any(process.exitcode not in (None, 0) for process in processes):
+                        break
+        finally:
+            for process in processes:
+                process.join(max(deadline-time.monotonic(), SESSION_POLL))
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+
+        if outcome is None:
+            results[name] = {"evaluations_per_second": 0.0, "correct": False,
+                             "error": "The parties crashed or ran out of time"}
+        else:
+            results[name] = {"evaluations_per_second": outcome[0], "correct": outcome[1]}
+
+    return results
+
+
+def run(sizes=SIZES):
+
+    """
+    Runs every measurement
+
+    :param sizes:               list    The numbers of gates of the synthetic circuits
+    :return:                    dict    The results
+    """
+
+    random.seed(SEED)
+    cases = make_cases(sizes)
+    results = {"format": FORMAT, "seed": SEED, "time": time.time(), "python": platform.python_version(),
+               "platform": platform.platform(), "cpus": os.cpu_count(), "kdf": KDF.DEFAULT,
+               "free_xor": YGC.FREE_XOR, "half_gates": YGC.HALF_GATES, "chunk_size": YGC.CHUNK_SIZE,
+               "k": Wire.K}
+
+    results["hash"] = bench_hash()
+    results["gates"] = bench_gates()
+    results["parallel_garbling"] = bench_parallel_garbling()
+    results["ot"] = bench_ot()
+    results["node"] = bench_node()
+    results["circuits"] = {name: bench_circuit(case) for name, case in cases.items()}
+
+    # Only the circuits that evaluate correctly run over the network, where a failing party would stall the other
+    correct = {name: case for name, case in cases.items() if results["circuits"][name]["correct"]}
+    for name, session in bench_sessions(correct, sizes).items():
+        results["circuits"][name]["session"] = session
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures each phase of the YGC protocol")
+    parser.add_argument("--output", help="The file to write the results to as JSON, instead of the standard output")
+    parser.add_argument("--quick", action="store_true", help="Only measures the smaller synthetic circuits")
+    parser.add_argument("--k", type=int, default=Wire.K, help="The length of the labels in bits")
+    args = parser.parse_args()
+
+    Wire.set_k(args.k)
+
+    results = run(QUICK_SIZES if args.quick else SIZES)
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        print()
+    else:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
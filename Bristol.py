@@ -0,0 +1,145 @@
+import Circuit
+
+import io
+import time
+
+
+"""
+Author: Chris Murphy (crm4042@g.rit.edu)
+"""
+
+# The type code of each gate of a netlist. MAND gates are split into AND gates.
+GATE_TYPES = {"XOR": Circuit.XOR_GATE, "AND": Circuit.AND_GATE, "MAND": Circuit.AND_GATE,
+              "INV": Circuit.INV_GATE, "NOT": Circuit.INV_GATE, "EQW": Circuit.BUF_GATE,
+              "EQ": Circuit.EQ_GATE}
+
+# A full adder in Bristol Fashion with a 1 bit input for each party and the carry
+EXAMPLE = """5 8
+3 1 1 1
+2 1 1
+
+2 1 0 1 3 XOR
+2 1 0 1 4 AND
+2 1 3 2 6 XOR
+2 1 3 2 5 AND
+2 1 4 5 7 XOR
+"""
+
+
+def load(path: str):
+
+    """
+    Loads a Bristol Fashion or Bristol classic netlist from a file
+
+    :param path:            str         The path of the netlist
+    :return:                Compiled_Circuit    The compiled circuit
+    """
+
+    with open(path, "r") as netlist:
+        return parse(netlist)
+
+
+def parse(lines):
+
+    """
+    Parses a Bristol Fashion or Bristol classic netlist a line at a time into a
+    compiled circuit. The formats are told apart by the line after the input
+    sizes, which holds the output sizes in Bristol Fashion and is blank or a
+    gate in Bristol classic. Bristol classic circuits have two inputs and one
+    output, the last wires of the circuit.
+
+    :param lines:           iterable    The lines of the netlist
+    :return:                Compiled_Circuit    The compiled circuit
+    """
+
+    lines = iter(lines)
+    num_gates, num_wires = (int(field) for field in next_fields(lines))
+    sizes = [int(field) for field in next_fields(lines)]
+
+    # Reads the line after the input sizes
+    line = next(lines, "").split()
+    if len(line) > 0 and all(field.isdigit() for field in line):
+        input_sizes = sizes[1:1+sizes[0]]
+        output_sizes = [int(field) for field in line[1:1+int(line[0])]]
+        line = list()
+    else:
+        input_sizes = sizes[:2]
+        output_sizes = sizes[2:3]
+
+    compiled = Circuit.Compiled_Circuit(num_wires, input_sizes, output_sizes)
+    gates_read = 0
+    while True:
+        if len(line) > 0:
+            parse_gate(compiled, line)
+            gates_read += 1
+        line = next(lines, None)
+        if line is None:
+            break
+        line = line.split()
+
+    if gates_read != num_gates:
+        raise ValueError("Expected "+str(num_gates)+" gates but read "+str(gates_read))
+    return compiled
+
+
+def next_fields(lines):
+
+    """
+    Gets the fields of the next line that is not blank
+
+    :param lines:           iterator    The lines of the netlist
+    :return:                list        The fields of the line
+    """
+
+    for line in lines:
+        fields = line.split()
+        if len(fields) > 0:
+            return fields
+    raise ValueError("The netlist ended before its header")
+
+
+def parse_gate(compiled, fields: list):
+
+    """
+    Parses a single gate, in the form <inputs> <outputs> <input wires> <output wires> <type>
+
+    :param compiled:        Compiled_Circuit    The compiled circuit to add the gate to
+    :param fields:          list        The fields of the gate's line
+    :return:                None
+    """
+
+    num_inputs = int(fields[0])
+    num_outputs = int(fields[1])
+    wires = [int(field) for field in fields[2:2+num_inputs+num_outputs]]
+    name = fields[2+num_inputs+num_outputs]
+    if name not in GATE_TYPES:
+        raise ValueError("Unsupported gate "+name)
+    gate_type = GATE_TYPES[name]
+
+    if name == "MAND":
+        # The first half of the inputs are ANDed with the second half
+        for index in range(num_outputs):
+            compiled.add_gate(gate_type, wires[index], wires[num_outputs+index], wires[num_inputs+index])
+    elif num_inputs == 1:
+        compiled.add_gate(gate_type, wires[0], wires[0], wires[1])
+    else:
+        compiled.add_gate(gate_type, wires[0], wires[1], wires[2])
+
+
+def main():
+    start = time.time()
+    compiled = parse(io.StringIO(EXAMPLE))
+    print("Parsed "+str(len(compiled))+" gates in "+str(time.time()-start)+" seconds")
+    print("Gate counts: "+str(compiled.gate_counts()))
+    for a in range(2):
+        for b in range(2):
+            for carry in range(2):
+                outputs = compiled.evaluate({0: a, 1: b, 2: carry})
+                print(str(a)+str(b)+str(carry)+": "+"".join(str(bit) for bit in reversed(outputs)))
+    circuit = compiled.to_circuit({0: 0, 2: 1})
+    print("Garbled "+str(sum(len(chunk) for chunk in circuit.chunks()))+" gates on "+str(compiled.num_wires)+
+          " wires")
+
+
+if __name__ == '__main__':
+    main()
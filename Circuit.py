@@ -1,7 +1,41 @@
 import Gate
+import KDF
 import Utilities
 import Wire
+
+from array import array
+import bisect
+import hashlib
+import itertools
+import math
+import os
 import random
+import struct
+
+
+# The type codes of the gates of a compiled circuit
+XOR_GATE = 0
+AND_GATE = 1
+INV_GATE = 2
+BUF_GATE = 3
+EQ_GATE = 4
+OR_GATE = 5
+
+GATE_TYPES = {XOR_GATE: Gate.XOR, AND_GATE: Gate.AND, INV_GATE: Gate.NOT, BUF_GATE: Gate.BUF, OR_GATE: Gate.OR}
+
+# The types of the gates with one input, which ignore their second input
+UNARY_GATES = (INV_GATE, BUF_GATE)
+
+# The truth table of each type, which the gates of that type share
+TRUTH_TABLES = {gate_type: truth_table() for gate_type, truth_table in GATE_TYPES.items()}
+
+# The most gates levelized and garbled across a process pool at once, as a whole number of chunks
+GARBLE_SPAN = 1 << 16
+
+# The bytes of the seed of the fresh labels of a circuit, and the number of wires whose labels
+# one call expands from it, so that a worker process derives the labels of a few wires cheaply
+SEED_BYTES = 32
+SEED_BLOCK = 16
 
 """
 Author: Chris Murphy (crm4042@g.rit.edu)
@@ -10,22 +44,71 @@ Author: Chris Murphy (crm4042@g.rit.edu)
 class Circuit:
 
     """
-    Represents a full circuit.
+    Represents a garbled circuit on the generator's side. The topology is a
+    Compiled_Circuit and the labels of all of the wires are kept in one flat
+    store, so that a gate takes a few dozen bytes. Gate objects are built for
+    the gates of a chunk only while it is garbled and sent. The fresh labels
+    are expanded from a secret seed, so that worker processes derive the
+    labels they need rather than being sent them.
     """
 
-    def __init__(self, inputs: dict, gates: list, wires: list):
+    def __init__(self, compiled, inputs: dict, delta=None, half_gates=False, kdf=None):
 
         """
-        Initializes the circuit
+        Initializes the circuit with fresh labels for every wire
 
-        :param inputs:      dict        The inputs to the circuit
-        :param gates:       list        An ordered list of gates
-        :param wires:       list        An ordered list of wires
+        :param compiled:    Compiled_Circuit    The topology of the circuit
+        :param inputs:      dict        The generator's inputs, by wire
+        :param delta:       Label       The global Free-XOR offset, or None
+        :param half_gates:  bool        Whether or not to garble AND-like gates as half gates
+        :param kdf:         KDF         The KDF to garble with, or None for the default
         """
 
-        self.inputs = inputs
-        self.gates = gates
-        self.wires = wires
+        if half_gates and delta is None:
+            raise ValueError("Half-gates garbling requires Free-XOR wires")
+
+        self.compiled = compiled
+        self.inputs = dict(inputs)
+        self.delta = delta
+        self.half_gates = half_gates
+        self.kdf = kdf or KDF.get()
+
+        # The label for 0 of each wire and, without Free-XOR, the label for 1 of each wire
+        # after them, which has the opposite permute bit
+        num_wires = compiled.num_wires
+        self.seed = os.urandom(SEED_BYTES)
+        self.labels = bytearray(seeded_labels(self.seed, 0, 0, num_wires))
+        if delta is None:
+            self.labels += seeded_labels(self.seed, 1, 0, num_wires)
+            for wire in range(num_wires):
+                self.labels[(num_wires+wire)*Wire.LABEL_BYTES] = \
+                    (self.labels[(num_wires+wire)*Wire.LABEL_BYTES] & 0xfe) | \
+                    ((self.labels[wire*Wire.LABEL_BYTES] & 1) ^ 1)
+
+        # Whether garbling derived the labels of each wire rather than them being fresh
+        self.derived = bytearray(num_wires)
+
+        # EQ gates become inputs of the generator
+        for gate_type, input0, output in zip(compiled.types, compiled.inputs0, compiled.outputs):
+            if gate_type == EQ_GATE:
+                self.inputs[output] = input0
+
+    def label_value(self, num, activation):
+
+        """
+        Gets the value of the label of a wire for a certain activation
+
+        :param num:         int         The wire number
+        :param activation:  int         The activation
+        :return:            int         The value of the label
+        """
+
+        if self.delta is None:
+            start = (activation*self.compiled.num_wires+num)*Wire.LABEL_BYTES
+            return int.from_bytes(self.labels[start:start+Wire.LABEL_BYTES], byteorder="little", signed=False)
+        start = num*Wire.LABEL_BYTES
+        value = int.from_bytes(self.labels[start:start+Wire.LABEL_BYTES], byteorder="little", signed=False)
+        return value ^ self.delta.value if activation else value
 
     def get_wire_corresponding_to(self, num, activation):
 
@@ -34,10 +117,163 @@ class Circuit:
 
         :param num:         int         The wire number to get
         :param activation:  int         The activation to get
-        :return:            tuple       The corresponding wire
+        :return:            Label       The corresponding wire label
+        """
+
+        return Wire.Label(self.label_value(num, activation))
+
+    def wire(self, num):
+
+        """
+        Builds a wire object from the labels of a wire
+
+        :param num:         int         The wire number
+        :return:            Wire        The wire
+        """
+
+        return Wire.Wire.from_values([self.label_value(num, 0), self.label_value(num, 1)], self.delta)
+
+    def set_zero_label(self, num, value):
+
+        """
+        Stores the label for 0 of a Free-XOR wire, which garbling derives for
+        Free-XOR and half gates
+
+        :param num:         int         The wire number
+        :param value:       int         The value of the label
+        :return:            None
+        """
+
+        start = num*Wire.LABEL_BYTES
+        self.labels[start:start+Wire.LABEL_BYTES] = value.to_bytes(Wire.LABEL_BYTES, byteorder="little",
+                                                                   signed=False)
+        self.derived[num] = 1
+
+    def gates(self, start, stop):
+
+        """
+        Builds the gates of a range of the compiled circuit, without EQ gates.
+        Each gate is numbered by its index in the compiled circuit, which is also
+        its key in the outputs of the protocol.
+
+        :param start:       int         The index of the first gate
+        :param stop:        int         The index after the last gate
+        :return:            list        The gates
+        """
+
+        compiled = self.compiled
+        output_wires = compiled.output_wires()
+
+        # The gates of the range share a wire object per wire, so that derived labels pass between them
+        wires = dict()
+
+        def wire(num):
+            if num not in wires:
+                wires[num] = self.wire(num)
+            return wires[num]
+
+        gates = list()
+        for index in range(start, stop):
+            gate_type = compiled.types[index]
+            if gate_type == EQ_GATE:
+                continue
+            input0 = compiled.inputs0[index]
+            input1 = compiled.inputs1[index]
+            truth_table = TRUTH_TABLES[gate_type]
+            if gate_type in UNARY_GATES:
+                inputs = [wire(input0)]
+            else:
+                inputs = [wire(input0), wire(input1)]
+            output = compiled.outputs[index]
+            gates.append(Gate.Gate(index, truth_table, inputs, wire(output), output in output_wires,
+                                   half_gates=self.half_gates, garble=False, kdf=self.kdf))
+        return gates
+
+    def chunks(self, chunk_size=None, pool=None, processes=None):
+
+        """
+        Splits the gates into chunks in topological order, garbling the gates of
+        each chunk as it is reached and dropping them once the next chunk is
+        requested. A chunk covers chunk_size gates of the compiled circuit, less
+        its EQ gates. With a process pool, the chunks of up to GARBLE_SPAN gates
+        are garbled at once, so that each level spans many chunks.
+
+        :param chunk_size:  int         The number of gates per chunk, or None for one chunk
+        :param pool:        Pool        A process pool to garble the chunks across, or None
+                                        to garble them in this process
+        :param processes:   int         The number of processes of the pool, or None for the
+                                        number of CPUs
+        :return:            generator   The chunks of garbled gates
         """
 
-        return self.wires[num].k[activation], self.wires[num].p[activation]
+        chunk_size = chunk_size or max(len(self.compiled), 1)
+        span = chunk_size if pool is None else max(GARBLE_SPAN//chunk_size, 1)*chunk_size
+        for span_start in range(0, len(self.compiled), span):
+            span_stop = min(span_start+span, len(self.compiled))
+            gates = self.gates(span_start, span_stop)
+            if pool is None:
+                for gate in gates:
+                    gate.garble()
+
+                    # Keeps the labels that garbling derived for the gates of later chunks
+                    if gate.derives_output():
+                        self.set_zero_label(self.compiled.outputs[gate.gate_num], gate.output.k[0].value)
+            else:
+                self.garble_in_parallel(gates, pool, processes or os.cpu_count() or 1)
+
+            gate_nums = [gate.gate_num for gate in gates]
+            for start in range(span_start, span_stop, chunk_size):
+                chunk = gates[bisect.bisect_left(gate_nums, start):bisect.bisect_left(gate_nums, start+chunk_size)]
+                if len(chunk) > 0:
+                    yield chunk
+                for gate in chunk:
+                    gate.release()
+
+    def garble_in_parallel(self, gates: list, pool, processes: int):
+
+        """
+        Garbles gates a level at a time, with the gates of each level that need hashing
+        split into one batch per process of a pool. Free-XOR gates are garbled in this
+        process, since they cost less than sending them. A batch holds the topology of
+        its gates and only the labels that garbling derived, since the worker processes
+        derive the fresh labels from the seed. The derived labels are kept for the
+        gates of later levels and chunks.
+
+        :param gates:       list        The gates, in topological order
+        :param pool:        Pool        The process pool
+        :param processes:   int         The number of processes of the pool
+        :return:            None
+        """
+
+        compiled = self.compiled
+        delta = None if self.delta is None else self.delta.value
+        for level in levelize(gates):
+            remote = list()
+            for gate in level:
+                if gate.free:
+                    gate.garble()
+                    self.set_zero_label(compiled.outputs[gate.gate_num], gate.output.k[0].value)
+                else:
+                    remote.append(gate)
+            if len(remote) == 0:
+                continue
+
+            batch_size = math.ceil(len(remote)/processes)
+            batches = list()
+            for start in range(0, len(remote), batch_size):
+                gate_nums = array("I", [gate.gate_num for gate in remote[start:start+batch_size]])
+                topology = [array(values.typecode, [values[gate_num] for gate_num in gate_nums])
+                            for values in (compiled.types, compiled.inputs0, compiled.inputs1, compiled.outputs)]
+                derived = {wire: self.label_value(wire, 0)
+                           for wire in itertools.chain(topology[1], topology[2]) if self.derived[wire]}
+                batches.append((self.seed, delta, self.kdf.name, Wire.K, self.half_gates, gate_nums, topology,
+                                derived))
+
+            for start, garbled_batch in zip(range(0, len(remote), batch_size), pool.map(garble_batch, batches)):
+                for gate, garbled in zip(remote[start:start+batch_size], garbled_batch):
+                    gate.adopt(garbled)
+                    if gate.derives_output():
+                        self.set_zero_label(compiled.outputs[gate.gate_num], gate.output.k[0].value)
 
     def print_circuit(self):
 
@@ -52,27 +288,372 @@ class Circuit:
             print(ipt, self.inputs[ipt])
 
         print("\nWIRES:")
-        for index, wire in enumerate(self.wires):
-            print(index, wire.k[0], wire.p[0])
-            print(index, wire.k[1], wire.p[1])
+        for index in range(self.compiled.num_wires):
+            print(index, self.get_wire_corresponding_to(index, 0), self.label_value(index, 0) & 1)
+            print(index, self.get_wire_corresponding_to(index, 1), self.label_value(index, 1) & 1)
 
         print("\nGATES")
-        for index, gate in enumerate(self.gates):
-            print(index, gate.primitive_garbled_gate)
+        for index, (gate_type, input0, input1, output) in enumerate(zip(self.compiled.types, self.compiled.inputs0,
+                                                                        self.compiled.inputs1,
+                                                                        self.compiled.outputs)):
+            print(index, gate_type, input0, input1, output)
+
+
+class Compiled_Circuit:
+
+    """
+    Represents a circuit as flat arrays of gate type codes and wire numbers,
+    which takes a few bytes per gate. Wires are numbered so that the inputs of
+    the parties come first, in order, and the outputs come last.
+    """
+
+    def __init__(self, num_wires: int, input_sizes: list, output_sizes: list):
+
+        """
+        Initializes an empty compiled circuit
+
+        :param num_wires:       int         The number of wires
+        :param input_sizes:     list        The number of wires of each input
+        :param output_sizes:    list        The number of wires of each output
+        """
+
+        self.num_wires = num_wires
+        self.input_sizes = input_sizes
+        self.output_sizes = output_sizes
+
+        # The type, input wires and output wire of each gate. An EQ gate has its
+        # constant in place of its first input, and a one input gate repeats it.
+        self.types = array("B")
+        self.inputs0 = array("I")
+        self.inputs1 = array("I")
+        self.outputs = array("I")
+
+        # The wires in the order their labels are last used and where the wires of each gate start,
+        # which are found when they are first needed
+        self.releases = None
+
+    def add_gate(self, gate_type: int, input0: int, input1: int, output: int):
+
+        """
+        Appends a gate to the circuit
+
+        :param gate_type:       int         The type code of the gate
+        :param input0:          int         The first input wire, or the constant of an EQ gate
+        :param input1:          int         The second input wire
+        :param output:          int         The output wire
+        :return:                None
+        """
+
+        self.types.append(gate_type)
+        self.inputs0.append(input0)
+        self.inputs1.append(input1)
+        self.outputs.append(output)
+        self.releases = None
+
+    def __len__(self):
+        return len(self.types)
+
+    def output_wires(self):
+
+        """
+        Gets the output wires of the circuit, in order
+
+        :return:            range       The output wires
+        """
+
+        return range(self.num_wires-sum(self.output_sizes), self.num_wires)
+
+    def input_wires(self, index: int):
+
+        """
+        Gets the wires of one of the inputs of the circuit
+
+        :param index:       int         The index of the input
+        :return:            range       The wires of the input
+        """
+
+        start = sum(self.input_sizes[:index])
+        return range(start, start+self.input_sizes[index])
+
+    def gate_counts(self):
+
+        """
+        Counts the gates of each type
+
+        :return:            dict        The number of gates of each type code
+        """
+
+        counts = dict()
+        for gate_type in self.types:
+            counts[gate_type] = counts.get(gate_type, 0)+1
+        return counts
+
+    def evaluate(self, inputs: dict):
+
+        """
+        Evaluates the circuit in the clear, which is for testing
+
+        :param inputs:      dict        The value of every input wire
+        :return:            list        The values of the output wires, in order
+        """
+
+        values = bytearray(self.num_wires)
+        for wire, value in inputs.items():
+            values[wire] = value
+        for gate_type, input0, input1, output in zip(self.types, self.inputs0, self.inputs1, self.outputs):
+            if gate_type == XOR_GATE:
+                values[output] = values[input0] ^ values[input1]
+            elif gate_type == AND_GATE:
+                values[output] = values[input0] & values[input1]
+            elif gate_type == INV_GATE:
+                values[output] = values[input0] ^ 1
+            elif gate_type == BUF_GATE:
+                values[output] = values[input0]
+            elif gate_type == OR_GATE:
+                values[output] = values[input0] | values[input1]
+            else:
+                values[output] = input0
+        return [values[wire] for wire in self.output_wires()]
+
+    def to_circuit(self, inputs: dict, delta=None, half_gates=False, kdf=None):
+
+        """
+        Builds a circuit with fresh labels for the generator. The gates are garbled
+        as the circuit is sent.
+
+        :param inputs:      dict        The generator's inputs, by wire
+        :param delta:       Label       The global Free-XOR offset, or None
+        :param half_gates:  bool        Whether or not to garble AND-like gates as half gates
+        :param kdf:         KDF         The KDF to garble with, or None for the default
+        :return:            Circuit     The circuit
+        """
+
+        return Circuit(self, inputs, delta, half_gates, kdf)
+
+    def output_gates(self):
+
+        """
+        Gets the number of the gate that sets each output wire, in order, which
+        are the keys of the outputs of the protocol
+
+        :return:            list        The gate numbers
+        """
+
+        gate_of_wire = dict()
+        output_wires = self.output_wires()
+        for index, output in enumerate(self.outputs):
+            if output in output_wires:
+                gate_of_wire[output] = index
+        return [gate_of_wire[wire] for wire in output_wires]
+
+    def released_wires(self, start: int, stop: int):
+
+        """
+        Gets the wires whose labels are last used by a range of gates, which the
+        evaluator frees once it has evaluated and decoded the range. A label is last
+        used by the last garbled gate that sets or reads it; the labels that no
+        garbled gate uses, such as those of unused inputs, are last used by the
+        first garbled gate. Since every garbled gate is in a chunk, every label is
+        freed by the chunk of one gate.
+
+        :param start:       int         The first gate of the range
+        :param stop:        int         The gate after the range
+        :return:            array       The wires
+        """
+
+        if self.releases is None:
+            first = next((gate_num for gate_num, gate_type in enumerate(self.types) if gate_type != EQ_GATE), 0)
+            last_use = array("Q", [first])*(self.num_wires if len(self.types) > 0 else 0)
+            for gate_num, (gate_type, input0, input1, output) in enumerate(zip(self.types, self.inputs0,
+                                                                               self.inputs1, self.outputs)):
+                if gate_type != EQ_GATE:
+                    last_use[input0] = gate_num
+                    if gate_type not in UNARY_GATES:
+                        last_use[input1] = gate_num
+                    last_use[output] = gate_num
+
+            # Sorts the wires by the gate that last uses them
+            bounds = array("Q", [0])*(len(self.types)+1)
+            for gate_num in last_use:
+                bounds[gate_num+1] += 1
+            for gate_num in range(len(self.types)):
+                bounds[gate_num+1] += bounds[gate_num]
+            wires = array("I", [0])*self.num_wires
+            filled = array("Q", bounds)
+            for wire, gate_num in enumerate(last_use):
+                wires[filled[gate_num]] = wire
+                filled[gate_num] += 1
+            self.releases = (wires, bounds)
+
+        wires, bounds = self.releases
+        return wires[bounds[start]:bounds[stop]]
+
+    def constant_outputs(self):
+
+        """
+        Gets the EQ gates that set output wires. Their labels are inputs of the
+        generator, so these outputs are decoded from the inputs rather than from
+        the garbled gates.
+
+        :return:            list        The gate number and output wire of each such gate
+        """
+
+        output_wires = self.output_wires()
+        return [(index, output) for index, (gate_type, output) in enumerate(zip(self.types, self.outputs))
+                if gate_type == EQ_GATE and output in output_wires]
+
+
+def levelize(gates: list):
+
+    """
+    Splits gates in topological order into levels of gates that can be garbled
+    at the same time. A gate must wait only for the gates of the list that derive
+    the labels of its inputs, so without Free-XOR every gate is in the first level.
+
+    :param gates:       list        The gates, in topological order
+    :return:            list        The gates of each level
+    """
+
+    level_of_wire = dict()
+    levels = list()
+    for gate in gates:
+        level = 0
+        for wire in gate.inputs:
+            level = max(level, level_of_wire.get(id(wire), -1)+1)
+        if gate.derives_output():
+            level_of_wire[id(gate.output)] = level
+        if level == len(levels):
+            levels.append(list())
+        levels[level].append(gate)
+    return levels
+
+
+def garble_batch(batch: tuple):
+
+    """
+    Garbles a batch of gates in a worker process, deriving the fresh labels of
+    their wires from the seed of the circuit
+
+    :param batch:       tuple       The seed, the value of the global Free-XOR offset or None,
+                                    the name of the KDF, the security parameter, whether or not
+                                    to garble half gates, the gate numbers, the types, first
+                                    inputs, second inputs and outputs of the gates and the label
+                                    for 0 of each input wire whose labels garbling derived
+    :return:            list        The derived label for 0 of the output wire, or None, and
+                                    the garbled tables of each gate
+    """
+
+    seed, delta, kdf_name, k, half_gates, gate_nums, topology, derived = batch
+    if k != Wire.K:
+        Wire.set_k(k)
+    delta = None if delta is None else Wire.Label(delta)
+    kdf = KDF.get(kdf_name)
+
+    def wire(num):
+        if num in derived:
+            zero = derived[num]
+        else:
+            zero = int.from_bytes(seeded_labels(seed, 0, num, 1), byteorder="little", signed=False)
+        if delta is not None:
+            return Wire.Wire.from_values([zero, zero ^ delta.value], delta)
+        one = int.from_bytes(seeded_labels(seed, 1, num, 1), byteorder="little", signed=False)
+        return Wire.Wire.from_values([zero, (one & ~1) | ((zero & 1) ^ 1)])
+
+    garbled = list()
+    for gate_num, gate_type, input0, input1, output_num in zip(gate_nums, *topology):
+        inputs = [wire(input0)] if gate_type in UNARY_GATES else [wire(input0), wire(input1)]
+        output = wire(output_num)
+        gate = Gate.Gate(gate_num, TRUTH_TABLES[gate_type], inputs, output, half_gates=half_gates, kdf=kdf)
+        garbled.append((output.k[0].value if gate.derives_output() else None, gate.garbled_table))
+    return garbled
+
+
+def seeded_labels(seed: bytes, activation: int, first: int, count: int):
+
+    """
+    Expands the fresh labels of a run of wires for an activation from the seed of a
+    circuit, SEED_BLOCK wires at a time with SHAKE256
+
+    :param seed:        bytes       The seed
+    :param activation:  int         The activation
+    :param first:       int         The first wire
+    :param count:       int         The number of wires
+    :return:            bytes       The labels, LABEL_BYTES bytes each in little-endian order
+    """
+
+    start = first//SEED_BLOCK
+    stop = (first+count+SEED_BLOCK-1)//SEED_BLOCK
+    data = b"".join([hashlib.shake_256(seed+bytes([activation])+block.to_bytes(8, byteorder="little",
+                                                                               signed=False))
+                     .digest(SEED_BLOCK*Wire.LABEL_BYTES) for block in range(start, stop)])
+    offset = (first-start*SEED_BLOCK)*Wire.LABEL_BYTES
+    return data[offset:offset+count*Wire.LABEL_BYTES]
+
+
+def table_rows(gate_type: int, free_xor: bool, half_gates: bool):
+
+    """
+    Gets the number of rows of the garbled table of a type of gate, each of which
+    is as long as a label
+
+    :param gate_type:           int     The type code of the gate
+    :param free_xor:            bool    Whether or not the circuit is garbled with Free-XOR
+    :param half_gates:          bool    Whether or not AND-like gates are garbled as half gates
+    :return:                    int     The number of rows
+    """
+
+    if gate_type == EQ_GATE:
+        return 0
+    truth_table = TRUTH_TABLES[gate_type]
+    if free_xor and Gate.is_linear(truth_table):
+        return 0
+    if half_gates and Gate.and_form(truth_table) is not None:
+        return 2
+    return len(truth_table)
+
+
+def parse_rows(data: bytes, topology: list, layout: list):
+
+    """
+    Parses the rows of a chunk, laid out as in a Garbled_Store, into the garbled tables of its gates
+
+    :param data:                bytes   The rows of the chunk
+    :param topology:            list    The types, first inputs, second inputs and outputs of the gates
+    :param layout:              list    Whether or not the circuit is garbled with Free-XOR and
+                                        with half gates
+    :return:                    list    The garbled table of each gate, less EQ gates
+    """
+
+    rows = {gate_type: table_rows(gate_type, *layout) for gate_type in range(OR_GATE+1)}
+    label_bytes = Wire.LABEL_BYTES
+    if label_bytes == 16:
+        words = struct.unpack("<%dQ" % (len(data)//8), data)
+        values = [low | (high << 64) for low, high in zip(words[0::2], words[1::2])]
+    else:
+        values = [int.from_bytes(data[offset:offset+label_bytes], byteorder="little", signed=False)
+                  for offset in range(0, len(data), label_bytes)]
+
+    garbled_tables = list()
+    row = 0
+    for gate_type in topology[0]:
+        if gate_type == EQ_GATE:
+            continue
+        garbled_tables.append(values[row:row+rows[gate_type]])
+        row += rows[gate_type]
+
+    return garbled_tables
 
 
 def main():
-    wires = [Wire.Wire() for _ in range(8)]
-    inputs = {0: random.randint(0, 1), 2: random.randint(0, 1)}
-    gates = [Gate.Gate("000", Gate.XOR(), [wires[0], wires[1]], wires[3]),
-             Gate.Gate("001", Gate.XOR(), [wires[2], wires[3]], wires[4], True),
-             Gate.Gate("010", Gate.AND(), [wires[2], wires[3]], wires[5]),
-             Gate.Gate("011", Gate.AND(), [wires[0], wires[1]], wires[6]),
-             Gate.Gate("100", Gate.OR(), [wires[5], wires[6]], wires[7], True)]
-    circuit = Circuit(inputs, gates, wires)
-    print()
+    compiled = Compiled_Circuit(8, [3], [2])
+    compiled.add_gate(XOR_GATE, 0, 1, 3)
+    compiled.add_gate(AND_GATE, 2, 3, 4)
+    compiled.add_gate(AND_GATE, 0, 1, 5)
+    compiled.add_gate(XOR_GATE, 2, 3, 6)
+    compiled.add_gate(OR_GATE, 4, 5, 7)
+    circuit = Circuit(compiled, {0: random.randint(0, 1), 2: random.randint(0, 1)}, Wire.random_delta(), True)
+    circuit.print_circuit()
 
 
 if __name__ == '__main__':
     main()
-
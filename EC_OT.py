@@ -0,0 +1,230 @@
+import Node
+import Utilities
+
+import multiprocessing
+import nacl.bindings
+import nacl.encoding
+import nacl.secret
+import os
+import random
+
+
+HOST = "0.0.0.0"
+PORT = 10324
+
+
+ENCODER = nacl.encoding.RawEncoder()
+NONCE = bytes(nacl.secret.SecretBox.NONCE_SIZE)
+
+
+"""
+Author: Chris Murphy (crm4042@g.rit.edu)
+"""
+
+class EC_OT_Sender:
+
+    """
+    Elliptic-curve Oblivious Transfer sender's protocol over Curve25519 in its
+    Edwards form, since the protocol adds points, which X25519 cannot.
+    This corresponds to the protocol of Chou and Orlandi defined in:
+    https://eprint.iacr.org/2015/267.pdf
+    """
+
+    def __init__(self, node, partner_addr, prime, generator, uniform1, uniform2, secret1, secret2):
+
+        """
+        Initializes the OT sender's protocol over an open connection. A batch of OTs
+        is run in the same rounds when the secrets are given as lists. The group
+        parameters are unused and kept so that the engine can replace OT.OT_Sender.
+
+        :param node:            Node    The node, or a channel of it, to run the OT over
+        :param partner_addr:    tuple   The partner's address
+        :param prime:           int     Unused
+        :param generator:       int     Unused
+        :param uniform1:        int     Unused
+        :param uniform2:        int     Unused
+        :param secret1:         int     The first secret, or a list of first secrets
+        :param secret2:         int     The second secret, or a list of second secrets
+        """
+
+        self.node = node
+        self.partner_addr = partner_addr
+        self.batch = isinstance(secret1, list)
+        self.secret1 = secret1 if self.batch else [secret1]
+        self.secret2 = secret2 if self.batch else [secret2]
+
+    def protocol(self):
+
+        """
+        The protocol for the OT sender
+
+        :return:                None
+        """
+
+        # 1) Sends A = aG, which is shared by the batch
+        a = random_scalar()
+        A = nacl.bindings.crypto_scalarmult_ed25519_base_noclamp(a)
+        self.node.send_messages({self.partner_addr: A})
+
+        # 2) Receives B = bG for the first secret or B = A+bG for the second
+        message_2 = self.node.get_message_at(0)
+        T = nacl.bindings.crypto_scalarmult_ed25519_noclamp(a, A)
+
+        # 3) Sends each secret under a key from aB or aB-aA, only one of which the receiver knows as bA
+        width = max(1, (max(self.secret1+self.secret2, default=0).bit_length()+7)//8)
+        message_3 = list()
+        for index, (B, secret1, secret2) in enumerate(zip(message_2, self.secret1, self.secret2)):
+            if not nacl.bindings.crypto_core_ed25519_is_valid_point(B):
+                raise ValueError("Received an invalid point")
+            aB = nacl.bindings.crypto_scalarmult_ed25519_noclamp(a, B)
+            box1 = nacl.secret.SecretBox(box_key(index, A, B, aB))
+            box2 = nacl.secret.SecretBox(box_key(index, A, B, nacl.bindings.crypto_core_ed25519_sub(aB, T)))
+            message_3.append((box1.encrypt(secret1.to_bytes(width, byteorder="little", signed=False), NONCE,
+                                           encoder=ENCODER).ciphertext,
+                              box2.encrypt(secret2.to_bytes(width, byteorder="little", signed=False), NONCE,
+                                           encoder=ENCODER).ciphertext))
+        self.node.send_messages({self.partner_addr: message_3})
+
+        return
+
+
+class EC_OT_Receiver:
+
+    """
+    Elliptic-curve Oblivious Transfer receiver's protocol over Curve25519 in its
+    Edwards form, since the protocol adds points, which X25519 cannot.
+    This corresponds to the protocol of Chou and Orlandi defined in:
+    https://eprint.iacr.org/2015/267.pdf
+    """
+
+    def __init__(self, node, partner_addr, prime, generator, uniform1, uniform2, choice):
+
+        """
+        Initializes the OT receiver's protocol over an open connection. A batch of OTs
+        is run in the same rounds when the choices are given as a list. The group
+        parameters are unused and kept so that the engine can replace OT.OT_Receiver.
+
+        :param node:            Node    The node, or a channel of it, to run the OT over
+        :param partner_addr:    tuple   The partner's address
+        :param prime:           int     Unused
+        :param generator:       int     Unused
+        :param uniform1:        int     Unused
+        :param uniform2:        int     Unused
+        :param choice:          int     The desired choice (1 or 2), or a list of choices
+        """
+
+        self.node = node
+        self.partner_addr = partner_addr
+        self.batch = isinstance(choice, list)
+        self.choice = choice if self.batch else [choice]
+
+    def protocol(self):
+
+        """
+        The protocol for the the receiver of the OT
+
+        :return:                int     The corresponding value, or a list of the values
+        """
+
+        # 1) Receives A = aG
+        A = self.node.get_message_at(0)
+        if not nacl.bindings.crypto_core_ed25519_is_valid_point(A):
+            raise ValueError("Received an invalid point")
+
+        # 2) Sends B = bG to choose the first secret or B = A+bG to choose the second
+        message_2 = list()
+        keys = list()
+        for index, choice in enumerate(self.choice):
+            b = random_scalar()
+            B = nacl.bindings.crypto_scalarmult_ed25519_base_noclamp(b)
+            if choice == 2:
+                B = nacl.bindings.crypto_core_ed25519_add(A, B)
+            message_2.append(B)
+            keys.append(box_key(index, A, B, nacl.bindings.crypto_scalarmult_ed25519_noclamp(b, A)))
+        self.node.send_messages({self.partner_addr: message_2})
+
+        # 3) Decrypts the chosen secret with the key from bA
+        message_3 = self.node.get_message_at(1)
+        results = list()
+        for key, choice, ciphers in zip(keys, self.choice, message_3):
+            box = nacl.secret.SecretBox(key)
+            results.append(int.from_bytes(box.decrypt(ciphers[choice-1], NONCE, encoder=ENCODER),
+                                          byteorder="little", signed=False))
+
+        return results if self.batch else results[0]
+
+
+def random_scalar():
+
+    """
+    Generates a uniformly random scalar of the group
+
+    :return:                    bytes   The scalar
+    """
+
+    return nacl.bindings.crypto_core_ed25519_scalar_reduce(os.urandom(
+        nacl.bindings.crypto_core_ed25519_NONREDUCEDSCALARBYTES))
+
+
+def box_key(index, A, B, point):
+
+    """
+    Derives the key of a secret box from a shared point, bound to the OT and its messages
+
+    :param index:               int     The index of the OT in its batch
+    :param A:                   bytes   The sender's point
+    :param B:                   bytes   The receiver's point
+    :param point:               bytes   The shared point
+    :return:                    bytes   The key
+    """
+
+    return Utilities.hash(index.to_bytes(8, byteorder="little", signed=False)+A+B+point)[
+        :nacl.secret.SecretBox.KEY_SIZE]
+
+
+def initialize_parties(party, secret1, secret2, choice):
+
+    """
+    Initializes the parties in EC OT. This is for testing.
+
+    :param party:               int     The party number
+    :param secret1:             list    The first secrets
+    :param secret2:             list    The second secrets
+    :param choice:              list    The desired choices
+    :return:
+    """
+
+    addr_list = [(HOST, PORT), (HOST, PORT+1)]
+    node = Node.Node(*addr_list[party])
+    node.connect([addr_list[1-party]])
+    try:
+        if party == 0:
+            p = EC_OT_Sender(node, addr_list[1], None, None, None, None, secret1, secret2)
+            p.protocol()
+        else:
+            p = EC_OT_Receiver(node, addr_list[0], None, None, None, None, choice)
+            print("Result:"+str(p.protocol()))
+    finally:
+        node.close()
+
+def main():
+    secret1 = list(range(100, 116))
+    secret2 = list(range(200, 216))
+    choice = [random.randint(1, 2) for _ in secret1]
+    print("Expected:"+str([secret2[j] if c == 2 else secret1[j] for j, c in enumerate(choice)]))
+
+    processes = list()
+    for party in range(2):
+        processes.append(multiprocessing.Process(target=initialize_parties, args=(party, secret1, secret2, choice)))
+
+    for process in processes:
+        process.start()
+
+    for process in processes:
+        process.join()
+
+    print("Finished Protocol")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,466 @@
+import Circuit
+import Gate
+import KDF
+import Utilities
+import Wire
+import YGC
+
+from array import array
+import fcntl
+import mmap
+import multiprocessing
+import os
+import random
+import struct
+import tempfile
+import threading
+import time
+
+
+# The header of a store: its magic, format, flags, label size, KDF, number of instances,
+# size of each instance and digest of the circuit
+MAGIC = b"YGCS"
+FORMAT = 3
+HEADER = struct.Struct(">4sHBH16sQQ64s")
+FREE_XOR = 1
+HALF_GATES = 2
+
+# Whether an instance has been taken, one byte per instance after the header
+UNUSED = b"\x00"
+USED = 1
+
+HOST = "127.0.0.1"
+PORT = 13124
+
+"""
+Author: Chris Murphy (crm4042@g.rit.edu)
+"""
+
+class Garbled_Store:
+
+    """
+    A file of garbled instances of one circuit, garbled ahead of time so that
+    the online phase of YGC only has to pick an unused instance, run the OTs and
+    stream its tables. Each instance is a fixed-width record of both labels of
+    every input wire and the decoding bits of the outputs, followed by the rows
+    of the gates in order, laid out as the evaluator reads them, so that the rows
+    of a chunk are sent straight from the file with sendfile. The file is memory mapped, and an instance is marked as
+    taken in the file before it is used, since a garbled circuit must never be
+    evaluated twice.
+    """
+
+    def __init__(self, path, compiled):
+
+        """
+        Opens a store
+
+        :param path:        str                 The path of the store
+        :param compiled:    Compiled_Circuit    The circuit the store was garbled from
+        """
+
+        self.path = path
+        self.compiled = compiled
+        self.file = open(path, "r+b")
+        self.map = mmap.mmap(self.file.fileno(), 0)
+
+        magic, version, flags, label_bytes, kdf, self.instances, self.record_size, circuit_digest = \
+            HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != FORMAT:
+            raise ValueError(path+" is not a garbled store of format "+str(FORMAT))
+        if label_bytes != Wire.LABEL_BYTES:
+            raise ValueError(path+" was garbled with "+str(8*label_bytes)+" bit labels")
+        if circuit_digest != digest(compiled):
+            raise ValueError(path+" was garbled from another circuit")
+
+        self.free_xor = bool(flags & FREE_XOR)
+        self.half_gates = bool(flags & HALF_GATES)
+        self.kdf = KDF.get(kdf.rstrip(b"\x00").decode())
+        self.layout = [self.free_xor, self.half_gates]
+
+        # Where each input wire's labels, the decoding bits and each gate's rows are within a record
+        self.input_wires = input_wires(compiled)
+        self.input_position = {wire: position for position, wire in enumerate(self.input_wires)}
+        self.output_counts = output_counts(compiled)
+        self.bits_start = 2*len(self.input_wires)*Wire.LABEL_BYTES
+        self.tables_start = self.bits_start+(self.output_counts[-1]+7)//8
+        self.gate_offsets = gate_offsets(compiled, self.layout)
+        self.data_start = HEADER.size+self.instances
+
+        # The first instance that may be unused, which threads sharing the store claim under a lock
+        self.next = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def create(cls, path, compiled, instances, free_xor=True, half_gates=True, kdf=KDF.DEFAULT, chunk_size=None,
+               pool=None, processes=None):
+
+        """
+        Garbles instances of a circuit into a new store, readable only by its owner,
+        replacing any file at the path once every instance is written
+
+        :param path:        str                 The path of the store
+        :param compiled:    Compiled_Circuit    The circuit
+        :param instances:   int                 The number of instances to garble
+        :param free_xor:    bool                Whether or not to garble with Free-XOR
+        :param half_gates:  bool                Whether or not to garble AND-like gates as half gates
+        :param kdf:         str                 The name of the KDF to garble with
+        :param chunk_size:  int                 The number of gates to garble at a time, or None for all
+        :param pool:        Pool                A process pool to garble across, or None
+        :param processes:   int                 The number of processes of the pool, or None for the
+                                                number of CPUs
+        :return:            Garbled_Store       The store
+        """
+
+        wires = input_wires(compiled)
+        offsets = gate_offsets(compiled, [free_xor, half_gates])
+        bits_start = 2*len(wires)*Wire.LABEL_BYTES
+        bits_bytes = (output_counts(compiled)[-1]+7)//8
+        tables_start = bits_start+bits_bytes
+        record_size = tables_start+offsets[-1]
+        data_start = HEADER.size+instances
+
+        # The store holds both labels of every input wire, so only its owner may read it, and it only
+        # replaces the file at the path once it is whole, so a crash never leaves a partial store there
+        descriptor, temporary = tempfile.mkstemp(prefix=".", suffix=".tmp",
+                                                 dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(descriptor, "w+b") as file:
+                file.truncate(data_start+instances*record_size)
+                with mmap.mmap(file.fileno(), 0) as store:
+                    for instance in range(instances):
+                        record = data_start+instance*record_size
+                        circuit = Circuit.Circuit(compiled, {}, Wire.random_delta() if free_xor else None,
+                                                  half_gates, KDF.get(kdf))
+
+                        # The rows of each gate, as the evaluator parses them, and the decoding bits
+                        decoding_bits = 0
+                        num_outputs = 0
+                        for chunk in circuit.chunks(chunk_size, pool, processes):
+                            for gate in chunk:
+                                data = b"".join(Gate.label_bytes(row) for row in gate.garbled_table)
+                                start = record+tables_start+offsets[gate.gate_num]
+                                store[start:start+len(data)] = data
+                                if gate.is_output:
+                                    decoding_bits |= gate.decoding_bit() << num_outputs
+                                    num_outputs += 1
+
+                        # Both labels of each input wire
+                        store[record:record+bits_start] = b"".join(
+                            Gate.label_bytes(circuit.label_value(wire, activation))
+                            for wire in wires for activation in (0, 1))
+                        store[record+bits_start:record+tables_start] = decoding_bits.to_bytes(
+                            bits_bytes, byteorder="little", signed=False)
+
+                    # The header goes in once every instance is garbled
+                    HEADER.pack_into(store, 0, MAGIC, FORMAT, (FREE_XOR if free_xor else 0) |
+                                     (HALF_GATES if half_gates else 0), Wire.LABEL_BYTES, kdf.encode(), instances,
+                                     record_size, digest(compiled))
+                    store.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+        return cls(path, compiled)
+
+    def remaining(self):
+
+        """
+        Counts the instances that have not been taken
+
+        :return:            int         The number of unused instances
+        """
+
+        return self.map[HEADER.size:self.data_start].count(UNUSED)
+
+    def take(self, inputs: dict):
+
+        """
+        Takes the next unused instance for a run of the protocol, marking it as
+        used in the file first. The file is locked while the instance is claimed,
+        so that processes sharing the store never take the same instance.
+
+        :param inputs:      dict            The generator's inputs, by wire
+        :return:            Stored_Circuit  The instance
+        """
+
+        with self.lock:
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+            try:
+                instance = self.map.find(UNUSED, HEADER.size+self.next, self.data_start)
+                if instance < 0:
+                    raise ValueError("No unused instances are left in "+self.path)
+                instance -= HEADER.size
+                self.map[HEADER.size+instance] = USED
+                self.map.flush()
+            finally:
+                fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.next = instance+1
+
+        return Stored_Circuit(self, instance, inputs)
+
+    def close(self):
+
+        """
+        Closes the store's file
+
+        :return:            None
+        """
+
+        self.map.close()
+        self.file.close()
+
+
+class Stored_Circuit:
+
+    """
+    An instance taken from a store, which stands in for a Circuit on the
+    generator's side. Its chunks are ranges of the instance's record rather
+    than garbled gates.
+    """
+
+    def __init__(self, store: Garbled_Store, instance: int, inputs: dict):
+
+        """
+        Initializes an instance of a store
+
+        :param store:       Garbled_Store   The store
+        :param instance:    int             The number of the instance
+        :param inputs:      dict            The generator's inputs, by wire
+        """
+
+        self.store = store
+        self.instance = instance
+        self.compiled = store.compiled
+        self.kdf = store.kdf
+        self.record = store.data_start+instance*store.record_size
+        self.decoding_bits = int.from_bytes(store.map[self.record+store.bits_start:self.record+store.tables_start],
+                                            byteorder="little", signed=False)
+
+        # EQ gates become inputs of the generator
+        self.inputs = dict(inputs)
+        for gate_type, input0, output in zip(self.compiled.types, self.compiled.inputs0, self.compiled.outputs):
+            if gate_type == Circuit.EQ_GATE:
+                self.inputs[output] = input0
+
+    def label_value(self, num, activation):
+
+        """
+        Gets the value of the label of an input wire for a certain activation
+
+        :param num:         int         The wire number
+        :param activation:  int         The activation
+        :return:            int         The value of the label
+        """
+
+        start = self.record+(2*self.store.input_position[num]+activation)*Wire.LABEL_BYTES
+        return int.from_bytes(self.store.map[start:start+Wire.LABEL_BYTES], byteorder="little", signed=False)
+
+    def get_wire_corresponding_to(self, num, activation):
+
+        """
+        Gets the label of an input wire for a certain activation
+
+        :param num:         int         The wire number
+        :param activation:  int         The activation
+        :return:            Label       The label
+        """
+
+        return Wire.Label(self.label_value(num, activation))
+
+    def chunks(self, chunk_size=None, pool=None, processes=None):
+
+        """
+        Splits the instance into chunks of chunk_size gates
+
+        :param chunk_size:  int         The number of gates per chunk, or None for one chunk
+        :param pool:        Pool        Unused, since the instance is already garbled
+        :param processes:   int         Unused, since the instance is already garbled
+        :return:            generator   The chunks
+        """
+
+        chunk_size = chunk_size or max(len(self.compiled), 1)
+        offsets = self.store.gate_offsets
+        counts = self.store.output_counts
+        for start in range(0, len(self.compiled), chunk_size):
+            stop = min(start+chunk_size, len(self.compiled))
+            decoding_bits = (self.decoding_bits >> counts[start]) & ((1 << (counts[stop]-counts[start]))-1)
+            yield Stored_Chunk(self.store, start, stop, self.record+self.store.tables_start+offsets[start],
+                               offsets[stop]-offsets[start], decoding_bits)
+
+
+class Stored_Chunk:
+
+    """
+    A range of the gates of a stored instance, where their rows are in the
+    store's file and the decoding bits of its output gates
+    """
+
+    def __init__(self, store: Garbled_Store, start: int, stop: int, offset: int, count: int, decoding_bits: int):
+
+        """
+        Initializes a chunk
+
+        :param store:       Garbled_Store   The store
+        :param start:       int             The index of the first gate
+        :param stop:        int             The index after the last gate
+        :param offset:      int             The offset of the rows of the gates in the file
+        :param count:       int             The number of bytes of the rows
+        :param decoding_bits:   int         The decoding bits of the output gates, in order
+        """
+
+        self.store = store
+        self.start = start
+        self.stop = stop
+        self.offset = offset
+        self.count = count
+        self.decoding_bits = decoding_bits
+
+    def __len__(self):
+        return sum(1 for gate_type in self.store.compiled.types[self.start:self.stop]
+                   if gate_type != Circuit.EQ_GATE)
+
+
+def gate_offsets(compiled, layout: list):
+
+    """
+    Lays out the rows of the gates of a circuit
+
+    :param compiled:            Compiled_Circuit    The circuit
+    :param layout:              list    Whether or not the circuit is garbled with Free-XOR and
+                                        with half gates
+    :return:                    array   The offset of the rows of each gate, and their end
+    """
+
+    rows = {gate_type: Circuit.table_rows(gate_type, *layout) for gate_type in range(Circuit.OR_GATE+1)}
+    offsets = array("Q", [0])
+    offset = 0
+    for gate_type in compiled.types:
+        offset += rows[gate_type]*Wire.LABEL_BYTES
+        offsets.append(offset)
+    return offsets
+
+
+def output_counts(compiled):
+
+    """
+    Counts the output gates of a circuit before each gate, which places the
+    decoding bits of a range of gates
+
+    :param compiled:            Compiled_Circuit    The circuit
+    :return:                    array   The number of output gates before each gate, and in all
+    """
+
+    first_output = compiled.output_wires().start
+    counts = array("I", [0])
+    count = 0
+    for gate_type, output in zip(compiled.types, compiled.outputs):
+        if gate_type != Circuit.EQ_GATE and output >= first_output:
+            count += 1
+        counts.append(count)
+    return counts
+
+
+def input_wires(compiled):
+
+    """
+    Gets the wires whose labels are sent rather than derived, which are the
+    inputs of the parties and the outputs of EQ gates
+
+    :param compiled:            Compiled_Circuit    The circuit
+    :return:                    list                The wires
+    """
+
+    wires = list(range(sum(compiled.input_sizes)))
+    for gate_type, output in zip(compiled.types, compiled.outputs):
+        if gate_type == Circuit.EQ_GATE:
+            wires.append(output)
+    return wires
+
+
+def digest(compiled):
+
+    """
+    Hashes the topology of a circuit, which identifies the circuit of a store
+
+    :param compiled:            Compiled_Circuit    The circuit
+    :return:                    bytes               The digest
+    """
+
+    sizes = array("Q", [compiled.num_wires, len(compiled.input_sizes)]+list(compiled.input_sizes)+
+                  list(compiled.output_sizes))
+    return Utilities.hash(sizes.tobytes()+compiled.types.tobytes()+compiled.inputs0.tobytes()+
+                          compiled.inputs1.tobytes()+compiled.outputs.tobytes())
+
+
+def initialize_party(party_num, prime, generator, uniform1, uniform2, path, inputs_list):
+
+    """
+    Runs instances of the adder from a store, which the generator garbles offline. This
+    is for testing.
+
+    :param party_num:           int     The party number
+    :param prime:               int     The corresponding prime
+    :param generator:           int     The generator for the prime
+    :param uniform1:            int     A random uniform number
+    :param uniform2:            int     A random uniform number
+    :param path:                str     The path of the store
+    :param inputs_list:         list    The inputs of both parties in each instance
+    :return:                    None
+    """
+
+    compiled = YGC.adder_circuit()
+    generator_wires = [0, 2]
+
+    if party_num == 0:
+        start = time.perf_counter()
+        store = Garbled_Store.create(path, compiled, len(inputs_list), YGC.FREE_XOR, YGC.HALF_GATES)
+        print("Garbled "+str(len(inputs_list))+" instances offline in "+str(round(time.perf_counter()-start, 3))+
+              " s")
+        session = YGC.YGC_Generator_Session(HOST, PORT, HOST, PORT+1, prime, generator, uniform1, uniform2,
+                                            YGC.CHUNK_SIZE, 1)
+        try:
+            results = session.run_batch(store.take({wire: inputs[wire] for wire in generator_wires})
+                                        for inputs in inputs_list)
+        finally:
+            session.close()
+            store.close()
+
+        for inputs, outputs in zip(inputs_list, results):
+            print("".join(str(inputs[key]) for key in sorted(inputs.keys()))+": "+
+                  "".join(str(outputs[gate_num]) for gate_num in [4, 3]))
+        print(str(round(session.evaluations_per_second(), 1))+" evaluations per second online")
+
+    else:
+        session = YGC.YGC_Evaluator_Session(HOST, PORT+1, HOST, PORT, prime, generator, uniform1, uniform2,
+                                            compiled=compiled)
+        try:
+            session.run_batch({wire: inputs[wire] for wire in inputs.keys() if wire not in generator_wires}
+                              for inputs in inputs_list)
+        finally:
+            session.close()
+
+
+def main():
+    prime = 2903
+    generator = 5
+    uniform1 = random.randint(1, 2903)
+    uniform2 = random.randint(1, 2903)
+    if uniform1 < uniform2:
+        uniform1, uniform2 = uniform2, uniform1
+    inputs_list = YGC.truth_table(3)
+    path = os.path.join(tempfile.gettempdir(), "adder.ygcs")
+
+    processes = [multiprocessing.Process(target=initialize_party, args=(party_num, prime, generator, uniform1,
+                                                                        uniform2, path, inputs_list))
+                 for party_num in range(2)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
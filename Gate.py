@@ -1,8 +1,14 @@
-import Utilities
+import KDF
 import Wire
 
 
-OUT = "011011110111010101110100"
+# The uses of the KDF within a gate, which are the low bits of its tweaks
+ROW = 0
+GENERATOR_HALF = 1
+EVALUATOR_HALF = 2
+
+# Whether each truth table is linear and its AND form, which the gates of a table share
+forms = dict()
 
 
 class Gate:
@@ -11,61 +17,280 @@ class Gate:
     Corresponds to a single gate in a circuit.
     """
 
-    def __init__(self, gate_num_str: str, gate: dict, inputs: list, output: Wire.Wire,
-                 generate_output_decoding_table=False):
+    def __init__(self, gate_num: int, gate: dict, inputs: list, output: Wire.Wire,
+                 is_output=False, half_gates=False, garble=True, kdf=None):
 
         """
         Initializes a gate in a circuit.
 
-        :param gate_num_str:    str     The gate number represented as a string
+        :param gate_num:        int     The gate number, which is unique in its circuit
         :param gate:            dict    The gate information for the gate
-        :param inputs:          dict    The inputs of a gate
-        :param output:          dict    The outputs of a gate
-        :param generate_output_decoding_table:
-                                bool    Whether or not this is an output of a circuit
-                                        and needs an output decoding table
+        :param inputs:          list    The input wires of a gate
+        :param output:          Wire    The output wire of a gate
+        :param is_output:       bool    Whether or not this is an output of a circuit
+                                        and needs a decoding bit
+        :param half_gates:      bool    Whether or not to garble AND-like gates with the
+                                        two-ciphertext half-gates scheme; requires Free-XOR
+        :param garble:          bool    Whether or not to garble the gate now rather than
+                                        when the circuit is sent
+        :param kdf:             KDF     The KDF to garble with, or None for the default
         """
 
+        if half_gates and output.delta is None:
+            raise ValueError("Half-gates garbling requires Free-XOR wires")
 
         self.gate = gate
-        self.gate_num_str = gate_num_str
+        self.gate_num = gate_num
         self.inputs = inputs
         self.output = output
+        self.is_output = is_output
+        self.half_gates = half_gates
+        self.kdf = kdf or KDF.get()
+        self.classify()
 
-        # Generates a mapping of inputs to outputs
-        self.primitive_garbled_gate = dict()
-        for key, value in gate.items():
-            key_to_wire = list()
-            value_to_wire = self.output.k[value], self.output.p[value]
-            for index, element in enumerate(key):
-                key_to_wire.append((self.inputs[index].k[element], self.inputs[index].p[element]))
-            self.primitive_garbled_gate[tuple(key_to_wire)] = value_to_wire
-
-        # Generates the garbled table
-        self.garbled_table = list()
-        for index in range(2**len(inputs)):
-            bin_index = bin(index)[2:]
-            bin_index = ("0"*(len(inputs)-len(bin_index)))+bin_index
-            bin_index = [int(activation) for activation in list(bin_index)]
-            concated_wire_labels = ""
-            output_wire = ""
+        self.garbled = False
+        if garble:
+            self.garble()
+
+    def garble(self):
+
+        """
+        Garbles the gate. Gates must be garbled in order, since the labels of the
+        output wire of a Free-XOR or half gate are derived from its input labels.
+
+        :return:                None
+        """
+
+        gate = self.gate
+        inputs = self.inputs
+        output = self.output
+        gate_num = self.gate_num
+
+        # Under Free-XOR, the output labels of a linear gate are the XOR of its input labels
+        if self.free:
+            zero_label = output.delta if gate[(0,)*len(inputs)] else Wire.Label(0)
+            for wire in inputs:
+                zero_label ^= wire.k[0]
+            output.set_zero_label(zero_label)
+
+        # Under half-gates, AND-like gates are garbled as a generator half and an evaluator half
+        if self.half_gate:
+            self.garble_half_gate(and_form(gate))
+
+        # Generates the garbled table, with rows ordered by the permute bits of the inputs. Each
+        # row is masked with a hash truncated to the length of a label.
+        if self.free:
+            self.garbled_table = list()
+        elif not self.half_gate:
+            self.map_labels()
+            row_tweak = gate_tweak(gate_num, ROW)
+            rows = list()
             for key in self.primitive_garbled_gate.keys():
-                key_p = [ipt[1] for ipt in key]
-                if key_p == bin_index:
-                    for ipt in key:
-                        concated_wire_labels += ipt[0]
-                    concated_wire_labels += gate_num_str
-                    output_wire = self.primitive_garbled_gate[key][0]+str(self.primitive_garbled_gate[key][1])
-                    break
-            hashed_wire_labels = Utilities.hash(concated_wire_labels)
-            self.garbled_table.append(int.from_bytes(hashed_wire_labels, byteorder="little", signed=False) ^ int(output_wire, 2))
-
-        # Generates the output decoding table
-        self.output_decoding_table = list()
-        if generate_output_decoding_table:
-           for value, wire in enumerate(output.k):
-               self.output_decoding_table.append(int.from_bytes(Utilities.hash(wire+OUT+gate_num_str),
-                                                                byteorder="little", signed=False) ^ value)
+                rows.append((b"".join(label.to_bytes() for label in key), row_tweak))
+            masks = self.kdf.derive_batch(rows, Wire.LABEL_BYTES)
+            self.garbled_table = [0]*(2**len(inputs))
+            for mask, (key, output_label) in zip(masks, self.primitive_garbled_gate.items()):
+                index = 0
+                for label in key:
+                    index = (index << 1) | label.p
+                self.garbled_table[index] = mask ^ output_label.value
+
+        self.garbled = True
+
+    def classify(self):
+
+        """
+        Works out whether the gate is free under Free-XOR or garbled as a half gate
+
+        :return:                None
+        """
+
+        key = tuple(self.gate.items())
+        if key not in forms:
+            forms[key] = (is_linear(self.gate), and_form(self.gate))
+        linear, form = forms[key]
+        self.free = self.output.delta is not None and linear
+        self.half_gate = self.half_gates and not self.free and form is not None
+
+    def map_labels(self):
+
+        """
+        Generates the mapping of input labels to output labels of the gate
+
+        :return:                None
+        """
+
+        self.primitive_garbled_gate = dict()
+        for key, value in self.gate.items():
+            key_to_wire = tuple(self.inputs[index].k[element] for index, element in enumerate(key))
+            self.primitive_garbled_gate[key_to_wire] = self.output.k[value]
+
+    def derives_output(self):
+
+        """
+        Checks whether garbling the gate sets the labels of its output wire, which
+        is the case for Free-XOR and half gates, so that the gates that read the
+        output wire must be garbled after it
+
+        :return:                bool    Whether the gate derives its output labels
+        """
+
+        return self.free or self.half_gate
+
+    def decoding_bit(self):
+
+        """
+        Gets the bit that decodes an output of the circuit, which is the permute bit
+        of the label for 0 of the output wire, so that the output is the permute bit
+        of the output label XORed with it. The gate must be garbled first.
+
+        :return:                int     The decoding bit
+        """
+
+        return self.output.k[0].p
+
+    def adopt(self, garbled: tuple):
+
+        """
+        Takes on the garbling of the gate done by a worker process
+
+        :param garbled:         tuple   The derived label for 0 of the output wire, or None,
+                                        and the garbled tables from Circuit.garble_batch
+        :return:                None
+        """
+
+        zero_label, self.garbled_table = garbled
+        if zero_label is not None:
+            self.output.set_zero_label(Wire.Label(zero_label))
+        self.garbled = True
+
+    def release(self):
+
+        """
+        Releases the garbled tables of the gate once they have been sent
+
+        :return:                None
+        """
+
+        self.garbled_table = None
+
+    def garble_half_gate(self, form):
+
+        """
+        Garbles the gate ((a^alpha)&(b^beta))^gamma with the half-gates scheme of Zahur,
+        Rosulek and Evans (https://eprint.iacr.org/2014/756), which sets the labels of the
+        output wire and leaves two ciphertexts in the garbled table.
+
+        :param form:            tuple   The (alpha, beta, gamma) of the gate
+        :return:                None
+        """
+
+        alpha, beta, gamma = form
+        delta = self.output.delta
+        tweak_g = gate_tweak(self.gate_num, GENERATOR_HALF)
+        tweak_e = gate_tweak(self.gate_num, EVALUATOR_HALF)
+
+        # The labels for which each input of the inner AND is 0
+        a0 = self.inputs[0].k[alpha].value
+        b0 = self.inputs[1].k[beta].value
+        a1 = a0 ^ delta.value
+        b1 = b0 ^ delta.value
+        h_a0, h_a1, h_b0, h_b1 = self.kdf.derive_batch([(label_bytes(a0), tweak_g), (label_bytes(a1), tweak_g),
+                                                        (label_bytes(b0), tweak_e), (label_bytes(b1), tweak_e)],
+                                                       Wire.LABEL_BYTES)
+
+        # The generator half, an AND with the permute bit of b, which the generator knows
+        table_g = h_a0 ^ h_a1 ^ (delta.value if b0 & 1 else 0)
+        w_g0 = h_a0 ^ (table_g if a0 & 1 else 0)
+
+        # The evaluator half, an AND with b XOR its permute bit, which the evaluator knows
+        table_e = h_b0 ^ h_b1 ^ a0
+        w_e0 = h_b0 ^ (table_e ^ a0 if b0 & 1 else 0)
+
+        zero_label = Wire.Label(w_g0 ^ w_e0)
+        self.output.set_zero_label(zero_label ^ delta if gamma else zero_label)
+        self.garbled_table = [table_g, table_e]
+
+
+def evaluate_half_gate(a: int, b: int, garbled_table: list, gate_num: int, kdf: KDF.KDF):
+
+    """
+    Evaluates a gate garbled with the half-gates scheme
+
+    :param a:                   int     The value of the label of the first input
+    :param b:                   int     The value of the label of the second input
+    :param garbled_table:       list    The two ciphertexts of the gate
+    :param gate_num:            int     The gate number
+    :param kdf:                 KDF     The KDF the gate was garbled with
+    :return:                    int     The value of the output label
+    """
+
+    table_g, table_e = garbled_table
+    h_a, h_b = kdf.derive_batch([(label_bytes(a), gate_tweak(gate_num, GENERATOR_HALF)),
+                                 (label_bytes(b), gate_tweak(gate_num, EVALUATOR_HALF))], Wire.LABEL_BYTES)
+    w_g = h_a ^ (table_g if a & 1 else 0)
+    w_e = h_b ^ (table_e ^ a if b & 1 else 0)
+    return w_g ^ w_e
+
+
+def gate_tweak(gate_num: int, use: int):
+
+    """
+    Gets the tweak of a use of the KDF within a gate
+
+    :param gate_num:            int     The gate number
+    :param use:                 int     The use: ROW, GENERATOR_HALF or EVALUATOR_HALF
+    :return:                    int     The tweak
+    """
+
+    return (gate_num << 2) | use
+
+
+def label_bytes(value: int):
+
+    """
+    Gets the raw bytes of the value of a label
+
+    :param value:               int     The value of the label
+    :return:                    bytes   The LABEL_BYTES bytes of the label
+    """
+
+    return value.to_bytes(Wire.LABEL_BYTES, byteorder="little", signed=False)
+
+
+def and_form(gate: dict):
+
+    """
+    Writes a two input gate as ((a^alpha)&(b^beta))^gamma if it can be written that way,
+    which is the case for AND, OR, NAND, NOR and the other gates with an odd number of 1s.
+
+    :param gate:                dict    The gate information for a gate
+    :return:                    tuple   The (alpha, beta, gamma) of the gate, or None
+    """
+
+    if len(gate) != 4:
+        return None
+    ones = [key for key, value in gate.items() if value == 1]
+    zeros = [key for key, value in gate.items() if value == 0]
+    if len(ones) == 1:
+        return 1-ones[0][0], 1-ones[0][1], 0
+    elif len(zeros) == 1:
+        return 1-zeros[0][0], 1-zeros[0][1], 1
+    return None
+
+
+def is_linear(gate: dict):
+
+    """
+    Checks whether a gate computes the XOR of all of its inputs, possibly negated.
+    Such gates (XOR, XNOR and NOT) need no garbled table under Free-XOR.
+
+    :param gate:                dict    The gate information for a gate
+    :return:                    bool    Whether the gate is linear
+    """
+
+    negated = gate[(0,)*len(next(iter(gate)))]
+    return all(value == negated ^ (sum(key) & 1) for key, value in gate.items())
 
 
 def AND():
@@ -101,6 +326,28 @@ def XOR():
     return {(0, 0): 0, (0, 1): 1, (1, 0): 1, (1, 1): 0}
 
 
+def XNOR():
+
+    """
+    Corresponds to the gate information for an XNOR gate.
+
+    :return:                    dict    The gate information for an XNOR gate
+    """
+
+    return {(0, 0): 1, (0, 1): 0, (1, 0): 0, (1, 1): 1}
+
+
+def BUF():
+
+    """
+    Corresponds to the gate information for a BUF gate, which copies its input.
+
+    :return:                    dict    The gate information for a BUF gate
+    """
+
+    return {(0,): 0, (1,): 1}
+
+
 def NOT():
 
     """
@@ -115,7 +362,7 @@ def NOT():
 def main():
     inputs = [Wire.Wire() for _ in range(2)]
     output = Wire.Wire()
-    Gate("00", AND(), inputs, output, True)
+    Gate(0, AND(), inputs, output, True)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
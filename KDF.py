@@ -0,0 +1,305 @@
+import hashlib
+import nacl.bindings
+import os
+import time
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:
+    Cipher = None
+
+
+"""
+Author: Chris Murphy (crm4042@g.rit.edu)
+"""
+
+TWEAK_BYTES = 16
+DEFAULT = "blake2b"
+
+# The public key of the fixed-key cipher and the reduction of the doubling in GF(2^128)
+FIXED_KEY = bytes(range(16))
+BLOCK_BYTES = 16
+BLOCK_MASK = (1 << 128)-1
+REDUCTION = 0x87
+
+# The fixed-key cipher's block counter takes the top byte of the tweak, which tweaks leave clear
+COUNTER_SHIFT = 120
+MAX_BLOCKS = 256
+
+
+class KDF:
+
+    """
+    Derives the masks of a garbled circuit from the raw bytes of one or more
+    labels and an integer tweak, which is unique to a gate and the use of the
+    mask. Backends implement derive_batch, which hashes many rows in one call.
+    """
+
+    name = None
+
+    def derive(self, labels: bytes, tweak: int, size: int):
+
+        """
+        Derives a single mask
+
+        :param labels:          bytes   The raw bytes of the labels
+        :param tweak:           int     The tweak
+        :param size:            int     The size of the mask in bytes
+        :return:                int     The mask
+        """
+
+        return self.derive_batch([(labels, tweak)], size)[0]
+
+    def derive_batch(self, rows: list, size: int):
+
+        """
+        Derives a mask for each of many rows
+
+        :param rows:            list    The (labels, tweak) of each row
+        :param size:            int     The size of each mask in bytes
+        :return:                list    The masks
+        """
+
+        raise NotImplementedError
+
+    def derive_bytes(self, rows: list, size: int):
+
+        """
+        Derives a mask for each of many rows as raw bytes, for evaluators that
+        keep labels as bytes
+
+        :param rows:            list    The (labels, tweak) of each row
+        :param size:            int     The size of each mask in bytes
+        :return:                bytes   The masks, each of size bytes in little-endian order, in order
+        """
+
+        return b"".join([mask.to_bytes(size, byteorder="little", signed=False)
+                         for mask in self.derive_batch(rows, size)])
+
+    def derive_packed(self, labels: bytes, width: int, tweaks: bytes, size: int):
+
+        """
+        Derives a mask for each of many rows given as packed bytes, for evaluators
+        that keep labels and tweaks in arrays, so that no row is built as a tuple
+
+        :param labels:          bytes   The raw bytes of the labels of each row, width bytes a row
+        :param width:           int     The number of bytes of the labels of a row
+        :param tweaks:          bytes   The tweak of each row, TWEAK_BYTES bytes in little-endian order
+        :param size:            int     The size of each mask in bytes
+        :return:                bytes   The masks, each of size bytes in little-endian order, in order
+        """
+
+        return self.derive_bytes([(labels[start:start+width], int.from_bytes(tweaks[tweak:tweak+TWEAK_BYTES],
+                                                                             byteorder="little", signed=False))
+                                  for start, tweak in zip(range(0, len(labels), width),
+                                                          range(0, len(tweaks), TWEAK_BYTES))], size)
+
+
+class Blake2b_KDF(KDF):
+
+    """
+    Derives masks with BLAKE2b, with the tweak as its salt. Masks of up to 64
+    bytes take a single call.
+    """
+
+    name = "blake2b"
+
+    def derive_batch(self, rows: list, size: int):
+        blake2b = hashlib.blake2b
+        if size > blake2b.MAX_DIGEST_SIZE:
+            return [expand(lambda data: blake2b(data).digest(), labels+tweak.to_bytes(TWEAK_BYTES, "little"), size)
+                    for labels, tweak in rows]
+        return [int.from_bytes(blake2b(labels, digest_size=size, salt=tweak.to_bytes(TWEAK_BYTES, "little")).digest(),
+                               byteorder="little", signed=False) for labels, tweak in rows]
+
+    def derive_bytes(self, rows: list, size: int):
+        blake2b = hashlib.blake2b
+        if size > blake2b.MAX_DIGEST_SIZE:
+            return super().derive_bytes(rows, size)
+        return b"".join([blake2b(labels, digest_size=size, salt=tweak.to_bytes(TWEAK_BYTES, "little")).digest()
+                         for labels, tweak in rows])
+
+    def derive_packed(self, labels: bytes, width: int, tweaks: bytes, size: int):
+        blake2b = hashlib.blake2b
+        if size > blake2b.MAX_DIGEST_SIZE:
+            return super().derive_packed(labels, width, tweaks, size)
+        labels = memoryview(labels)
+        tweaks = memoryview(tweaks)
+        return b"".join([blake2b(labels[start:start+width], digest_size=size,
+                                 salt=tweaks[tweak:tweak+TWEAK_BYTES]).digest()
+                         for start, tweak in zip(range(0, len(labels), width), range(0, len(tweaks), TWEAK_BYTES))])
+
+
+class SHA512_256_KDF(KDF):
+
+    """
+    Derives masks with SHA-512/256 of the labels and the tweak, expanded with a
+    counter beyond 32 bytes
+    """
+
+    name = "sha512_256"
+
+    def __init__(self):
+        self.empty = hashlib.new("sha512_256")
+
+    def derive_batch(self, rows: list, size: int):
+        empty = self.empty
+
+        def digest(data):
+            hashed = empty.copy()
+            hashed.update(data)
+            return hashed.digest()
+
+        if size > empty.digest_size:
+            return [expand(digest, labels+tweak.to_bytes(TWEAK_BYTES, "little"), size) for labels, tweak in rows]
+        return [int.from_bytes(digest(labels+tweak.to_bytes(TWEAK_BYTES, "little"))[:size], byteorder="little",
+                               signed=False) for labels, tweak in rows]
+
+
+class SHA512_KDF(KDF):
+
+    """
+    Derives masks with SHA-512 of the labels and the tweak, which is the hash of
+    Utilities.hash
+    """
+
+    name = "sha512"
+
+    def derive_batch(self, rows: list, size: int):
+        sha512 = nacl.bindings.crypto_hash_sha512
+        if size > nacl.bindings.crypto_hash_sha512_BYTES:
+            return [expand(sha512, labels+tweak.to_bytes(TWEAK_BYTES, "little"), size) for labels, tweak in rows]
+        return [int.from_bytes(sha512(labels+tweak.to_bytes(TWEAK_BYTES, "little"))[:size], byteorder="little",
+                               signed=False) for labels, tweak in rows]
+
+
+class Fixed_Key_KDF(KDF):
+
+    """
+    Derives masks with a fixed-key AES permutation pi as pi(x)^x, where x = 2A^4B^...^T
+    for labels A, B, ... and tweak T, doubled in GF(2^128), following Bellare, Hoang,
+    Keelveedhi and Rogaway (https://eprint.iacr.org/2013/426). A block counter in the
+    top byte of T gives masks longer than a block, so tweaks must fit in the 120 bits
+    below it for no two blocks of any rows to share an x. All of the blocks of a batch
+    are encrypted in one call. This needs the cryptography package.
+    """
+
+    name = "fixed_key_aes"
+
+    def __init__(self):
+        if Cipher is None:
+            raise ValueError("The fixed-key cipher needs the cryptography package")
+        self.encryptor = Cipher(algorithms.AES(FIXED_KEY), modes.ECB()).encryptor()
+
+    def derive_batch(self, rows: list, size: int):
+        blocks = -(-size // BLOCK_BYTES)
+        if blocks > MAX_BLOCKS:
+            raise ValueError("The fixed-key cipher derives masks of at most "+str(MAX_BLOCKS*BLOCK_BYTES)+" bytes")
+        inputs = list()
+        for labels, tweak in rows:
+            if tweak >> COUNTER_SHIFT:
+                raise ValueError("The fixed-key cipher's tweaks are at most "+str(COUNTER_SHIFT)+" bits")
+            x = tweak
+            for start in range(0, len(labels), BLOCK_BYTES):
+                x ^= double(int.from_bytes(labels[start:start+BLOCK_BYTES], byteorder="little", signed=False),
+                            start // BLOCK_BYTES + 1)
+            for block in range(blocks):
+                inputs.append(x ^ (block << COUNTER_SHIFT))
+
+        encrypted = self.encryptor.update(b"".join(x.to_bytes(BLOCK_BYTES, "little") for x in inputs))
+        masks = list()
+        for row in range(len(rows)):
+            mask = 0
+            for block in range(blocks):
+                index = row*blocks+block
+                pi = int.from_bytes(encrypted[index*BLOCK_BYTES:(index+1)*BLOCK_BYTES], byteorder="little",
+                                    signed=False)
+                mask |= (pi ^ inputs[index]) << (block*8*BLOCK_BYTES)
+            masks.append(mask & ((1 << (8*size))-1))
+        return masks
+
+
+BACKENDS = {Blake2b_KDF.name: Blake2b_KDF, SHA512_256_KDF.name: SHA512_256_KDF, SHA512_KDF.name: SHA512_KDF,
+            Fixed_Key_KDF.name: Fixed_Key_KDF}
+instances = dict()
+
+
+def get(name=DEFAULT):
+
+    """
+    Gets the KDF of a backend
+
+    :param name:                str     The name of the backend
+    :return:                    KDF     The KDF
+    """
+
+    if name not in instances:
+        if name not in BACKENDS:
+            raise ValueError("Unknown KDF "+str(name))
+        instances[name] = BACKENDS[name]()
+    return instances[name]
+
+
+def available():
+
+    """
+    Gets the names of the backends that can run here
+
+    :return:                    list    The names of the backends
+    """
+
+    names = list()
+    for name in BACKENDS.keys():
+        try:
+            get(name)
+            names.append(name)
+        except ValueError:
+            pass
+    return names
+
+
+def expand(digest, data: bytes, size: int):
+
+    """
+    Expands a hash to a mask longer than its digest by hashing with a counter
+
+    :param digest:              function    The hash, from bytes to bytes
+    :param data:                bytes   The data to hash
+    :param size:                int     The size of the mask in bytes
+    :return:                    int     The mask
+    """
+
+    output = b""
+    counter = 0
+    while len(output) < size:
+        output += digest(data+bytes([counter]))
+        counter += 1
+    return int.from_bytes(output[:size], byteorder="little", signed=False)
+
+
+def double(x: int, times: int):
+
+    """
+    Doubles an element of GF(2^128) a number of times
+
+    :param x:                   int     The element
+    :param times:               int     The number of times to double it
+    :return:                    int     The doubled element
+    """
+
+    for _ in range(times):
+        x = ((x << 1) & BLOCK_MASK) ^ (REDUCTION if x >> 127 else 0)
+    return x
+
+
+def main():
+    rows = [(os.urandom(32), tweak) for tweak in range(100000)]
+    for name in available():
+        kdf = get(name)
+        start = time.time()
+        kdf.derive_batch(rows, 16)
+        print(name+": "+str((time.time()-start)*1e6/len(rows))+" us per row")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+import KDF
+
+import contextlib
+import os
+import threading
+import time
+
+
+"""
+Author: Chris Murphy (crm4042@g.rit.edu)
+"""
+
+# Stands in for the phase of a disabled recorder
+NULL_PHASE = contextlib.nullcontext()
+
+
+class Hook:
+
+    """
+    Receives each measurement of a recorder as it is taken, so that it can be
+    exported to a metrics system. Subclasses override the measurements they
+    export.
+    """
+
+    def phase(self, name: str, wall: float, cpu: float):
+
+        """
+        Receives the time of a phase
+
+        :param name:            str     The name of the phase
+        :param wall:            float   The wall time of the phase in seconds
+        :param cpu:             float   The CPU time of the process during the phase in seconds
+        :return:                None
+        """
+
+        pass
+
+    def count(self, name: str, amount: int):
+
+        """
+        Receives an increment of a counter
+
+        :param name:            str     The name of the counter
+        :param amount:          int     The increment
+        :return:                None
+        """
+
+        pass
+
+
+class Recorder:
+
+    """
+    Records the wall and CPU time of the phases of a protocol and counters such
+    as the messages and bytes a node sends, and passes each measurement to its
+    hooks. Instrumented code takes None in place of a recorder when it is
+    disabled, which costs no more than a check per phase or message.
+    """
+
+    def __init__(self, hooks=None):
+
+        """
+        Initializes an empty recorder
+
+        :param hooks:           list    The hooks to pass the measurements to
+        """
+
+        self.phases = dict()
+        self.counters = dict()
+        self.hooks = list(hooks or [])
+
+        # Nodes count from their listener threads
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+
+        """
+        Times the code run in the context as a phase. A phase may run many times,
+        and its times add up.
+
+        :param name:            str     The name of the phase
+        :return:                context The context of the phase
+        """
+
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter()-wall, time.process_time()-cpu)
+
+    def record(self, name: str, wall: float, cpu: float):
+
+        """
+        Adds the time of a run of a phase
+
+        :param name:            str     The name of the phase
+        :param wall:            float   The wall time in seconds
+        :param cpu:             float   The CPU time in seconds
+        :return:                None
+        """
+
+        with self.lock:
+            times = self.phases.setdefault(name, [0.0, 0.0, 0])
+            times[0] += wall
+            times[1] += cpu
+            times[2] += 1
+        for hook in self.hooks:
+            hook.phase(name, wall, cpu)
+
+    def count(self, name: str, amount: int = 1):
+
+        """
+        Increments a counter
+
+        :param name:            str     The name of the counter
+        :param amount:          int     The increment
+        :return:                None
+        """
+
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0)+amount
+        for hook in self.hooks:
+            hook.count(name, amount)
+
+    def report(self):
+
+        """
+        Builds a report of the measurements so far
+
+        :return:                dict    The wall time, CPU time and runs of each phase, the
+                                        counters, and the hashes per gate when both are counted
+        """
+
+        with self.lock:
+            report = {"phases": {name: {"wall": wall, "cpu": cpu, "calls": calls}
+                                 for name, (wall, cpu, calls) in self.phases.items()},
+                      "counters": dict(self.counters)}
+        if report["counters"].get("gates"):
+            report["hashes_per_gate"] = report["counters"].get("hashes", 0)/report["counters"]["gates"]
+        return report
+
+
+class Counting_KDF(KDF.KDF):
+
+    """
+    Counts the hashes of a KDF into a recorder. Its name is that of the KDF, so
+    processes that garble by name use the KDF itself and their hashes are not
+    counted.
+    """
+
+    def __init__(self, kdf: KDF.KDF, recorder: Recorder):
+
+        """
+        Wraps a KDF
+
+        :param kdf:             KDF         The KDF
+        :param recorder:        Recorder    The recorder to count the hashes into
+        """
+
+        self.kdf = kdf
+        self.name = kdf.name
+        self.recorder = recorder
+
+    def derive_batch(self, rows: list, size: int):
+        self.recorder.count("hashes", len(rows))
+        return self.kdf.derive_batch(rows, size)
+
+    def derive_bytes(self, rows: list, size: int):
+        self.recorder.count("hashes", len(rows))
+        return self.kdf.derive_bytes(rows, size)
+
+    def derive_packed(self, labels: bytes, width: int, tweaks: bytes, size: int):
+        self.recorder.count("hashes", len(tweaks)//KDF.TWEAK_BYTES)
+        return self.kdf.derive_packed(labels, width, tweaks, size)
+
+
+def phase(recorder, name: str):
+
+    """
+    Times a phase, unless the recorder is disabled
+
+    :param recorder:            Recorder    The recorder, or None if it is disabled
+    :param name:                str         The name of the phase
+    :return:                    context     The context of the phase
+    """
+
+    return NULL_PHASE if recorder is None else recorder.phase(name)
+
+
+def counting_kdf(kdf: KDF.KDF, recorder):
+
+    """
+    Counts the hashes of a KDF, unless the recorder is disabled
+
+    :param kdf:                 KDF         The KDF
+    :param recorder:            Recorder    The recorder, or None if it is disabled
+    :return:                    KDF         The KDF to hash with
+    """
+
+    return kdf if recorder is None else Counting_KDF(kdf, recorder)
+
+
+def main():
+    class Print_Hook(Hook):
+        def phase(self, name, wall, cpu):
+            print(name+": "+str(wall)+" s wall, "+str(cpu)+" s CPU")
+
+    recorder = Recorder([Print_Hook()])
+    kdf = counting_kdf(KDF.get(), recorder)
+    with phase(recorder, "hash"):
+        kdf.derive_batch([(os.urandom(32), tweak) for tweak in range(10000)], 16)
+    recorder.count("gates", 5000)
+    print(recorder.report())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,8 @@
 import asyncio
-import json
 import multiprocessing
 import select
 import socket
+import struct
 import time
 import threading
 
@@ -19,7 +19,7 @@ class Node:
 	communication between parties
 	"""
 
-	def __init__(self, host, port):
+	def __init__(self, host, port, recorder=None):
 		
 		"""
 		Initializes the connection for the node.
@@ -27,17 +27,30 @@ class Node:
 		:param self:	Node	The node object.
 		:param host:	str		The hostname.
 		:param port: 	int		The port number.
+		:param recorder: Recorder	Counts the messages and bytes sent and received, or None
 		"""
 
 		self.host = host
 		self.port = port
 		self.stop = False
+		self.recorder = recorder
 
+		# The messages of each channel, where channel 0 is the node's own
 		self.message_list = list()
+		self.channel_lists = {0: self.message_list}
+		self.next_channel = 1
+
+		# Wakes the receivers waiting on a message list when a message arrives
+		self.arrived = threading.Condition()
+
+		# Why no more messages can arrive, once the listener stops or the partners close
+		self.failure = None
 
 		# Creates the server
 		self.socket_server = socket.socket(socket.AF_INET, \
 			socket.SOCK_STREAM)
+		# Lets a new node rebind the port while the last one's connections linger
+		self.socket_server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 		# print("Bound to "+str((self.host, self.port)))
 		self.socket_server.bind((self.host, self.port))
 		self.socket_server.listen()
@@ -50,8 +63,7 @@ class Node:
 
 		# Creates a listener daemon
 		self.listener = threading.Thread(name='daemon',\
-			target=self.listen)
-		self.listener.setDaemon(True)
+			target=self.listen, daemon=True)
 	
 	def connect(self, addr_list):
 		
@@ -67,11 +79,17 @@ class Node:
 			#print("Finished connecting to server")
 
 		def connect_client(addr):
-			time.sleep(1)
 			#print("Connecting to client at "+str(addr))
-			client = socket.socket(socket.AF_INET, \
-				socket.SOCK_STREAM)
-			client.connect(addr)
+			# Retries until the partner's server is listening
+			while True:
+				client = socket.socket(socket.AF_INET, \
+					socket.SOCK_STREAM)
+				try:
+					client.connect(addr)
+					break
+				except ConnectionRefusedError:
+					client.close()
+					time.sleep(CONNECT_RETRY)
 			self.socket_clients_lock.acquire()
 			self.socket_clients[addr] = client
 			self.socket_clients_lock.release()
@@ -104,29 +122,60 @@ class Node:
 	def listen(self):
 		
 		"""
-		Listens for incoming communications
-		"""
-
-		while not self.stop:
-			receiving_connections = dict()
-			for client in self.server_connections.values():
-				receiving_connections[client.fileno()] = client
-			read, _, _ = select.select(list(receiving_connections.keys()), [], [], .1)
-			for connection in read:
-				received = receiving_connections[connection].recv(16384)
-				received_str = str(received, encoding='utf-8')
-				if len(received_str) > 0:
-					try:
-						message = json.loads(received_str)
-						if message is not None:
-							self.message_list.append(message)
-					except:
-						print()
-
-		for client in self.socket_clients.values():
-			client.close()
-		
-		self.socket_server.close()
+		Listens for incoming communications. If it stops, it wakes the receivers
+		still waiting, which then raise an error rather than waiting forever.
+		"""
+
+		buffers = dict()
+		try:
+			while not self.stop:
+				receiving_connections = dict()
+				for addr, client in self.server_connections.items():
+					receiving_connections[client.fileno()] = addr
+				read, _, _ = select.select(list(receiving_connections.keys()), [], [], .1)
+				for connection in read:
+					addr = receiving_connections[connection]
+					received = self.server_connections[addr].recv(RECV_SIZE)
+					if len(received) > 0:
+						# Frames may be split across or packed into receives
+						buffer = buffers.setdefault(connection, bytearray())
+						buffer += received
+						frames = read_frames(buffer)
+						if self.recorder is not None:
+							self.recorder.count("bytes_received", len(received))
+							self.recorder.count("messages_received", len(frames))
+						for channel, message in frames:
+							if message is not None:
+								self.deliver(message, channel)
+					else:
+						# The partner closed the connection, so it is no longer selected
+						self.server_connections.pop(addr).close()
+						if len(self.server_connections) == 0:
+							self.fail(ConnectionError("The partners closed their connections"))
+		except Exception as error:
+			self.fail(error)
+		finally:
+			self.fail(ConnectionError("The node is closed"))
+
+			for client in self.socket_clients.values():
+				client.close()
+			
+			self.socket_server.close()
+
+	def fail(self, error):
+
+		"""
+		Records why no more messages can arrive, unless a reason is already
+		recorded, and wakes the receivers waiting on messages
+
+		:param error: 			Exception	The reason
+		:return: 				None
+		"""
+
+		with self.arrived:
+			if self.failure is None:
+				self.failure = error
+			self.arrived.notify_all()
 
 	def close(self):
 
@@ -136,43 +185,818 @@ class Node:
 		"""
 
 		self.stop = True
-		time.sleep(3)
-		while self.listener.isAlive():
-			pass
+		if self.listener.is_alive():
+			self.listener.join()
 
-	def send_messages(self, message_dict):
+	def send_messages(self, message_dict, channel=0):
 
 		"""
 		Sends a set of messages
 
 		:param message_dict: 	dict	The messages to send in the form {addr: msg}
+		:param channel: 		int		The channel to send the messages on
+		:return: 				None
+		"""
+
+		for addr in message_dict.keys():
+			if addr == (self.host, self.port):
+				if message_dict[addr] != None:
+					self.deliver(message_dict[addr], channel)
+			else:
+				data = frame(message_dict[addr], channel)
+				self.socket_clients[addr].sendall(data)
+				if self.recorder is not None:
+					self.recorder.count("bytes_sent", len(data))
+					self.recorder.count("messages_sent")
+
+	def send_file(self, addr, message, file, offset, count, channel=0):
+
+		"""
+		Sends a list message whose last element is bytes read from a file. The
+		bytes go from the file to the socket with sendfile, without being
+		copied through the process.
+
+		:param addr: 			tuple	The address to send the message to
+		:param message: 		list	The elements of the message before the bytes
+		:param file: 					The file, opened for reading in binary mode
+		:param offset: 			int		The offset of the bytes in the file
+		:param count: 			int		The number of bytes
+		:param channel: 		int		The channel to send the message on
+		:return: 				None
+		"""
+
+		if addr == (self.host, self.port):
+			file.seek(offset)
+			self.deliver(list(message)+[file.read(count)], channel)
+			return
+
+		head = file_head(message, count, channel)
+		client = self.socket_clients[addr]
+		client.sendall(head)
+		if count > 0:
+			client.sendfile(file, offset, count)
+		if self.recorder is not None:
+			self.recorder.count("bytes_sent", len(head)+count)
+			self.recorder.count("messages_sent")
+
+	def deliver(self, message, channel):
+
+		"""
+		Appends a received message to its channel and wakes the receivers
+		waiting on it
+
+		:param message: 				The message
+		:param channel: 		int		The channel the message arrived on
+		:return: 				None
+		"""
+
+		with self.arrived:
+			self.get_channel_list(channel).append(message)
+			self.arrived.notify_all()
+
+	def get_message_at(self, index, release=False, channel=0, timeout=None):
+
+		"""
+		Gets the message at a certain index in the message list, blocking
+		until it arrives. Raises a ConnectionError if it can no longer arrive.
+
+		:param index: 			int		The index to get the message at
+		:param release: 		bool	Whether or not to drop the node's reference
+										to the message once it is returned
+		:param channel: 		int		The channel to get the message from
+		:param timeout: 		float	The most seconds to wait, or None to wait forever
+		:return: 						The message at the index
+		"""
+
+		with self.arrived:
+			message_list = self.get_channel_list(channel)
+			if not self.arrived.wait_for(lambda: len(message_list) > index or \
+				self.failure is not None, timeout):
+				raise TimeoutError("No message at index "+str(index)+" of channel "+\
+					str(channel)+" after "+str(timeout)+" seconds")
+			if len(message_list) <= index:
+				raise ConnectionError("No message at index "+str(index)+" of channel "+\
+					str(channel)+" can arrive") from self.failure
+		message = message_list[index]
+		if release:
+			message_list[index] = None
+		return message
+
+	def get_channel_list(self, channel):
+
+		"""
+		Gets the message list of a channel, which is created by the first
+		message on it from either side
+
+		:param channel: 		int		The channel
+		:return: 				list	The messages received on the channel
+		"""
+
+		return self.channel_lists.setdefault(channel, list())
+
+	def open_channel(self):
+
+		"""
+		Opens the next logical channel over the node's connections. Both parties
+		must open their channels in the same order for the channels to match.
+
+		:return: 				Channel	The channel
+		"""
+
+		channel = Channel(self, self.next_channel)
+		self.next_channel += 1
+		return channel
+
+	def close_channel(self, channel):
+
+		"""
+		Drops the messages of a channel that is no longer used
+
+		:param channel: 		int		The channel
+		:return: 				None
+		"""
+
+		with self.arrived:
+			self.channel_lists.pop(channel, None)
+
+
+class Channel:
+
+	"""
+	Represents a logical channel over a node's connections. It has its own
+	message list, so that a sub-protocol such as an OT can run over an open
+	connection without disturbing the indices of the node's own messages.
+	Over an Async_Node, sending and receiving return awaitables.
+	"""
+
+	def __init__(self, node, channel):
+
+		"""
+		Initializes the channel
+
+		:param node: 			Node	The node the channel runs over
+		:param channel: 		int		The number of the channel
+		"""
+
+		self.node = node
+		self.channel = channel
+
+	def open_channel(self):
+
+		"""
+		Opens the next logical channel over the node's connections
+
+		:return: 				Channel	The channel
+		"""
+
+		return self.node.open_channel()
+
+	def send_messages(self, message_dict):
+
+		"""
+		Sends a set of messages on the channel
+
+		:param message_dict: 	dict	The messages to send in the form {addr: msg}
+		:return: 				None
+		"""
+
+		return self.node.send_messages(message_dict, self.channel)
+
+	def send_file(self, addr, message, file, offset, count):
+
+		"""
+		Sends a list message on the channel whose last element is bytes read
+		from a file
+
+		:param addr: 			tuple	The address to send the message to
+		:param message: 		list	The elements of the message before the bytes
+		:param file: 					The file, opened for reading in binary mode
+		:param offset: 			int		The offset of the bytes in the file
+		:param count: 			int		The number of bytes
+		:return: 				None
+		"""
+
+		return self.node.send_file(addr, message, file, offset, count, self.channel)
+
+	def get_message_at(self, index, release=False, timeout=None):
+
+		"""
+		Gets the message at a certain index in the channel's message list,
+		blocking until it arrives
+
+		:param index: 			int		The index to get the message at
+		:param release: 		bool	Whether or not to drop the node's reference
+										to the message once it is returned
+		:param timeout: 		float	The most seconds to wait, or None to wait forever
+		:return: 						The message at the index
+		"""
+
+		return self.node.get_message_at(index, release, self.channel, timeout)
+
+	def close(self):
+
+		"""
+		Closes the channel, dropping its messages
+
+		:return: 				None
+		"""
+
+		self.node.close_channel(self.channel)
+
+
+class Async_Node:
+
+	"""
+	Represents a node of communication for point-to-point communication
+	between parties over asyncio streams. It has the send and receive
+	semantics of Node, but every connection is served by a task on the
+	event loop rather than by threads, so that many sessions can share
+	one loop. A connection stops being read while the messages received
+	but not yet gotten pass a high-water mark, so that a partner sending
+	faster than the node's receivers get its messages waits on its send
+	buffer rather than filling the node's memory.
+	"""
+
+	def __init__(self, host, port, recorder=None, high_water=None):
+
+		"""
+		Initializes the node. The server starts once the node connects.
+
+		:param self:	Async_Node	The node object.
+		:param host:	str		The hostname.
+		:param port: 	int		The port number.
+		:param recorder: Recorder	Counts the messages and bytes sent and received, or None
+		:param high_water: int	The bytes of messages received but not yet gotten above
+								which the node stops reading its connections, or None
+								for HIGH_WATER
+		"""
+
+		self.host = host
+		self.port = port
+		self.recorder = recorder
+		self.high_water = HIGH_WATER if high_water is None else high_water
+
+		# The messages of each channel, where channel 0 is the node's own
+		self.message_list = list()
+		self.channel_lists = {0: self.message_list}
+		self.next_channel = 1
+
+		# Wakes the receivers waiting on a message list when a message arrives,
+		# and the readers paused at the high-water mark when messages are gotten
+		self.arrived = asyncio.Condition()
+
+		# The size of each received message that has not been gotten, by channel and index,
+		# their total, the number of receivers waiting on a message that has not arrived and
+		# the number of readers paused at the high-water mark
+		self.unread = dict()
+		self.pending = 0
+		self.waiting = 0
+		self.paused = 0
+
+		# Why no more messages can arrive, once a reader fails, the partners close or the node closes
+		self.failure = None
+
+		self.socket_server = None
+		self.server_connections = list()
+		self.listening = 0
+		self.socket_clients = dict()
+		self.readers = list()
+
+	async def connect(self, addr_list):
+
+		"""
+		Connects to other addresses
+
+		:param addr_list: 		list	The addresses of the parties, which may include the node's own
+		:return: 				None
+		"""
+
+		partners = [addr for addr in addr_list if addr != (self.host, self.port)]
+		accepted = asyncio.Event()
+
+		def connect_server(reader, writer):
+			self.server_connections.append(writer)
+			self.listening += 1
+			self.readers.append(asyncio.create_task(self.listen(reader)))
+			if len(self.server_connections) == len(partners):
+				accepted.set()
+
+		async def connect_client(addr):
+			# Retries until the partner's server is listening
+			while True:
+				try:
+					_, writer = await asyncio.open_connection(*addr)
+					break
+				except ConnectionRefusedError:
+					await asyncio.sleep(CONNECT_RETRY)
+			self.socket_clients[addr] = writer
+
+		self.socket_server = await asyncio.start_server(connect_server, self.host, self.port, \
+			reuse_address=True)
+		await asyncio.gather(*[connect_client(addr) for addr in partners])
+		if len(partners) > 0:
+			await accepted.wait()
+
+	async def listen(self, reader):
+
+		"""
+		Receives the frames of one connection until the partner closes it. If
+		it fails, or the last partner closes, it wakes the receivers still
+		waiting, which then raise an error rather than waiting forever.
+
+		:param reader: 			StreamReader	The connection's reader
+		:return: 				None
+		"""
+
+		try:
+			while True:
+				# Pauses at the high-water mark, unless a receiver waits on a message
+				# that may be behind the ones it has not gotten
+				if self.pending >= self.high_water and self.waiting == 0:
+					async with self.arrived:
+						self.paused += 1
+						try:
+							await self.arrived.wait_for(lambda: self.pending < self.high_water or \
+								self.waiting > 0)
+						finally:
+							self.paused -= 1
+
+				length, channel = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+				message, _ = decode(await reader.readexactly(length), 0)
+				if self.recorder is not None:
+					self.recorder.count("bytes_received", FRAME_HEADER.size+length)
+					self.recorder.count("messages_received")
+				if message is not None:
+					await self.deliver(message, channel, length)
+		except asyncio.IncompleteReadError:
+			# The partner closed the connection
+			self.listening -= 1
+			if self.listening == 0:
+				await self.fail(ConnectionError("The partners closed their connections"))
+		except Exception as error:
+			self.listening -= 1
+			await self.fail(error)
+
+	async def fail(self, error):
+
+		"""
+		Records why no more messages can arrive, unless a reason is already
+		recorded, and wakes the receivers waiting on messages
+
+		:param error: 			Exception	The reason
+		:return: 				None
+		"""
+
+		async with self.arrived:
+			if self.failure is None:
+				self.failure = error
+			self.arrived.notify_all()
+
+	async def close(self):
+
+		"""
+		Closes a node's connections, waking the receivers still waiting
+
+		:return: 				None
+		"""
+
+		for reader in self.readers:
+			reader.cancel()
+		await self.fail(ConnectionError("The node is closed"))
+		writers = list(self.socket_clients.values())+self.server_connections
+		for writer in writers:
+			writer.close()
+		for writer in writers:
+			try:
+				await writer.wait_closed()
+			except ConnectionError:
+				pass
+		if self.socket_server is not None:
+			self.socket_server.close()
+			await self.socket_server.wait_closed()
+
+	async def send_messages(self, message_dict, channel=0):
+
+		"""
+		Sends a set of messages, waiting while the connections' send buffers
+		are full
+
+		:param message_dict: 	dict	The messages to send in the form {addr: msg}
+		:param channel: 		int		The channel to send the messages on
 		:return: 				None
 		"""
 
+		writers = list()
 		for addr in message_dict.keys():
 			if addr == (self.host, self.port):
 				if message_dict[addr] != None:
-					self.message_list.append(message_dict[addr])
+					await self.deliver(message_dict[addr], channel)
 			else:
-				self.socket_clients[addr].sendall(bytes(json.dumps(message_dict[addr]), encoding='utf-8'))
+				data = frame(message_dict[addr], channel)
+				self.socket_clients[addr].write(data)
+				if self.recorder is not None:
+					self.recorder.count("bytes_sent", len(data))
+					self.recorder.count("messages_sent")
+				writers.append(self.socket_clients[addr])
+		for writer in writers:
+			await writer.drain()
 
-	def get_message_at(self, index):
+	async def send_file(self, addr, message, file, offset, count, channel=0):
 
 		"""
-		Gets the message at a certain index in the message list
+		Sends a list message whose last element is bytes read from a file. The
+		bytes go from the file to the socket with the event loop's sendfile,
+		without being copied through the process where the platform allows.
+
+		:param addr: 			tuple	The address to send the message to
+		:param message: 		list	The elements of the message before the bytes
+		:param file: 					The file, opened for reading in binary mode
+		:param offset: 			int		The offset of the bytes in the file
+		:param count: 			int		The number of bytes
+		:param channel: 		int		The channel to send the message on
+		:return: 				None
+		"""
+
+		if addr == (self.host, self.port):
+			file.seek(offset)
+			await self.deliver(list(message)+[file.read(count)], channel)
+			return
+
+		head = file_head(message, count, channel)
+		writer = self.socket_clients[addr]
+		writer.write(head)
+		await writer.drain()
+		if count > 0:
+			await asyncio.get_running_loop().sendfile(writer.transport, file, offset, count)
+		if self.recorder is not None:
+			self.recorder.count("bytes_sent", len(head)+count)
+			self.recorder.count("messages_sent")
+
+	async def deliver(self, message, channel, size=0):
+
+		"""
+		Appends a received message to its channel and wakes the receivers
+		waiting on it
+
+		:param message: 				The message
+		:param channel: 		int		The channel the message arrived on
+		:param size: 			int		The size of the message's frame, which counts towards
+										the high-water mark until it is gotten
+		:return: 				None
+		"""
+
+		async with self.arrived:
+			message_list = self.get_channel_list(channel)
+			if size > 0:
+				self.unread[(channel, len(message_list))] = size
+				self.pending += size
+			message_list.append(message)
+			self.arrived.notify_all()
+
+	async def get_message_at(self, index, release=False, channel=0, timeout=None):
+
+		"""
+		Gets the message at a certain index in the message list, waiting
+		until it arrives. Raises a ConnectionError if it can no longer arrive.
 
 		:param index: 			int		The index to get the message at
+		:param release: 		bool	Whether or not to drop the node's reference
+										to the message once it is returned
+		:param channel: 		int		The channel to get the message from
+		:param timeout: 		float	The most seconds to wait, or None to wait forever
 		:return: 						The message at the index
 		"""
 
-		while len(self.message_list) < index+1:
-			pass
-		return self.message_list[index]
+		message_list = self.get_channel_list(channel)
+		if len(message_list) <= index:
+			async with self.arrived:
+				# Lets the readers paused at the high-water mark go on
+				self.waiting += 1
+				self.arrived.notify_all()
+				try:
+					await asyncio.wait_for(self.arrived.wait_for(lambda: len(message_list) > index or \
+						self.failure is not None), timeout)
+				except asyncio.TimeoutError:
+					raise TimeoutError("No message at index "+str(index)+" of channel "+\
+						str(channel)+" after "+str(timeout)+" seconds")
+				finally:
+					self.waiting -= 1
+				if len(message_list) <= index:
+					raise ConnectionError("No message at index "+str(index)+" of channel "+\
+						str(channel)+" can arrive") from self.failure
+		message = message_list[index]
+		if release:
+			message_list[index] = None
+		if (channel, index) in self.unread:
+			await self.mark_read([(channel, index)])
+		return message
+
+	async def mark_read(self, keys):
+
+		"""
+		Stops counting received messages towards the high-water mark, waking
+		the readers paused at it once the node is below it
+
+		:param keys: 			list	The channel and index of each message
+		:return: 				None
+		"""
+
+		for key in keys:
+			self.pending -= self.unread.pop(key, 0)
+		if self.paused > 0 and self.pending < self.high_water:
+			async with self.arrived:
+				self.arrived.notify_all()
+
+	def get_channel_list(self, channel):
+
+		"""
+		Gets the message list of a channel, which is created by the first
+		message on it from either side
+
+		:param channel: 		int		The channel
+		:return: 				list	The messages received on the channel
+		"""
+
+		return self.channel_lists.setdefault(channel, list())
+
+	def open_channel(self):
+
+		"""
+		Opens the next logical channel over the node's connections. Both parties
+		must open their channels in the same order for the channels to match.
+
+		:return: 				Channel	The channel
+		"""
+
+		channel = Channel(self, self.next_channel)
+		self.next_channel += 1
+		return channel
+
+	def close_channel(self, channel):
+
+		"""
+		Drops the messages of a channel that is no longer used, which no longer
+		count towards the high-water mark
+
+		:param channel: 		int		The channel
+		:return: 				None
+		"""
+
+		self.channel_lists.pop(channel, None)
+		for key in [key for key in self.unread.keys() if key[0] == channel]:
+			self.pending -= self.unread.pop(key)
+
+
+
+RECV_SIZE = 1 << 16
+HIGH_WATER = 1 << 24
+CONNECT_RETRY = .05
+
+# Frame header and message type tags
+FRAME_HEADER = struct.Struct(">QI")
+COUNT = struct.Struct(">I")
+PACKED_HEADER = struct.Struct(">IH")
+NONE = b"N"
+TRUE = b"T"
+FALSE = b"F"
+INT = b"i"
+NEGATIVE_INT = b"j"
+STR = b"s"
+BYTES = b"b"
+LIST = b"l"
+TUPLE = b"t"
+DICT = b"d"
+PACKED = b"p"
+ROWS = b"r"
+WORD_FORMATS = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
+# The tags whose elements follow a count
+COUNTED_TAGS = (INT, NEGATIVE_INT, STR, BYTES, LIST, TUPLE, DICT)
+
+
+def frame(message, channel=0):
+
+	"""
+	Encodes a message into a length-prefixed frame
+
+	:param message: 			The message to encode
+	:param channel: 	int		The channel of the message
+	:return: 			bytes	The frame
+	"""
+
+	chunks = list()
+	encode(message, chunks)
+	body = b"".join(chunks)
+	return FRAME_HEADER.pack(len(body), channel)+body
+
+
+def file_head(message, count, channel=0):
+
+	"""
+	Encodes the start of the frame of a list message whose last element is
+	count bytes that follow it, which are sent separately
+
+	:param message: 	list	The elements of the message before the bytes
+	:param count: 		int		The number of bytes
+	:param channel: 	int		The channel of the message
+	:return: 			bytes	The frame up to the bytes
+	"""
+
+	chunks = [LIST, COUNT.pack(len(message)+1)]
+	for element in message:
+		encode(element, chunks)
+	chunks.append(BYTES)
+	chunks.append(COUNT.pack(count))
+	body = b"".join(chunks)
+	return FRAME_HEADER.pack(len(body)+count, channel)+body
+
+
+def read_frames(buffer):
+
+	"""
+	Decodes and removes every complete frame at the start of a buffer
+
+	:param buffer: 		bytearray	The received bytes
+	:return: 			list	The decoded messages as (channel, message) tuples
+	"""
+
+	messages = list()
+	start = 0
+	with memoryview(buffer) as data:
+		while len(buffer)-start >= FRAME_HEADER.size:
+			length, channel = FRAME_HEADER.unpack_from(data, start)
+			end = start+FRAME_HEADER.size+length
+			if len(buffer) < end:
+				break
+			message, _ = decode(data[:end], start+FRAME_HEADER.size)
+			messages.append((channel, message))
+			start = end
+	del buffer[:start]
+	return messages
+
+
+def encode(message, chunks):
+
+	"""
+	Encodes a message in the binary format. Lists of non-negative ints, such as
+	label lists, and lists of such lists, such as garbled and output decoding
+	tables, are packed with a fixed width.
+
+	:param message: 			The message to encode
+	:param chunks: 		list	The list of bytes to append the encoding to
+	:return: 					None
+	"""
+
+	if message is None:
+		chunks.append(NONE)
+	elif message is True:
+		chunks.append(TRUE)
+	elif message is False:
+		chunks.append(FALSE)
+	elif isinstance(message, int):
+		magnitude = abs(message)
+		data = magnitude.to_bytes((magnitude.bit_length()+7)//8, byteorder="little", signed=False)
+		chunks.append(INT if message >= 0 else NEGATIVE_INT)
+		chunks.append(COUNT.pack(len(data)))
+		chunks.append(data)
+	elif isinstance(message, str):
+		data = bytes(message, encoding='utf-8')
+		chunks.append(STR)
+		chunks.append(COUNT.pack(len(data)))
+		chunks.append(data)
+	elif isinstance(message, (bytes, bytearray)):
+		chunks.append(BYTES)
+		chunks.append(COUNT.pack(len(message)))
+		chunks.append(bytes(message))
+	elif isinstance(message, list) and len(message) > 0 and is_packable(message):
+		width = packed_width(max(message))
+		chunks.append(PACKED)
+		chunks.append(PACKED_HEADER.pack(len(message), width))
+		if width in WORD_FORMATS:
+			chunks.append(struct.pack("<%d%s" % (len(message), WORD_FORMATS[width]), *message))
+		else:
+			chunks.append(b"".join([element.to_bytes(width, byteorder="little", signed=False)
+									for element in message]))
+	elif isinstance(message, list) and len(message) > 0 and \
+			all(type(row) is list and is_packable(row) for row in message) and any(message):
+		chunks.append(ROWS)
+		encode([len(row) for row in message], chunks)
+		encode([element for row in message for element in row], chunks)
+	elif isinstance(message, (list, tuple)):
+		chunks.append(LIST if isinstance(message, list) else TUPLE)
+		chunks.append(COUNT.pack(len(message)))
+		for element in message:
+			encode(element, chunks)
+	elif isinstance(message, dict):
+		chunks.append(DICT)
+		chunks.append(COUNT.pack(len(message)))
+		for key, value in message.items():
+			encode(key, chunks)
+			encode(value, chunks)
+	else:
+		raise TypeError("Cannot encode message of type "+type(message).__name__)
+
+
+def packed_width(largest):
+
+	"""
+	Gets the width to pack ints with, which is a machine word size or a
+	multiple of 8 bytes so that the packed ints can be unpacked in bulk
+
+	:param largest: 	int		The largest int to pack
+	:return: 			int		The width in bytes
+	"""
+
+	width = (largest.bit_length()+7)//8
+	for word_width in WORD_FORMATS:
+		if width <= word_width:
+			return word_width
+	return (width+7)//8*8
+
+
+def is_packable(elements):
+
+	"""
+	Checks whether a list holds only non-negative ints and can be packed
+
+	:param elements: 	list	The list to check
+	:return: 			bool	Whether the list can be packed
+	"""
+
+	return all(type(element) is int and element >= 0 for element in elements)
+
+
+def decode(data, offset):
+
+	"""
+	Decodes a message in the binary format
+
+	:param data: 		memoryview	The encoded bytes
+	:param offset: 		int		The offset of the message in the bytes
+	:return: 			tuple	The message and the offset after it
+	"""
+
+	tag = bytes(data[offset:offset+1])
+	offset += 1
+	if tag == NONE:
+		return None, offset
+	elif tag == TRUE:
+		return True, offset
+	elif tag == FALSE:
+		return False, offset
+	elif tag == PACKED:
+		count, width = PACKED_HEADER.unpack_from(data, offset)
+		offset += PACKED_HEADER.size
+		end = offset+count*width
+		if width in WORD_FORMATS:
+			return list(struct.unpack_from("<%d%s" % (count, WORD_FORMATS[width]), data, offset)), end
+		elif width == 16:
+			words = struct.unpack_from("<%dQ" % (2*count), data, offset)
+			return [low | (high << 64) for low, high in zip(words[0::2], words[1::2])], end
+		packed = bytes(data[offset:end])
+		return [int.from_bytes(packed[index:index+width], byteorder="little", signed=False)
+				for index in range(0, count*width, width)], end
+
+	elif tag == ROWS:
+		lengths, offset = decode(data, offset)
+		elements, offset = decode(data, offset)
+		rows = list()
+		start = 0
+		for length in lengths:
+			rows.append(elements[start:start+length])
+			start += length
+		return rows, offset
+
+	if tag not in COUNTED_TAGS:
+		raise ValueError("Unknown message tag "+repr(tag))
+	count, = COUNT.unpack_from(data, offset)
+	offset += COUNT.size
+	if tag == INT or tag == NEGATIVE_INT:
+		value = int.from_bytes(data[offset:offset+count], byteorder="little", signed=False)
+		return (value if tag == INT else -value), offset+count
+	elif tag == STR:
+		return str(data[offset:offset+count], encoding='utf-8'), offset+count
+	elif tag == BYTES:
+		return bytes(data[offset:offset+count]), offset+count
+	elif tag == LIST or tag == TUPLE:
+		elements = list()
+		for _ in range(count):
+			element, offset = decode(data, offset)
+			elements.append(element)
+		return (elements if tag == LIST else tuple(elements)), offset
+	elif tag == DICT:
+		elements = dict()
+		for _ in range(count):
+			key, offset = decode(data, offset)
+			elements[key], offset = decode(data, offset)
+		return elements, offset
 
 
 NUM_PARTIES = 2
 HOST = "127.0.0.1"
 START_PORT = 9095
+ASYNC_SESSIONS = 16
+ASYNC_ROUNDS = 100
 
 def init_node(party_num):
 
@@ -187,30 +1011,75 @@ def init_node(party_num):
 	node = Node(addr_list[party_num][0], addr_list[party_num][1])
 	try:
 		node.connect(addr_list)
-		time.sleep(3)
 		messages = {addr: ("message", "Hello") for addr in addr_list}
 		node.send_messages(messages)
 		print("Sent messages")
+		for index in range(NUM_PARTIES):
+			print("Received "+str(node.get_message_at(index, timeout=10)))
 
 	except Exception as e:
 		print(e)
 
 	finally:
 		print("Closing")
-		try:
-			while True:
-				pass
-		finally:
-			node.close()
+		node.close()
+
+async def init_async_session(session):
+
+	"""
+	Runs a session of two async nodes that pass a counter back and forth
+	on a logical channel. This is for testing.
+
+	:param session: 			int		The number of the session
+	:return: 					int		The final value of the counter
+	"""
+
+	addr_list = [(HOST, START_PORT+NUM_PARTIES*(session+1)+party) for party in range(NUM_PARTIES)]
+	nodes = [Async_Node(*addr) for addr in addr_list]
+	await asyncio.gather(*[node.connect(addr_list) for node in nodes])
+
+	async def party(party_num):
+		channel = nodes[party_num].open_channel()
+		partner = addr_list[1-party_num]
+		counter = 0
+		for round_num in range(ASYNC_ROUNDS):
+			if party_num == round_num % 2:
+				await channel.send_messages({partner: counter+1})
+			else:
+				counter = await channel.get_message_at(round_num//2, release=True, timeout=10)
+		return counter
+
+	try:
+		return max(await asyncio.gather(*[party(party_num) for party_num in range(NUM_PARTIES)]))
+	finally:
+		for node in nodes:
+			await node.close()
+
+async def run_async_sessions():
+
+	"""
+	Runs many async sessions concurrently on a single event loop
+
+	:return: 					None
+	"""
+
+	start = time.time()
+	counters = await asyncio.gather(*[init_async_session(session) for session in range(ASYNC_SESSIONS)])
+	print("Ran "+str(len(counters))+" async sessions of "+str(ASYNC_ROUNDS)+" rounds in "+\
+		str(time.time()-start)+" seconds")
 
 def main():
+	party_processes = list()
 	for party in range(NUM_PARTIES):
 		party_process = multiprocessing.Process(target=init_node,\
 			args=(party,))
 		party_process.start()
+		party_processes.append(party_process)
+
+	for party_process in party_processes:
+		party_process.join()
 
-	while True:
-		pass
+	asyncio.run(run_async_sessions())
 
 if __name__ == '__main__':
 	main()
@@ -28,33 +28,31 @@ class OT_Sender:
     https://arxiv.org/pdf/0909.2852.pdf
     """
 
-    def __init__(self, host, port, partner_host, partner_port, prime, generator, uniform1, uniform2, secret1, secret2):
+    def __init__(self, node, partner_addr, prime, generator, uniform1, uniform2, secret1, secret2):
 
         """
-        Initializes the OT sender's protocol
+        Initializes the OT sender's protocol over an open connection. A batch of OTs
+        is run in the same rounds when the secrets are given as lists.
 
-        :param host:            str     The host name
-        :param port:            int     The port number
-        :param partner_host:    str     The partner's host name
-        :param partner_port:    int     The partner's port number
+        :param node:            Node    The node, or a channel of it, to run the OT over
+        :param partner_addr:    tuple   The partner's address
         :param prime:           int     A prime
         :param generator:       int     A generator for the prime
         :param uniform1:        int     An integer from a uniform distribution
         :param uniform2:        int     An integer from a uniform distribution
-        :param secret1:         int     The first secret
-        :param secret2:         int     The second secret
+        :param secret1:         int     The first secret, or a list of first secrets
+        :param secret2:         int     The second secret, or a list of second secrets
         """
 
-        self.node = Node.Node(host, port)
-        self.node.connect([(partner_host, partner_port)])
-        self.addr = (host, port)
-        self.partner_addr = (partner_host, partner_port)
+        self.node = node
+        self.partner_addr = partner_addr
         self.prime = prime
         self.generator = generator
         self.uniform1 = uniform1
         self.uniform2 = uniform2
-        self.secret1 = secret1
-        self.secret2 = secret2
+        self.batch = isinstance(secret1, list)
+        self.secret1 = secret1 if self.batch else [secret1]
+        self.secret2 = secret2 if self.batch else [secret2]
 
     def protocol(self):
 
@@ -64,54 +62,54 @@ class OT_Sender:
         :return:                None
         """
 
-        try:
-            # print("x1: " + str(self.uniform1))
-            # print("x2: " + str(self.uniform2))
+        # print("x1: " + str(self.uniform1))
+        # print("x2: " + str(self.uniform2))
 
-            # 1) Generates the nonce N_A_1 and sends g^{x_1+N_A_1} mod p
-            N_A_1 = random.randint(1, self.prime-1)
-            message_1 = Utilities.square_multiply(self.generator, self.uniform1+N_A_1, self.prime)
-            self.node.send_messages({self.partner_addr: message_1})
-            # print("NA1: "+str(N_A_1))
-            # print("Message 1: "+str(message_1))
+        # 1) Generates the nonces N_A_1 and sends g^{x_1+N_A_1} mod p
+        N_A_1 = [random.randint(1, self.prime-1) for _ in self.secret1]
+        message_1 = Utilities.batch_exp(self.generator, [self.uniform1+nonce for nonce in N_A_1], self.prime,
+                                        self.prime-1)
+        self.node.send_messages({self.partner_addr: message_1})
+        # print("NA1: "+str(N_A_1))
+        # print("Message 1: "+str(message_1))
 
-            # 3) Receives (g^{x_1+N_A_1}/g^{x_B})^{N_B*N_B_1} mod p and g^{N_B} mod p
-            message_2 = self.node.get_message_at(0)
-            # print("Message 2: "+str(message_2))
+        # 3) Receives (g^{x_1+N_A_1}/g^{x_B})^{N_B*N_B_1} mod p and g^{N_B} mod p
+        message_2 = self.node.get_message_at(0)
+        # print("Message 2: "+str(message_2))
 
+        message_3 = list()
+        for index, (received, secret1, secret2) in enumerate(zip(message_2, self.secret1, self.secret2)):
             # 4) Generates the nonce N_A_2 and sends ((g^{x_1+N_A_1}/g^{x_B})^{N_B*N_B_1})^{N_A_2} mod p
             N_A_2 = random.randint(1, self.prime-1)
-            message_3 = Utilities.square_multiply(message_2[0], N_A_2, self.prime)
+            reply = pow(received[0], N_A_2, self.prime)
             # print("N_A_2: "+str(N_A_2))
-            # print("Message 3: "+str(message_3))
+            # print("Message 3: "+str(reply))
 
-            # 6) Generates (g^{N_B})^*N_A_1*N_A_2} mod p and ((g^{N_B})^{x_1-x_2+N_A_1})^{N_A_2} mod p
-            K_1 = Utilities.square_multiply(message_2[1], N_A_1*N_A_2, self.prime)
-            K_2 = Utilities.square_multiply(Utilities.square_multiply(message_2[1], self.uniform1-self.uniform2+N_A_1, self.prime), N_A_2, self.prime)
+            # 6) Generates (g^{N_B})^*N_A_1*N_A_2} mod p and ((g^{N_B})^{x_1-x_2+N_A_1})^{N_A_2} mod p,
+            # with the exponents multiplied out and reduced by p-1
+            K_1 = pow(received[1], N_A_1[index]*N_A_2 % (self.prime-1), self.prime)
+            K_2 = pow(received[1], (self.uniform1-self.uniform2+N_A_1[index])*N_A_2 % (self.prime-1), self.prime)
             # print("K_1: "+str(K_1))
             # print("K_2: "+str(K_2))
 
             nonce = 0
-            box1 = nacl.secret.SecretBox(K_1.to_bytes(32, byteorder="little", signed=False))
-            c1 = box1.encrypt(self.secret1.to_bytes(int(math.ceil(len(bin(self.secret1)[2:])/8)), byteorder="little",
-                                                    signed=False), nonce=nonce.to_bytes(24, byteorder="little",
-                                                                                        signed=False),
+            box1 = nacl.secret.SecretBox(box_key(K_1, self.prime))
+            c1 = box1.encrypt(secret1.to_bytes(int(math.ceil(len(bin(secret1)[2:])/8)), byteorder="little",
+                                               signed=False), nonce=nonce.to_bytes(24, byteorder="little",
+                                                                                   signed=False),
                               encoder=ENCODER)
-            box2 = nacl.secret.SecretBox(K_2.to_bytes(32, byteorder="little", signed=False))
-            c2 = box2.encrypt(self.secret2.to_bytes(int(math.ceil(len(bin(self.secret2)[2:]) / 8)), byteorder="little",
-                                                    signed=False), nonce=nonce.to_bytes(24, byteorder="little",
-                                                                                        signed=False),
+            box2 = nacl.secret.SecretBox(box_key(K_2, self.prime))
+            c2 = box2.encrypt(secret2.to_bytes(int(math.ceil(len(bin(secret2)[2:])/8)), byteorder="little",
+                                               signed=False), nonce=nonce.to_bytes(24, byteorder="little",
+                                                                                   signed=False),
                               encoder=ENCODER)
 
-            self.node.send_messages({self.partner_addr: (message_3,
-                                                         int.from_bytes(c1.ciphertext, byteorder="little", signed=False),
-                                                         0, int.from_bytes(c2.ciphertext, byteorder="little", signed=False),
-                                                         0)})
+            message_3.append((reply, c1.ciphertext, 0, c2.ciphertext, 0))
 
-            return
+        self.node.send_messages({self.partner_addr: message_3})
+
+        return
 
-        finally:
-            self.node.close()
 
 class OT_Receiver:
 
@@ -121,90 +119,109 @@ class OT_Receiver:
     https://arxiv.org/pdf/0909.2852.pdf
     """
 
-    def __init__(self, host, port, partner_host, partner_port, prime, generator, uniform1, uniform2, choice):
+    def __init__(self, node, partner_addr, prime, generator, uniform1, uniform2, choice):
 
         """
-        Initializes the OT sender's protocol
+        Initializes the OT sender's protocol over an open connection. A batch of OTs
+        is run in the same rounds when the choices are given as a list.
 
-        :param host:            str     The host name
-        :param port:            int     The port number
-        :param partner_host:    str     The partner's host name
-        :param partner_port:    int     The partner's port number
+        :param node:            Node    The node, or a channel of it, to run the OT over
+        :param partner_addr:    tuple   The partner's address
         :param prime:           int     A prime
         :param generator:       int     A generator for the prime
         :param uniform1:        int     An integer from a uniform distribution
         :param uniform2:        int     An integer from a uniform distribution
+        :param choice:          int     The desired choice (1 or 2), or a list of choices
         """
 
-        self.node = Node.Node(host, port)
-        self.node.connect([(partner_host, partner_port)])
-        self.addr = (host, port)
-        self.partner_addr = (partner_host, partner_port)
+        self.node = node
+        self.partner_addr = partner_addr
         self.prime = prime
         self.generator = generator
         self.uniform1 = uniform1
         self.uniform2 = uniform2
-        self.choice = choice
+        self.batch = isinstance(choice, list)
+        self.choice = choice if self.batch else [choice]
 
     def protocol(self):
 
         """
         The protocol for the the receiver of the OT
 
-        :return:                int     The corresponding value
+        :return:                int     The corresponding value, or a list of the values
         """
 
-        try:
-            # print("x1: "+str(self.uniform1))
-            # print("x2: "+str(self.uniform2))
+        # print("x1: "+str(self.uniform1))
+        # print("x2: "+str(self.uniform2))
 
-            # 1) Receives g^{x_1+N_A_1} mod p
-            message_1 = self.node.get_message_at(0)
-            # print("Message 1: "+str(message_1))
+        # 1) Receives g^{x_1+N_A_1} mod p
+        message_1 = self.node.get_message_at(0)
+        # print("Message 1: "+str(message_1))
 
+        generator = Utilities.fixed_base(self.generator, self.prime, self.prime-1)
+        message_2 = list()
+        N_B_1 = list()
+        for received, choice in zip(message_1, self.choice):
             # 2) Sets x_B=x_1 if we want to get number 1; otherwise x_B = x_2
             # Generate N_B and N_B_1
-            x_B = self.uniform1 if self.choice == 1 else self.uniform2
+            x_B = self.uniform1 if choice == 1 else self.uniform2
             N_B = random.randint(1, self.prime-1)
-            N_B_1 = random.randint(1, self.prime - 2)
-            while Utilities.euclidean(N_B_1, self.prime-1) != 1:
-                N_B_1 = random.randint(1, self.prime-2)
+            N_B_1.append(random.randint(1, self.prime - 2))
+            while Utilities.euclidean(N_B_1[-1], self.prime-1) != 1:
+                N_B_1[-1] = random.randint(1, self.prime-2)
             # print("xB: "+str(x_B))
             # print("NB: "+str(N_B))
             # print("NB1: "+str(N_B_1))
 
-            # 3) Sends (g^{x_1+N_A_1}/g^{x_B})^{N_B*N_B_1} mod p and g^{N_B} mod p
-            message_2 = [Utilities.square_multiply(message_1*Utilities.inverse(Utilities.square_multiply(self.generator,
-                                                                                                         x_B, self.prime),
-                                                                               self.prime), N_B*N_B_1, self.prime),
-                         Utilities.square_multiply(self.generator, N_B, self.prime)]
-            self.node.send_messages({self.partner_addr: message_2})
-            # print("Message 2: "+str(message_2))
+            # 3) Sends (g^{x_1+N_A_1}/g^{x_B})^{N_B*N_B_1} mod p and g^{N_B} mod p, where the first is
+            # computed as (g^{x_1+N_A_1})^{N_B*N_B_1} * g^{-x_B*N_B*N_B_1} mod p in one multi-exponentiation
+            exponent = N_B*N_B_1[-1] % (self.prime-1)
+            message_2.append([Utilities.multi_exp([received, self.generator], [exponent, -x_B*exponent],
+                                                  self.prime, self.prime-1),
+                              generator.pow(N_B)])
+        self.node.send_messages({self.partner_addr: message_2})
+        # print("Message 2: "+str(message_2))
+
+        # 4) Receives ((g^{x_1+N_A_1}/g^{x_B})^{N_B*N_B_1})^{N_A_2} mod p
+        message_3 = self.node.get_message_at(1)
 
-            # 4) Receives ((g^{x_1+N_A_1}/g^{x_B})^{N_B*N_B_1})^{N_A_2} mod p
-            received = self.node.get_message_at(1)
-            message_3, c1, n1, c2, n2 = received
-            # print("Message 3: "+str(message_3))
+        results = list()
+        for received, choice, nonce_b in zip(message_3, self.choice, N_B_1):
+            reply, c1, n1, c2, n2 = received
+            # print("Message 3: "+str(reply))
 
             # 5) Bob computes (((g^{x_1+N_A_1}/g^{x_B})^{N_B*N_B_1})^{N_A_2})^{1/N_B_1} mod p
-            K_B = Utilities.square_multiply(message_3, Utilities.inverse(N_B_1, self.prime-1), self.prime)
+            K_B = pow(reply, Utilities.inverse(nonce_b, self.prime-1), self.prime)
             # print("K_B: "+str(K_B))
 
             # Gets the appropriate nonce and cipher
-            nonce = n1 if self.choice == 1 else n2
-            cipher = c1 if self.choice == 1 else c2
+            nonce = n1 if choice == 1 else n2
+            cipher = c1 if choice == 1 else c2
 
-            # Converts the nonce and cipher to bytes
+            # Converts the nonce to bytes
             nonce = nonce.to_bytes(24, byteorder="little", signed=False)
-            cipher = cipher.to_bytes(int(math.ceil(len(bin(cipher)[2:])/8)), byteorder="little", signed=False)
 
-            boxb = nacl.secret.SecretBox(K_B.to_bytes(32, byteorder="little", signed=False))
+            boxb = nacl.secret.SecretBox(box_key(K_B, self.prime))
             p = boxb.decrypt(cipher, nonce=nonce, encoder=ENCODER)
 
-            return int.from_bytes(p, byteorder="little", signed=False)
+            results.append(int.from_bytes(p, byteorder="little", signed=False))
+
+        return results if self.batch else results[0]
+
+
+def box_key(K, prime):
+
+    """
+    Derives the key of a secret box from a shared group element, which may be
+    larger than the key for large primes
+
+    :param K:                   int     The shared group element
+    :param prime:               int     The prime of the group
+    :return:                    bytes   The key
+    """
 
-        finally:
-            self.node.close()
+    K = K.to_bytes((prime.bit_length()+7)//8, byteorder="little", signed=False)
+    return Utilities.hash(K)[:nacl.secret.SecretBox.KEY_SIZE]
 
 
 def initialize_parties(party, prime, generator, uniform1, uniform2, secret1, secret2, choice):
@@ -223,12 +240,18 @@ def initialize_parties(party, prime, generator, uniform1, uniform2, secret1, sec
     :return:
     """
 
-    if party == 0:
-        p = OT_Sender(HOST, PORT, HOST, PORT+1, prime, generator, uniform1, uniform2, secret1, secret2)
-        p.protocol()
-    else:
-        p = OT_Receiver(HOST, PORT+1, HOST, PORT, prime, generator, uniform1, uniform2, choice)
-        print("Result:"+str(p.protocol()))
+    addr_list = [(HOST, PORT), (HOST, PORT+1)]
+    node = Node.Node(*addr_list[party])
+    node.connect([addr_list[1-party]])
+    try:
+        if party == 0:
+            p = OT_Sender(node, addr_list[1], prime, generator, uniform1, uniform2, secret1, secret2)
+            p.protocol()
+        else:
+            p = OT_Receiver(node, addr_list[0], prime, generator, uniform1, uniform2, choice)
+            print("Result:"+str(p.protocol()))
+    finally:
+        node.close()
 
 def main():
     prime = 2903
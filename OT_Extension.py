@@ -0,0 +1,319 @@
+import EC_OT
+import Node
+import OT
+import Utilities
+
+import multiprocessing
+import random
+import secrets
+
+
+HOST = "0.0.0.0"
+PORT = 10224
+
+KAPPA = 128
+
+# The sender and receiver of each engine for the base OTs
+BASE_OTS = {"parakh": (OT.OT_Sender, OT.OT_Receiver), "ec": (EC_OT.EC_OT_Sender, EC_OT.EC_OT_Receiver)}
+BASE_OT = "ec"
+
+
+"""
+Author: Chris Murphy (crm4042@g.rit.edu)
+"""
+
+class IKNP_Sender:
+
+    """
+    OT extension sender's protocol, which runs KAPPA base OTs and then any number
+    of OTs with only hashing. This corresponds to the protocol of Ishai, Kilian,
+    Nissim and Petrank defined in:
+    https://www.iacr.org/archive/crypto2003/27290145/27290145.pdf
+    """
+
+    def __init__(self, node, partner_addr, prime, generator, uniform1, uniform2, secrets1, secrets2, kappa=KAPPA,
+                 base_ot=BASE_OT):
+
+        """
+        Initializes the OT extension sender's protocol over an open connection. The
+        base OTs run on a channel of their own.
+
+        :param node:            Node    The node, or a channel of it, to run the OT extension over
+        :param partner_addr:    tuple   The partner's address
+        :param prime:           int     A prime for the base OTs
+        :param generator:       int     A generator for the prime
+        :param uniform1:        int     An integer from a uniform distribution
+        :param uniform2:        int     An integer from a uniform distribution
+        :param secrets1:        list    The first secret of each OT
+        :param secrets2:        list    The second secret of each OT
+        :param kappa:           int     The number of base OTs
+        :param base_ot:         str     The engine of the base OTs, from BASE_OTS
+        """
+
+        self.node = node
+        self.partner_addr = partner_addr
+        self.prime = prime
+        self.generator = generator
+        self.uniform1 = uniform1
+        self.uniform2 = uniform2
+        self.secrets1 = secrets1
+        self.secrets2 = secrets2
+        self.kappa = kappa
+        self.base_ot = base_ot
+
+        # The state of the base OTs, which are reused by every extension
+        self.s = None
+        self.seeds = None
+        self.extensions = 0
+        self.offset = 0
+
+    def protocol(self):
+
+        """
+        The protocol for the OT extension sender
+
+        :return:                None
+        """
+
+        self.extend(self.node, self.secrets1, self.secrets2)
+
+        return
+
+    def setup(self):
+
+        """
+        Runs the base OTs on a channel of their own, unless they have already run
+
+        :return:                None
+        """
+
+        if self.seeds is not None:
+            return
+
+        # Receives one seed of each base OT, chosen by the random string s, whose secrecy protects
+        # every extension
+        s = secrets.randbits(self.kappa)
+        self.s = [(s >> i) & 1 for i in range(self.kappa)]
+        base_channel = self.node.open_channel()
+        self.seeds = BASE_OTS[self.base_ot][1](base_channel, self.partner_addr, self.prime, self.generator,
+                                               self.uniform1, self.uniform2, [bit+1 for bit in self.s]).protocol()
+        base_channel.close()
+
+    def extend(self, node, secrets1, secrets2):
+
+        """
+        Runs a batch of OTs from the base OTs, which run on the first batch. Each
+        batch expands the seeds of the base OTs with a counter of its own and
+        numbers its OTs after those of the earlier batches, so that batches
+        over the same base OTs are independent.
+
+        :param node:            Node    The node, or a channel of it, to run the batch over
+        :param secrets1:        list    The first secret of each OT
+        :param secrets2:        list    The second secret of each OT
+        :return:                None
+        """
+
+        self.setup()
+        m = len(secrets1)
+
+        # 1) Receives u^i = G(k_i^0) ^ G(k_i^1) ^ r and computes q^i = G(k_i^{s_i}) ^ s_i*u^i = t^i ^ s_i*r
+        u = node.get_message_at(0)
+        q = [Utilities.prg(seed, m, self.extensions) ^ (u_i if s_i else 0) for seed, u_i, s_i in zip(self.seeds, u,
+                                                                                                      self.s)]
+
+        # 2) The rows are q_j = t_j ^ r_j*s, so H(j, q_j) masks the first secret and H(j, q_j ^ s) the second
+        s = sum(bit << i for i, bit in enumerate(self.s))
+        width = max(1, (max(secrets1+secrets2, default=0).bit_length()+7)//8)
+        message = list()
+        for j, q_j in enumerate(Utilities.transpose(q, m), self.offset):
+            message.append([secrets1[j-self.offset] ^ mask(j, q_j, width, self.kappa),
+                            secrets2[j-self.offset] ^ mask(j, q_j ^ s, width, self.kappa)])
+        node.send_messages({self.partner_addr: [width, message]})
+
+        self.extensions += 1
+        self.offset += m
+
+
+class IKNP_Receiver:
+
+    """
+    OT extension receiver's protocol, which runs KAPPA base OTs and then any number
+    of OTs with only hashing. This corresponds to the protocol of Ishai, Kilian,
+    Nissim and Petrank defined in:
+    https://www.iacr.org/archive/crypto2003/27290145/27290145.pdf
+    """
+
+    def __init__(self, node, partner_addr, prime, generator, uniform1, uniform2, choices, kappa=KAPPA,
+                 base_ot=BASE_OT):
+
+        """
+        Initializes the OT extension receiver's protocol over an open connection. The
+        base OTs run on a channel of their own.
+
+        :param node:            Node    The node, or a channel of it, to run the OT extension over
+        :param partner_addr:    tuple   The partner's address
+        :param prime:           int     A prime for the base OTs
+        :param generator:       int     A generator for the prime
+        :param uniform1:        int     An integer from a uniform distribution
+        :param uniform2:        int     An integer from a uniform distribution
+        :param choices:         list    The choice (0 or 1) of each OT
+        :param kappa:           int     The number of base OTs
+        :param base_ot:         str     The engine of the base OTs, from BASE_OTS
+        """
+
+        self.node = node
+        self.partner_addr = partner_addr
+        self.prime = prime
+        self.generator = generator
+        self.uniform1 = uniform1
+        self.uniform2 = uniform2
+        self.choices = choices
+        self.kappa = kappa
+        self.base_ot = base_ot
+
+        # The state of the base OTs, which are reused by every extension
+        self.seeds = None
+        self.extensions = 0
+        self.offset = 0
+
+    def protocol(self):
+
+        """
+        The protocol for the OT extension receiver
+
+        :return:                list    The chosen secret of each OT
+        """
+
+        return self.extend(self.node, self.choices)
+
+    def setup(self):
+
+        """
+        Runs the base OTs on a channel of their own, unless they have already run
+
+        :return:                None
+        """
+
+        if self.seeds is not None:
+            return
+
+        # Sends a pair of random seeds in each base OT
+        self.seeds = [(secrets.randbits(self.kappa), secrets.randbits(self.kappa)) for _ in range(self.kappa)]
+        base_channel = self.node.open_channel()
+        BASE_OTS[self.base_ot][0](base_channel, self.partner_addr, self.prime, self.generator, self.uniform1,
+                                  self.uniform2, [seed[0] for seed in self.seeds],
+                                  [seed[1] for seed in self.seeds]).protocol()
+        base_channel.close()
+
+    def extend(self, node, choices):
+
+        """
+        Runs a batch of OTs from the base OTs, which run on the first batch
+
+        :param node:            Node    The node, or a channel of it, to run the batch over
+        :param choices:         list    The choice (0 or 1) of each OT
+        :return:                list    The chosen secret of each OT
+        """
+
+        self.setup()
+        m = len(choices)
+
+        # 1) Sends u^i = t^i ^ G(k_i^1) ^ r, where t^i = G(k_i^0)
+        r = sum(choice << j for j, choice in enumerate(choices))
+        t = [Utilities.prg(seed[0], m, self.extensions) for seed in self.seeds]
+        u = [t_i ^ Utilities.prg(seed[1], m, self.extensions) ^ r for t_i, seed in zip(t, self.seeds)]
+        node.send_messages({self.partner_addr: u})
+
+        # 2) Unmasks the chosen secret of each OT with H(j, t_j)
+        width, message = node.get_message_at(0)
+        results = [message[j-self.offset][choice] ^ mask(j, t_j, width, self.kappa)
+                   for j, (t_j, choice) in enumerate(zip(Utilities.transpose(t, m), choices), self.offset)]
+
+        self.extensions += 1
+        self.offset += m
+
+        return results
+
+
+def mask(j, row, width, kappa):
+
+    """
+    Hashes a row of the OT extension matrix into a mask for a secret. Masks wider
+    than the hash are expanded with a counter, so that every byte of a secret is
+    masked.
+
+    :param j:                   int     The index of the OT
+    :param row:                 int     The row of the matrix
+    :param width:               int     The width of the mask in bytes
+    :param kappa:               int     The number of base OTs
+    :return:                    int     The mask
+    """
+
+    data = j.to_bytes(8, byteorder="little", signed=False)+row.to_bytes((kappa+7)//8, byteorder="little",
+                                                                          signed=False)
+    hashed = Utilities.hash(data)
+    counter = 1
+    while len(hashed) < width:
+        hashed += Utilities.hash(data+counter.to_bytes(8, byteorder="little", signed=False))
+        counter += 1
+    return int.from_bytes(hashed[:width], byteorder="little", signed=False)
+
+
+def initialize_parties(party, prime, generator, uniform1, uniform2, secrets1, secrets2, choices):
+
+    """
+    Initializes the parties in OT extension. This is for testing.
+
+    :param party:               int     The party number
+    :param prime:               int     A prime
+    :param generator:           int     A generator for the prime
+    :param uniform1:            int     A number from a uniform distribution
+    :param uniform2:            int     A number from a uniform distribution
+    :param secrets1:            list    The first secrets
+    :param secrets2:            list    The second secrets
+    :param choices:             list    The desired choices
+    :return:
+    """
+
+    addr_list = [(HOST, PORT), (HOST, PORT+1)]
+    node = Node.Node(*addr_list[party])
+    node.connect([addr_list[1-party]])
+    try:
+        if party == 0:
+            p = IKNP_Sender(node, addr_list[1], prime, generator, uniform1, uniform2, secrets1, secrets2)
+            p.protocol()
+        else:
+            p = IKNP_Receiver(node, addr_list[0], prime, generator, uniform1, uniform2, choices)
+            print("Result:"+str(p.protocol()))
+    finally:
+        node.close()
+
+def main():
+    prime = 2903
+    generator = 5
+    uniform1 = random.randint(1, prime-1)
+    uniform2 = random.randint(1, prime-1)
+    if uniform1 < uniform2:
+        uniform1, uniform2 = uniform2, uniform1
+    secrets1 = list(range(100, 164))
+    secrets2 = list(range(200, 264))
+    choices = [random.randint(0, 1) for _ in range(64)]
+    print("Expected:"+str([secrets2[j] if choice else secrets1[j] for j, choice in enumerate(choices)]))
+
+    processes = list()
+    for party in range(2):
+        processes.append(multiprocessing.Process(target=initialize_parties, args=(party, prime, generator, uniform1,
+                                                                                  uniform2, secrets1, secrets2,
+                                                                                  choices)))
+
+    for process in processes:
+        process.start()
+
+    for process in processes:
+        process.join()
+
+    print("Finished Protocol")
+
+
+if __name__ == '__main__':
+    main()
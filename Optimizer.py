@@ -0,0 +1,403 @@
+import Bristol
+import Circuit
+
+import io
+import random
+
+
+"""
+Author: Chris Murphy (crm4042@g.rit.edu)
+"""
+
+# The name of each gate type code, for reports
+TYPE_NAMES = {Circuit.XOR_GATE: "XOR", Circuit.AND_GATE: "AND", Circuit.INV_GATE: "INV", Circuit.BUF_GATE: "BUF",
+              Circuit.EQ_GATE: "EQ", Circuit.OR_GATE: "OR"}
+
+# The types of the gates that need no garbled table with and without Free-XOR
+FREE_TYPES = {True: (Circuit.XOR_GATE, Circuit.INV_GATE, Circuit.BUF_GATE, Circuit.EQ_GATE),
+              False: (Circuit.EQ_GATE,)}
+
+# The kinds of the nodes of a graph
+CONSTANT = 0
+INPUT = 1
+XOR = 2
+AND = 3
+
+# A literal is a node number shifted left by one, with the low bit set if the node is negated.
+# Node 0 is the constant false.
+FALSE = 0
+TRUE = 1
+
+
+class Graph:
+
+    """
+    Represents a circuit as XOR and AND nodes over literals, which are nodes
+    that may be negated, so that NOT and BUF gates cost nothing and constants
+    fold as the graph is built. Nodes are hashed by their inputs, so a gate that
+    is already in the graph is not added again. With Free-XOR, an AND node whose
+    inputs are in the graph with other polarities, such as the AND of the same
+    inputs alongside an OR of them, is built from that node with XORs.
+    """
+
+    def __init__(self, free_xor=True):
+
+        """
+        Initializes a graph with only the constant node
+
+        :param free_xor:        bool    Whether XOR gates are free, which allows trading AND nodes for XORs
+        """
+
+        self.free_xor = free_xor
+
+        # The kind and input literals of each node, and the node of each kind and inputs
+        self.kinds = [CONSTANT]
+        self.inputs0 = [FALSE]
+        self.inputs1 = [FALSE]
+        self.nodes = dict()
+
+    def add_input(self, wire: int):
+
+        """
+        Adds a node for an input wire
+
+        :param wire:            int     The input wire
+        :return:                int     The literal of the input
+        """
+
+        return self.add_node(INPUT, wire, wire)
+
+    def add_node(self, kind: int, input0: int, input1: int):
+
+        """
+        Adds a node, or finds it if the graph already has it
+
+        :param kind:            int     The kind of the node
+        :param input0:          int     The first input literal, or the wire of an input
+        :param input1:          int     The second input literal, or the wire of an input
+        :return:                int     The literal of the node
+        """
+
+        key = (kind, input0, input1)
+        node = self.nodes.get(key)
+        if node is None:
+            node = len(self.kinds)
+            self.kinds.append(kind)
+            self.inputs0.append(input0)
+            self.inputs1.append(input1)
+            self.nodes[key] = node
+        return node << 1
+
+    def xor(self, a: int, b: int):
+
+        """
+        Builds the XOR of two literals, with their negations pulled out of the node
+
+        :param a:               int     The first literal
+        :param b:               int     The second literal
+        :return:                int     The literal of the XOR
+        """
+
+        negated = (a ^ b) & 1
+        a &= ~1
+        b &= ~1
+        if a == b:
+            return negated
+        if a == FALSE:
+            return b | negated
+        if b == FALSE:
+            return a | negated
+        return self.add_node(XOR, min(a, b), max(a, b)) | negated
+
+    def and_(self, a: int, b: int):
+
+        """
+        Builds the AND of two literals
+
+        :param a:               int     The first literal
+        :param b:               int     The second literal
+        :return:                int     The literal of the AND
+        """
+
+        if a == FALSE or b == FALSE or a == b ^ 1:
+            return FALSE
+        if a == TRUE or a == b:
+            return b
+        if b == TRUE:
+            return a
+        a, b = min(a, b), max(a, b)
+        if (AND, a, b) in self.nodes:
+            return self.nodes[(AND, a, b)] << 1
+
+        # a&b is a^(a&~b), b^(~a&b) or a^b^~(~a&~b)
+        if self.free_xor:
+            for other_a, other_b in ((a, b ^ 1), (a ^ 1, b), (a ^ 1, b ^ 1)):
+                other = self.nodes.get((AND, min(other_a, other_b), max(other_a, other_b)))
+                if other is not None:
+                    other <<= 1
+                    if other_a == a:
+                        return self.xor(a, other)
+                    elif other_b == b:
+                        return self.xor(b, other)
+                    return self.xor(self.xor(a, b), other ^ 1)
+
+        return self.add_node(AND, a, b)
+
+    def or_(self, a: int, b: int):
+
+        """
+        Builds the OR of two literals, which is the negated AND of their negations
+
+        :param a:               int     The first literal
+        :param b:               int     The second literal
+        :return:                int     The literal of the OR
+        """
+
+        return self.and_(a ^ 1, b ^ 1) ^ 1
+
+    def live(self, literals: list):
+
+        """
+        Finds the nodes that the given literals depend on
+
+        :param literals:        list    The literals
+        :return:                list    Whether each node is live
+        """
+
+        live = [False]*len(self.kinds)
+        for literal in literals:
+            live[literal >> 1] = True
+        for node in range(len(self.kinds)-1, 0, -1):
+            if live[node] and self.kinds[node] in (XOR, AND):
+                live[self.inputs0[node] >> 1] = True
+                live[self.inputs1[node] >> 1] = True
+        return live
+
+
+def optimize(compiled, constants=None, free_xor=True):
+
+    """
+    Optimizes a circuit before it is garbled. Constants are propagated, NOT and
+    BUF gates are absorbed into the gates that read them, repeated gates are
+    merged, AND and OR gates are traded for XORs where the circuit already has
+    an AND-like gate of the same inputs, and gates that no output depends on
+    are removed. The inputs and outputs keep their wires, and the gates of the
+    other wires are renumbered. Without Free-XOR, the circuit is returned as it
+    is if the optimized circuit would have more gates with garbled tables.
+
+    :param compiled:        Compiled_Circuit    The circuit
+    :param constants:       dict    The value of each input wire that is known to both parties
+    :param free_xor:        bool    Whether the circuit will be garbled with Free-XOR, without which
+                                    AND gates are not traded for XORs
+    :return:                Compiled_Circuit    The optimized circuit, which computes the same outputs
+    """
+
+    constants = constants or dict()
+    graph = Graph(free_xor)
+    num_inputs = sum(compiled.input_sizes)
+
+    # Builds the graph of the circuit, where a wire that no gate sets is false as in Compiled_Circuit.evaluate
+    literals = dict()
+    for wire in range(num_inputs):
+        literals[wire] = (TRUE if constants[wire] else FALSE) if wire in constants else graph.add_input(wire)
+    for gate_type, input0, input1, output in zip(compiled.types, compiled.inputs0, compiled.inputs1,
+                                                 compiled.outputs):
+        a = literals.get(input0, FALSE)
+        b = literals.get(input1, FALSE)
+        if gate_type == Circuit.XOR_GATE:
+            literals[output] = graph.xor(a, b)
+        elif gate_type == Circuit.AND_GATE:
+            literals[output] = graph.and_(a, b)
+        elif gate_type == Circuit.OR_GATE:
+            literals[output] = graph.or_(a, b)
+        elif gate_type == Circuit.INV_GATE:
+            literals[output] = a ^ 1
+        elif gate_type == Circuit.BUF_GATE:
+            literals[output] = a
+        else:
+            literals[output] = TRUE if input0 else FALSE
+    outputs = [literals.get(wire, FALSE) for wire in compiled.output_wires()]
+
+    optimized = emit(graph, outputs, num_inputs, compiled.input_sizes, compiled.output_sizes)
+
+    # Without Free-XOR, the BUF and INV gates that copy outputs have garbled tables, which can
+    # cost more than the optimization saves
+    if not free_xor and non_free_gates(optimized, False) > non_free_gates(compiled, False):
+        return compiled
+    return optimized
+
+
+def emit(graph, outputs: list, num_inputs: int, input_sizes: list, output_sizes: list):
+
+    """
+    Builds a circuit from the live nodes of a graph. A node is set by one gate,
+    which may set its negation: the AND of two negated literals is an OR gate.
+    INV gates are only added where a literal is read with the other polarity
+    than its wire holds, and an output that another output, an input or a
+    constant holds is copied with a BUF or an INV gate.
+
+    :param graph:           Graph   The graph
+    :param outputs:         list    The literal of each output
+    :param num_inputs:      int     The number of input wires
+    :param input_sizes:     list    The number of wires of each input
+    :param output_sizes:    list    The number of wires of each output
+    :return:                Compiled_Circuit    The circuit
+    """
+
+    live = graph.live(outputs)
+
+    # The output that each node sets directly, and the polarity the output needs
+    output_of_node = dict()
+    for index, literal in enumerate(outputs):
+        node = literal >> 1
+        if graph.kinds[node] in (XOR, AND) and node not in output_of_node:
+            output_of_node[node] = (index, literal & 1)
+
+    # Gates are built with fresh wires counting up from the inputs and the outputs as negative wires,
+    # which are numbered once the number of fresh wires is known
+    gates = list()
+    wires = [dict() for _ in graph.kinds]
+    fresh = [num_inputs]
+
+    def new_wire():
+        fresh[0] += 1
+        return fresh[0]-1
+
+    def wire_of(literal, output=None):
+        node_wires = wires[literal >> 1]
+        if literal & 1 not in node_wires:
+            held = node_wires[(literal & 1) ^ 1]
+            node_wires[literal & 1] = new_wire() if output is None else output
+            gates.append((Circuit.INV_GATE, held, held, node_wires[literal & 1]))
+        return node_wires[literal & 1]
+
+    for node in range(1, len(graph.kinds)):
+        if not live[node]:
+            continue
+        kind = graph.kinds[node]
+        if kind == INPUT:
+            wires[node][0] = graph.inputs0[node]
+            continue
+
+        a = graph.inputs0[node]
+        b = graph.inputs1[node]
+        if kind == XOR:
+            # The XOR of whichever polarity each input holds, which is the node or its negation
+            a_polarity, wire_a = next(iter(wires[a >> 1].items()))
+            b_polarity, wire_b = next(iter(wires[b >> 1].items()))
+            gate_type = Circuit.XOR_GATE
+            polarity = a_polarity ^ b_polarity
+        elif a & 1 not in wires[a >> 1] and b & 1 not in wires[b >> 1]:
+            # Where both wires hold the negations of the inputs, a&b is ~(~a|~b)
+            wire_a = wires[a >> 1][(a & 1) ^ 1]
+            wire_b = wires[b >> 1][(b & 1) ^ 1]
+            gate_type = Circuit.OR_GATE
+            polarity = 1
+        else:
+            wire_a = wire_of(a)
+            wire_b = wire_of(b)
+            gate_type = Circuit.AND_GATE
+            polarity = 0
+
+        index, needed = output_of_node.get(node, (None, None))
+        if needed == polarity:
+            wires[node][polarity] = -index-1
+        else:
+            wires[node][polarity] = new_wire()
+        gates.append((gate_type, wire_a, wire_b, wires[node][polarity]))
+        if index is not None and needed != polarity:
+            wire_of((node << 1) | needed, -index-1)
+
+    # The outputs that no gate set directly copy their literal
+    for index, literal in enumerate(outputs):
+        node = literal >> 1
+        if output_of_node.get(node, (None,))[0] == index:
+            continue
+        if graph.kinds[node] == CONSTANT:
+            gates.append((Circuit.EQ_GATE, literal, literal, -index-1))
+        elif literal & 1 in wires[node]:
+            gates.append((Circuit.BUF_GATE, wires[node][literal & 1], wires[node][literal & 1], -index-1))
+        else:
+            held = wires[node][(literal & 1) ^ 1]
+            gates.append((Circuit.INV_GATE, held, held, -index-1))
+
+    compiled = Circuit.Compiled_Circuit(fresh[0]+len(outputs), input_sizes, output_sizes)
+    for gate_type, input0, input1, output in gates:
+        if gate_type != Circuit.EQ_GATE:
+            input0 = input0 if input0 >= 0 else fresh[0]-input0-1
+            input1 = input1 if input1 >= 0 else fresh[0]-input1-1
+        compiled.add_gate(gate_type, input0, input1, output if output >= 0 else fresh[0]-output-1)
+    return compiled
+
+
+def type_counts(compiled):
+
+    """
+    Counts the gates of each type of a circuit by name
+
+    :param compiled:        Compiled_Circuit    The circuit
+    :return:                dict    The number of gates of each type name
+    """
+
+    return {TYPE_NAMES[gate_type]: count for gate_type, count in sorted(compiled.gate_counts().items())}
+
+
+def non_free_gates(compiled, free_xor=True):
+
+    """
+    Counts the gates of a circuit that need a garbled table, which the cost of
+    garbling, sending and evaluating it is proportional to
+
+    :param compiled:        Compiled_Circuit    The circuit
+    :param free_xor:        bool    Whether the circuit is garbled with Free-XOR
+    :return:                int     The number of gates with garbled tables
+    """
+
+    return sum(count for gate_type, count in compiled.gate_counts().items() if gate_type not in FREE_TYPES[free_xor])
+
+
+def report(before, after, free_xor=True):
+
+    """
+    Compares a circuit before and after it is optimized
+
+    :param before:          Compiled_Circuit    The circuit
+    :param after:           Compiled_Circuit    The optimized circuit
+    :param free_xor:        bool    Whether the circuits are garbled with Free-XOR
+    :return:                dict    The gates of each type and the gates with garbled tables,
+                                    before and after
+    """
+
+    return {"before": type_counts(before), "after": type_counts(after),
+            "non_free": {"before": non_free_gates(before, free_xor), "after": non_free_gates(after, free_xor)}}
+
+
+def main():
+
+    # The full adder with no carry in is a half adder
+    compiled = Bristol.parse(io.StringIO(Bristol.EXAMPLE))
+    optimized = optimize(compiled, {2: 0})
+    print("Full adder with no carry: "+str(report(compiled, optimized)))
+    for a in range(2):
+        for b in range(2):
+            print(str(a)+str(b)+": "+"".join(str(bit) for bit in reversed(optimized.evaluate({0: a, 1: b, 2: 0}))))
+
+    # A circuit with an OR of the inputs of an AND, a double negation, a buffer and a repeated gate
+    compiled = Circuit.Compiled_Circuit(12, [2, 2], [4])
+    compiled.add_gate(Circuit.AND_GATE, 0, 2, 4)
+    compiled.add_gate(Circuit.OR_GATE, 0, 2, 5)
+    compiled.add_gate(Circuit.INV_GATE, 5, 5, 6)
+    compiled.add_gate(Circuit.INV_GATE, 6, 6, 7)
+    compiled.add_gate(Circuit.AND_GATE, 1, 3, 8)
+    compiled.add_gate(Circuit.XOR_GATE, 7, 4, 9)
+    compiled.add_gate(Circuit.BUF_GATE, 9, 9, 10)
+    compiled.add_gate(Circuit.AND_GATE, 2, 0, 11)
+    optimized = optimize(compiled)
+    print("\nRedundant circuit: "+str(report(compiled, optimized)))
+    inputs_list = [{wire: random.randint(0, 1) for wire in range(4)} for _ in range(100)]
+    print("Same outputs: "+str(all(compiled.evaluate(inputs) == optimized.evaluate(inputs)
+                                   for inputs in inputs_list)))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
+import hashlib
 import math
 import nacl.encoding
 import nacl.hash
@@ -5,6 +6,20 @@ import nacl.hash
 
 ENCODING = nacl.encoding.RawEncoder()
 
+# The bits of the exponent handled by each row of a fixed-base table, and the
+# bits handled at a time by a multi-exponentiation
+FIXED_BASE_WINDOW = 6
+MULTI_EXP_WINDOW = 4
+
+# The 2048-bit MODP group of RFC 3526, whose prime is safe
+MODP_2048_PRIME = int("FFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74020BBEA63B139B22514A08798E3404DD"
+                      "EF9519B3CD3A431B302B0A6DF25F14374FE1356D6D51C245E485B576625E7EC6F44C42E9A637ED6B0BFF5CB6F406B7ED"
+                      "EE386BFB5A899FA5AE9F24117C4B1FE649286651ECE45B3DC2007CB8A163BF0598DA48361C55D39A69163FA8FD24CF5F"
+                      "83655D23DCA3AD961C62F356208552BB9ED529077096966D670C354E4ABC9804F1746C08CA18217C32905E462E36CE3B"
+                      "E39E772C180E86039B2783A2EC07A28FB5C55DF06F4C52C9DE2BCBF6955817183995497CEA956AE515D2261898FA0510"
+                      "15728E5A8AACAA68FFFFFFFFFFFFFFFF", 16)
+MODP_2048_GENERATOR = 2
+
 """
 Author: Chris Murphy (crm4042@g.rit.edu)
 """
@@ -26,7 +41,7 @@ def to_bin_of_size(x, n):
 def square_multiply(b, p, n):
 
     """
-    Does b^p (mod n) efficiently
+    Does b^p (mod n) efficiently with the native modular exponentiation
 
     :param b:                   int     The base of the exponentiation
     :param p:                   int     The power of the exponentiation
@@ -34,15 +49,7 @@ def square_multiply(b, p, n):
     :return:                    int     The resulting exponentiation
     """
 
-    result = 1
-    p = bin(p)[2:]
-
-    for index in range(len(p)):
-        result = (result ** 2) % n
-        if int(p[index]) == 1:
-            result = (result * b) % n
-
-    return result
+    return pow(b, p, n)
 
 
 def euclidean(x1, x2):
@@ -139,21 +146,286 @@ def inverse(x, n):
     :return:                    int     The inverse of x mod n
     """
 
-    if x == 1:
-        return 1
-    scale1, num_1, scale2, num_2 = extended_euclidean(x, n)
-    return scale1 % n if num_1 == x else scale2 % n
+    return pow(x, -1, n)
+
+
+class Fixed_Base:
+
+    """
+    Exponentiates a fixed base modulo a number with a table of its powers. Row i
+    of the table holds base^(d*2^(w*i)) for every w-bit digit d, so an exponent
+    costs one multiplication per nonzero digit and no squarings.
+    """
+
+    def __init__(self, base, modulus, order=None, window=FIXED_BASE_WINDOW):
+
+        """
+        Initializes the table of a base
+
+        :param base:                int     The base
+        :param modulus:             int     The modulus
+        :param order:               int     A multiple of the order of the base, such as
+                                            p-1 for a prime p, to reduce exponents by
+        :param window:              int     The bits of the exponent per row of the table
+        """
+
+        self.base = base % modulus
+        self.modulus = modulus
+        self.order = order
+        self.window = window
+        self.table = list()
+        self.next_base = self.base
+        self.extend((order or modulus).bit_length())
+
+    def extend(self, bits):
+
+        """
+        Extends the table to exponents of a number of bits
+
+        :param bits:                int     The number of bits
+        :return:                    None
+        """
+
+        while len(self.table)*self.window < bits:
+            row = [1]*(1 << self.window)
+            for digit in range(1, len(row)):
+                row[digit] = row[digit-1]*self.next_base % self.modulus
+            self.table.append(row)
+            self.next_base = row[-1]*self.next_base % self.modulus
+
+    def pow(self, exponent):
+
+        """
+        Raises the base to an exponent
+
+        :param exponent:            int     The exponent
+        :return:                    int     The base to the exponent, mod the modulus
+        """
+
+        if self.order is not None:
+            exponent %= self.order
+        elif exponent < 0:
+            return pow(self.base, exponent, self.modulus)
+        self.extend(exponent.bit_length())
+
+        result = 1
+        mask = (1 << self.window)-1
+        for row in self.table:
+            if exponent == 0:
+                break
+            digit = exponent & mask
+            if digit:
+                result = result*row[digit] % self.modulus
+            exponent >>= self.window
+        return result
+
+    def pow_batch(self, exponents):
+
+        """
+        Raises the base to each of many exponents
+
+        :param exponents:           list    The exponents
+        :return:                    list    The base to each exponent, mod the modulus
+        """
+
+        return [self.pow(exponent) for exponent in exponents]
+
+
+fixed_bases = dict()
+
+
+def fixed_base(base, modulus, order=None):
+
+    """
+    Gets the fixed-base table of a base and modulus, such as a generator and prime,
+    which is built once and kept for later exponentiations
+
+    :param base:                int     The base
+    :param modulus:             int     The modulus
+    :param order:               int     A multiple of the order of the base to reduce exponents by
+    :return:                    Fixed_Base  The table
+    """
+
+    key = (base, modulus, order)
+    if key not in fixed_bases:
+        fixed_bases[key] = Fixed_Base(base, modulus, order)
+    return fixed_bases[key]
+
+
+def batch_exp(bases, exponents, modulus, order=None):
+
+    """
+    Does many exponentiations modulo a number. A single base is raised to every
+    exponent with its fixed-base table; otherwise each base is raised to its own
+    exponent with the native modular exponentiation.
+
+    :param bases:               int/list    The base, or the base of each exponentiation
+    :param exponents:           list    The exponents
+    :param modulus:             int     The modulus
+    :param order:               int     A multiple of the order of the bases to reduce exponents by
+    :return:                    list    The results of the exponentiations
+    """
+
+    if isinstance(bases, int):
+        return fixed_base(bases, modulus, order).pow_batch(exponents)
+    if order is not None:
+        exponents = [exponent % order for exponent in exponents]
+    return [pow(base, exponent, modulus) for base, exponent in zip(bases, exponents)]
+
+
+def multi_exp(bases, exponents, modulus, order=None, window=MULTI_EXP_WINDOW):
+
+    """
+    Computes the product of the bases raised to their exponents modulo a number
+    with Straus' method, which shares the squarings between all of the bases
+
+    :param bases:               list    The bases
+    :param exponents:           list    The exponents, which are non-negative unless an order is given
+    :param modulus:             int     The modulus
+    :param order:               int     A multiple of the order of the bases to reduce exponents by
+    :param window:              int     The bits of the exponents handled at a time
+    :return:                    int     The product of the exponentiations, mod the modulus
+    """
+
+    if order is not None:
+        exponents = [exponent % order for exponent in exponents]
+
+    tables = list()
+    for base in bases:
+        row = [1]*(1 << window)
+        for digit in range(1, len(row)):
+            row[digit] = row[digit-1]*base % modulus
+        tables.append(row)
+
+    mask = (1 << window)-1
+    windows = -(-max([exponent.bit_length() for exponent in exponents]+[1]) // window)
+    result = 1
+    for position in range(windows-1, -1, -1):
+        for _ in range(window):
+            result = result*result % modulus
+        shift = position*window
+        for row, exponent in zip(tables, exponents):
+            digit = (exponent >> shift) & mask
+            if digit:
+                result = result*row[digit] % modulus
+    return result
 
 def hash(message):
 
     """
     Hashes a single message
 
-    :param message:             int/str The message to hash
+    :param message:             bytes/int/str The message to hash
     :return:                    bytes   The hashed message
     """
 
-    if isinstance(message, str):
+    if isinstance(message, bytes):
+        return nacl.hash.sha512(message, ENCODING)
+    elif isinstance(message, str):
         return nacl.hash.sha512(bytes(message, 'utf-8'), ENCODING)
     elif isinstance(message, int):
         return nacl.hash.sha512(message.to_bytes(int(math.ceil(len(bin(message)[2:])/8)), byteorder="little", signed=False), ENCODING)
+
+
+def prg(seed, n, counter=0):
+
+    """
+    Expands a seed into a pseudorandom number of a certain size. Each counter
+    gives an independent stream from the same seed.
+
+    :param seed:                int     The seed
+    :param n:                   int     The number of bits to generate
+    :param counter:             int     The stream of the seed
+    :return:                    int     The pseudorandom n-bit number
+    """
+
+    seed = seed.to_bytes(int(math.ceil(max(seed.bit_length(), 1)/8)), byteorder="little", signed=False)
+    if counter:
+        seed += counter.to_bytes(8, byteorder="little", signed=False)
+    expanded = int.from_bytes(hashlib.shake_128(seed).digest(int(math.ceil(n/8))), byteorder="little", signed=False)
+    return expanded & ((1 << n)-1)
+
+
+def transpose(columns, n):
+
+    """
+    Transposes a bit matrix stored as a list of n-bit integer columns, where bit
+    j of column i is entry (j, i), into a list of integer rows. The columns are
+    laid end to end in one integer, padded to a power of two each, and the bits
+    of the index of each entry are swapped from (column, row) to (row, column)
+    with a delta swap per pair, each of which shifts and masks the whole matrix
+    at once.
+
+    :param columns:             list    The columns of the matrix
+    :param n:                   int     The number of rows in the matrix
+    :return:                    list    The rows of the matrix, where bit i of row j is entry (j, i)
+    """
+
+    if n == 0:
+        return []
+    if len(columns) == 0:
+        return [0]*n
+
+    # The matrix, column by column, with 2^row_bits bits per column and 2^column_bits columns
+    row_bits = max(3, (n-1).bit_length())
+    column_bits = max(3, (len(columns)-1).bit_length())
+    column_bytes = 1 << (row_bits-3)
+    matrix = int.from_bytes(b"".join(column.to_bytes(column_bytes, byteorder="little", signed=False)
+                                     for column in columns), byteorder="little", signed=False)
+
+    # An entry's index is its row number in the low bits and its column number above them, and
+    # the bits of the index are swapped until the column number is in the low bits
+    layout = list(range(row_bits+column_bits))
+    target = list(range(row_bits, row_bits+column_bits))+list(range(row_bits))
+    for position, wanted in enumerate(target):
+        current = layout.index(wanted)
+        if current != position:
+            shift = (1 << current)-(1 << position)
+            mask = swap_mask(len(layout), position, current)
+            swapped = ((matrix >> shift) ^ matrix) & mask
+            matrix ^= swapped ^ (swapped << shift)
+            layout[position], layout[current] = layout[current], layout[position]
+
+    row_bytes = 1 << (column_bits-3)
+    data = matrix.to_bytes(row_bytes << row_bits, byteorder="little", signed=False)
+    return [int.from_bytes(data[start:start+row_bytes], byteorder="little", signed=False)
+            for start in range(0, n*row_bytes, row_bytes)]
+
+
+swap_masks = dict()
+
+
+def swap_mask(index_bits, low, high):
+
+    """
+    Gets the mask of the bits of an integer of 2^index_bits bits whose index has
+    bit low set and bit high clear, which are the bits a delta swap of the two
+    bits of the index moves up. The masks are built once and kept.
+
+    :param index_bits:          int     The number of bits of an index
+    :param low:                 int     The lower bit of the index
+    :param high:                int     The higher bit of the index
+    :return:                    int     The mask
+    """
+
+    key = (index_bits, low, high)
+    if key not in swap_masks:
+        # Sets the upper half of every period of 2^(low+1) bits, in the lower half of every
+        # period of 2^(high+1) bits
+        mask = repeat(((1 << (1 << low))-1) << (1 << low), 1 << (low+1), 1 << (high-low-1))
+        swap_masks[key] = repeat(mask, 1 << (high+1), 1 << (index_bits-high-1))
+    return swap_masks[key]
+
+
+def repeat(pattern, period, count):
+
+    """
+    Repeats a pattern of bits
+
+    :param pattern:             int     The pattern
+    :param period:              int     The number of bits between repeats
+    :param count:               int     The number of repeats
+    :return:                    int     The repeated pattern
+    """
+
+    return pattern*(((1 << (period*count))-1)//((1 << period)-1))
@@ -0,0 +1,413 @@
+import Circuit
+import Gate
+import KDF
+import Wire
+import YGC
+
+import multiprocessing
+import random
+import weakref
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+"""
+Author: Chris Murphy (crm4042@g.rit.edu)
+"""
+
+# Network Information
+HOST = "127.0.0.1"
+PORT = 13224
+
+# The plans of the chunks of each shared circuit, by the first gate and the number of gates of
+# the chunk, so that the instances of a session levelize the circuit once
+plans_of_circuit = weakref.WeakKeyDictionary()
+
+
+class YGC_Vector_Evaluator(YGC.YGC_Circuit_Evaluator):
+
+    """
+    The circuit evaluator in the YGC protocol, with the labels of the live
+    wires kept as the rows of a NumPy matrix of bytes, whose rows are reused
+    once their labels are freed. Each chunk is split into
+    levels of gates whose inputs are known, and every gate of a level is
+    evaluated at once: the inputs are gathered by wire number, hashed in one
+    batch, and the rows that their permute bits select are XORed in with array
+    operations. The levels of wide circuits hold many gates, where this pays
+    off; each level costs a few array operations, so small or deep circuits are
+    faster with YGC_Circuit_Evaluator. This needs the numpy package.
+    """
+
+    def __init__(self, *args, **kwargs):
+
+        """
+        Initializes the evaluator's protocol for the YGC, which takes the arguments of
+        YGC_Circuit_Evaluator
+        """
+
+        if numpy is None:
+            raise ValueError("The vector evaluator needs the numpy package")
+        super().__init__(*args, **kwargs)
+
+    def load_inputs(self, num_wires, inputs):
+
+        """
+        Stores the labels of the inputs of the circuit, in a matrix of the bytes of
+        the label of each live wire by slot. The live wires are kept sorted with
+        their slots, so that the slots of many wires are looked up at once.
+
+        :param num_wires:               int     The number of wires
+        :param inputs:                  dict    The value of the label of each input wire
+        :return:                        None
+        """
+
+        wires = numpy.fromiter((int(key) for key in inputs.keys()), dtype=numpy.int64, count=len(inputs))
+        order = numpy.argsort(wires, kind="stable")
+        self.live_wires = wires[order]
+        self.live_slots = numpy.arange(len(wires), dtype=numpy.int64)
+        self.free_slots = numpy.empty(0, dtype=numpy.int64)
+        self.num_slots = len(wires)
+        self.labels = numpy.zeros((max(len(wires), 1), Wire.LABEL_BYTES), dtype=numpy.uint8)
+        if len(inputs) > 0:
+            self.labels[:len(wires)] = matrix(b"".join([Gate.label_bytes(value) for value in inputs.values()]))[order]
+
+    def allocate(self, wires):
+
+        """
+        Gives slots to the labels of new wires, reusing the slots of freed labels
+        before growing the matrix
+
+        :param wires:                   ndarray The wire numbers, sorted
+        :return:                        None
+        """
+
+        reused = min(len(wires), len(self.free_slots))
+        fresh = len(wires)-reused
+        slots = numpy.concatenate((self.free_slots[len(self.free_slots)-reused:],
+                                   numpy.arange(self.num_slots, self.num_slots+fresh, dtype=numpy.int64)))
+        self.free_slots = self.free_slots[:len(self.free_slots)-reused]
+        self.num_slots += fresh
+        if self.num_slots > len(self.labels):
+            labels = numpy.zeros((max(self.num_slots, 2*len(self.labels)), Wire.LABEL_BYTES), dtype=numpy.uint8)
+            labels[:len(self.labels)] = self.labels
+            self.labels = labels
+
+        positions = numpy.searchsorted(self.live_wires, wires)
+        self.live_wires = numpy.insert(self.live_wires, positions, wires)
+        self.live_slots = numpy.insert(self.live_slots, positions, slots)
+
+    def release(self, wires):
+
+        """
+        Frees the labels of wires that no later gate uses, whose slots are reused
+
+        :param wires:                   list    The wire numbers
+        :return:                        None
+        """
+
+        wires = numpy.asarray(wires, dtype=numpy.int64)
+        positions = numpy.searchsorted(self.live_wires, wires)
+        live = positions < len(self.live_wires)
+        live[live] = self.live_wires[positions[live]] == wires[live]
+        positions = positions[live]
+        self.free_slots = numpy.concatenate((self.free_slots, self.live_slots[positions]))
+        self.live_wires = numpy.delete(self.live_wires, positions)
+        self.live_slots = numpy.delete(self.live_slots, positions)
+
+    def tables(self, rows, topology, layout):
+
+        """
+        Views the rows of a chunk as a matrix with a row of the garbled tables in
+        each of its rows, without converting them
+
+        :param rows:                    bytes   The rows of the garbled tables of the chunk
+        :param topology:                list    The types, first inputs, second inputs and outputs
+                                                of the gates of the chunk
+        :param layout:                  list    Whether or not the circuit is garbled with Free-XOR
+                                                and with half gates
+        :return:                        tuple   The matrix of the rows and the layout
+        """
+
+        return matrix(rows), layout
+
+    def evaluate(self, start, garbled_table, topology):
+
+        """
+        Evaluates a chunk of the garbled circuit a level at a time
+
+        :param start:                   int     The number of the first gate of the chunk
+        :param garbled_table:           tuple   The matrix of the rows of the chunk and their layout,
+                                                from tables
+        :param topology:                list    The types, first inputs, second inputs and outputs
+                                                of the gates of the chunk
+        :return:                        tuple   The gate numbers and slots of the output gates
+        """
+
+        kdf = self.kdf
+        size = Wire.LABEL_BYTES
+        rows, layout = garbled_table
+        levels, output_gates, output_wires, new_wires, wires = self.plan(start, topology, layout)
+
+        # The plan numbers the wires of the chunk from 0, which are mapped to their slots
+        self.allocate(new_wires)
+        labels = self.labels
+        slots = self.live_slots[numpy.searchsorted(self.live_wires, wires)]
+
+        for free_binary, free_unary, half, row_unary, row_binary in levels:
+
+            # Free-XOR gates output the XOR of their input labels
+            if free_binary is not None:
+                inputs0, inputs1, outputs = free_binary
+                labels[slots[outputs]] = labels[slots[inputs0]] ^ labels[slots[inputs1]]
+            if free_unary is not None:
+                inputs0, outputs = free_unary
+                labels[slots[outputs]] = labels[slots[inputs0]]
+
+            # Half gates hash both inputs and add in the ciphertexts their permute bits select
+            if half is not None:
+                inputs0, inputs1, outputs, offsets, tweaks = half
+                a = labels[slots[inputs0]]
+                b = labels[slots[inputs1]]
+                hashed = matrix(kdf.derive_packed(numpy.vstack((a, b)).tobytes(), size, tweaks, size))
+                labels[slots[outputs]] = hashed[:len(outputs)] ^ hashed[len(outputs):] ^ \
+                    numpy.where(permute_bits(a)[:, None], rows[offsets], 0) ^ \
+                    numpy.where(permute_bits(b)[:, None], rows[offsets+1] ^ a, 0)
+
+            # Otherwise the permute bits select the row that the hashed labels decrypt
+            if row_unary is not None:
+                inputs0, outputs, offsets, tweaks = row_unary
+                a = labels[slots[inputs0]]
+                hashed = matrix(kdf.derive_packed(a.tobytes(), size, tweaks, size))
+                labels[slots[outputs]] = hashed ^ rows[offsets+permute_bits(a)]
+            if row_binary is not None:
+                inputs0, inputs1, outputs, offsets, tweaks = row_binary
+                a = labels[slots[inputs0]]
+                b = labels[slots[inputs1]]
+                hashed = matrix(kdf.derive_packed(numpy.hstack((a, b)).tobytes(), 2*size, tweaks, size))
+                labels[slots[outputs]] = hashed ^ rows[offsets+(permute_bits(a) << 1)+permute_bits(b)]
+
+        return output_gates, slots[output_wires]
+
+    def plan(self, start, topology, layout):
+
+        """
+        Gets the gates of a chunk that have garbled tables and splits them into
+        levels, where the inputs of the gates of a level are inputs of the chunk or
+        outputs of earlier levels. Each level gathers the wires, the offsets of the
+        rows and the tweaks of its gates by how they are evaluated, so that
+        evaluating it takes only array operations and hashing. The plans of a
+        shared circuit are kept for the later instances of it.
+
+        :param start:                   int     The number of the first gate of the chunk
+        :param topology:                list    The types, first inputs, second inputs and outputs
+                                                of the gates of the chunk
+        :param layout:                  list    Whether or not the circuit is garbled with Free-XOR
+                                                and with half gates
+        :return:                        tuple   The Free-XOR gates with two inputs and with one, the half
+                                                gates and the other gates with one input and with two of
+                                                each level, each None if the level has none, the gate
+                                                numbers and output wires of the output gates, the wires
+                                                the chunk sets and the wire that each number of the plan
+                                                stands for
+        """
+
+        key = (start, len(topology[0]), tuple(layout))
+        if self.compiled is not None:
+            plans = plans_of_circuit.setdefault(self.compiled, dict())
+            if key in plans:
+                return plans[key]
+
+        types = numpy.asarray(topology[0], dtype=numpy.uint8)
+        gates = numpy.flatnonzero(types != Circuit.EQ_GATE)
+        inputs0 = numpy.asarray(topology[1], dtype=numpy.int64)[gates]
+        inputs1 = numpy.asarray(topology[2], dtype=numpy.int64)[gates]
+        outputs = numpy.asarray(topology[3], dtype=numpy.int64)[gates]
+        unary = numpy.isin(types[gates], Circuit.UNARY_GATES)
+        inputs1[unary] = inputs0[unary]
+
+        # Each gate is a level after the later of its inputs, in one pass in topological order
+        level_of_wire = dict()
+        gate_levels = list()
+        for input0, input1, output in zip(inputs0.tolist(), inputs1.tolist(), outputs.tolist()):
+            level = max(level_of_wire.get(input0, 0), level_of_wire.get(input1, 0))
+            gate_levels.append(level)
+            level_of_wire[output] = level+1
+        gate_levels = numpy.array(gate_levels, dtype=numpy.int64)
+
+        # Numbers the wires of the chunk from 0, in the order of their wire numbers
+        wires, numbered = numpy.unique(numpy.concatenate((inputs0, inputs1, outputs)), return_inverse=True)
+        new_wires = numpy.unique(outputs)
+        is_output = outputs >= self.first_output
+        inputs0, inputs1, outputs = numpy.split(numbered.astype(numpy.int64), 3)
+        gate_nums = gates+start
+
+        # The rows of the garbled table of each gate and where they start
+        rows_of_type = numpy.array([Circuit.table_rows(gate_type, *layout)
+                                    for gate_type in range(Circuit.OR_GATE+1)], dtype=numpy.int64)
+        lengths = rows_of_type[types[gates]]
+        offsets = numpy.cumsum(lengths)-lengths
+        free = lengths == 0
+        half = (lengths == 2) & ~unary
+
+        order = numpy.argsort(gate_levels, kind="stable")
+        levels = numpy.split(order, numpy.flatnonzero(numpy.diff(gate_levels[order]))+1) if len(gates) > 0 else []
+
+        # The wires, offsets and tweaks of a group of gates, or None for an empty group
+        def group(chosen, *arrays, uses=()):
+            if len(chosen) == 0:
+                return None
+            grouped = tuple(array[chosen] for array in arrays)
+            if len(uses) > 0:
+                grouped += (b"".join([tweak_bytes(gate_nums[chosen], use) for use in uses]),)
+            return grouped
+
+        planned = list()
+        for level in levels:
+            hashed = level[~free[level] & ~half[level]]
+            planned.append((group(level[free[level] & ~unary[level]], inputs0, inputs1, outputs),
+                            group(level[free[level] & unary[level]], inputs0, outputs),
+                            group(level[half[level]], inputs0, inputs1, outputs, offsets,
+                                  uses=(Gate.GENERATOR_HALF, Gate.EVALUATOR_HALF)),
+                            group(hashed[unary[hashed]], inputs0, outputs, offsets, uses=(Gate.ROW,)),
+                            group(hashed[~unary[hashed]], inputs0, inputs1, outputs, offsets, uses=(Gate.ROW,))))
+
+        plan = (planned, gate_nums[is_output], outputs[is_output], new_wires, wires)
+        if self.compiled is not None:
+            plans[key] = plan
+        return plan
+
+    def decode(self, output_labels, decoding_bits):
+
+        """
+        Decodes the outputs of the circuit from a chunk of gates
+
+        :param output_labels:           tuple   The gate numbers and slots of the output gates
+        :param decoding_bits:           int     The decoding bit of each output gate, in order
+        :return:                        dict    The output of each output gate by gate number
+        """
+
+        gate_nums, slots = output_labels
+        bits = numpy.unpackbits(numpy.frombuffer(decoding_bits.to_bytes((len(slots)+7)//8, byteorder="little",
+                                                                        signed=False), dtype=numpy.uint8),
+                                bitorder="little")[:len(slots)]
+        return dict(zip(gate_nums.tolist(), ((self.labels[slots, 0] & 1) ^ bits).tolist()))
+
+
+def matrix(data: bytes):
+
+    """
+    Views bytes as a matrix with a label in each row
+
+    :param data:                bytes   The bytes of the labels, in order
+    :return:                    ndarray The matrix
+    """
+
+    return numpy.frombuffer(data, dtype=numpy.uint8).reshape(-1, Wire.LABEL_BYTES)
+
+
+def permute_bits(labels):
+
+    """
+    Gets the permute bit of each label of a matrix
+
+    :param labels:              ndarray The labels, one in each row
+    :return:                    ndarray The permute bits
+    """
+
+    return (labels[:, 0] & 1).astype(numpy.int64)
+
+
+def tweak_bytes(gate_nums, use: int):
+
+    """
+    Packs the tweaks of a use of the KDF in each of many gates
+
+    :param gate_nums:           ndarray The gate numbers
+    :param use:                 int     The use of the KDF
+    :return:                    bytes   The tweak of each gate, KDF.TWEAK_BYTES bytes in little-endian order
+    """
+
+    tweaks = numpy.zeros((len(gate_nums), KDF.TWEAK_BYTES // 8), dtype="<u8")
+    tweaks[:, 0] = (gate_nums << 2) | use
+    return tweaks.tobytes()
+
+
+def and_circuit(bits: int):
+
+    """
+    Builds a circuit of the bitwise AND of the parties' inputs, whose gates all fall
+    in one level
+
+    :param bits:                int                 The number of bits of each input
+    :return:                    Compiled_Circuit    The circuit
+    """
+
+    compiled = Circuit.Compiled_Circuit(3*bits, [bits, bits], [bits])
+    for bit in range(bits):
+        compiled.add_gate(Circuit.AND_GATE, bit, bits+bit, 2*bits+bit)
+    return compiled
+
+
+def initialize_party(party_num, prime, generator, uniform1, uniform2, inputs_list, bits):
+
+    """
+    Runs instances of the bitwise AND with the vector evaluator. This is for testing.
+
+    :param party_num:           int     The party number
+    :param prime:               int     The corresponding prime
+    :param generator:           int     The generator for the prime
+    :param uniform1:            int     A random uniform number
+    :param uniform2:            int     A random uniform number
+    :param inputs_list:         list    The inputs of both parties in each instance
+    :param bits:                int     The number of bits of each input
+    :return:                    None
+    """
+
+    compiled = and_circuit(bits)
+
+    if party_num == 0:
+        session = YGC.YGC_Generator_Session(HOST, PORT, HOST, PORT+1, prime, generator, uniform1, uniform2)
+        try:
+            results = session.run_batch(YGC.garble(compiled, {wire: inputs[wire] for wire in range(bits)})
+                                        for inputs in inputs_list)
+        finally:
+            session.close()
+
+        correct = all([outputs[bit] for bit in range(bits)] == [inputs[bit] & inputs[bits+bit] for bit in range(bits)]
+                      for inputs, outputs in zip(inputs_list, results))
+        print(str(len(inputs_list))+" instances of a "+str(bits)+"-bit AND, "+("correct" if correct else "incorrect"))
+        print(str(round(session.evaluations_per_second(), 1))+" evaluations per second")
+
+    else:
+        session = YGC.YGC_Evaluator_Session(HOST, PORT+1, HOST, PORT, prime, generator, uniform1, uniform2,
+                                            compiled=compiled, evaluator=YGC_Vector_Evaluator)
+        try:
+            session.run_batch({wire: inputs[wire] for wire in range(bits, 2*bits)} for inputs in inputs_list)
+        finally:
+            session.close()
+
+
+def main():
+    prime = 2903
+    generator = 5
+    uniform1 = random.randint(1, 2903)
+    uniform2 = random.randint(1, 2903)
+    if uniform1 < uniform2:
+        uniform1, uniform2 = uniform2, uniform1
+    bits = 4096
+    inputs_list = [{wire: random.randint(0, 1) for wire in range(2*bits)} for _ in range(4)]
+
+    processes = [multiprocessing.Process(target=initialize_party, args=(party_num, prime, generator, uniform1,
+                                                                        uniform2, inputs_list, bits))
+                 for party_num in range(2)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == '__main__':
+    main()
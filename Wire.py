@@ -1,30 +1,182 @@
 import Utilities
-import random
+import os
 
-K = 100
+# The security parameter, which is the length of a label in bits. It is a whole number
+# of bytes, so that the garbled rows, which are truncated to the length of a label, are too.
+K = 128
+LABEL_BYTES = K // 8
+MIN_K = 80
 
 
 """
 Author: Chris Murphy (crm4042@g.rit.edu)
 """
 
+class Label:
+
+    """
+    Represents a single K-bit wire label. The label is held as an integer
+    whose least significant bit is the permute bit of the label.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: int):
+
+        """
+        Initializes a label from its integer value
+
+        :param value:       int         The K-bit value of the label
+        """
+
+        self.value = value
+
+    @classmethod
+    def random(cls, p: int):
+
+        """
+        Generates a random label with a given permute bit
+
+        :param p:           int         The permute bit of the label
+        :return:            Label       The random label
+        """
+
+        return cls((int.from_bytes(os.urandom(LABEL_BYTES), byteorder="little", signed=False) & ~1) | p)
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+
+        """
+        Reads a label from its byte representation
+
+        :param data:        bytes       The LABEL_BYTES bytes of the label
+        :return:            Label       The label
+        """
+
+        return cls(int.from_bytes(data, byteorder="little", signed=False))
+
+    @property
+    def p(self):
+
+        """
+        The permute bit of the label
+
+        :return:            int         The permute bit
+        """
+
+        return self.value & 1
+
+    def to_bytes(self):
+
+        """
+        Gets the byte representation of the label
+
+        :return:            bytes       The LABEL_BYTES bytes of the label
+        """
+
+        return self.value.to_bytes(LABEL_BYTES, byteorder="little", signed=False)
+
+    def __xor__(self, other):
+        return Label(self.value ^ other.value)
+
+    def __eq__(self, other):
+        return isinstance(other, Label) and self.value == other.value
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __repr__(self):
+        return "Label(%0*x)" % (2*LABEL_BYTES, self.value)
+
+
 class Wire:
 
     """
     Represents a single wire on the circuit.
     """
 
-    def __init__(self):
+    def __init__(self, delta=None):
+
+        """
+        Initializes a wire with a pair of labels carrying opposite permute bits
+
+        :param delta:       Label       The global Free-XOR offset; if given, the label
+                                        for 1 is the label for 0 XORed with it
+        """
+
+        self.delta = delta
+        p = os.urandom(1)[0] & 1
+        if delta is None:
+            self.k = [Label.random(p), Label.random(1-p)]
+        else:
+            self.set_zero_label(Label.random(p))
+
+    @classmethod
+    def from_values(cls, values: list, delta=None):
+
+        """
+        Rebuilds a wire from the values of its labels
+
+        :param values:      list        The values of the labels for 0 and 1
+        :param delta:       Label       The global Free-XOR offset, or None
+        :return:            Wire        The wire
+        """
+
+        wire = cls.__new__(cls)
+        wire.delta = delta
+        wire.k = [Label(value) for value in values]
+        return wire
+
+    def set_zero_label(self, label: Label):
+
+        """
+        Sets the labels of a Free-XOR wire from its label for 0
+
+        :param label:       Label       The label for 0
+        :return:            None
+        """
+
+        self.k = [label, label ^ self.delta]
+
+    @property
+    def p(self):
 
         """
-        Initializes a wire with k and p values
+        The permute bits of the wire's labels
+
+        :return:            list        The permute bits of the labels for 0 and 1
         """
 
-        self.k = [bin(random.getrandbits(K))[2:], bin(random.getrandbits(K))[2:]]
-        for b in range(2):
-            self.k[b] = ("0"*(K-len(self.k[b])))+self.k[b]
-        self.p = [random.randint(0, 1)]
-        self.p.append(1-self.p[0])
+        return [self.k[0].p, self.k[1].p]
+
+
+def random_delta():
+
+    """
+    Generates a global Free-XOR offset. Its permute bit is 1 so that the two
+    labels of every wire carry opposite permute bits.
+
+    :return:                Label       The offset
+    """
+
+    return Label.random(1)
+
+
+def set_k(k: int):
+
+    """
+    Sets the security parameter, which is the length of the labels. Both parties
+    must set the same length before they garble or evaluate.
+
+    :param k:               int         The length of a label in bits, a multiple of 8
+    :return:                None
+    """
+
+    global K, LABEL_BYTES
+    if k % 8 != 0 or k < MIN_K:
+        raise ValueError("Labels must be a whole number of bytes and at least "+str(MIN_K)+" bits")
+    K = k
+    LABEL_BYTES = k // 8
 
 
 def main():
@@ -1,19 +1,29 @@
 import Circuit
 import Gate
+import KDF
+import Metrics
 import Node
-import OT
-import Utilities
+import OT_Extension
 import Wire
-import copy
 import multiprocessing
 import random
+import time
 
 # Network Information
-PORTS_NEEDED = 2
+PORTS_NEEDED = 1
 START_PORT = 12024
 STOP = "STOP"
 HOST = "127.0.0.1"
 
+# Streaming Information
+CHUNK_SIZE = 1024
+WINDOW = 4
+
+# Garbling Information
+FREE_XOR = True
+HALF_GATES = FREE_XOR
+PROCESSES = 1
+
 
 """
 Author: Chris Murphy (crm4042@g.rit.edu)
@@ -26,20 +36,33 @@ class YGC_Circuit_Generator:
     The circuit generator in the YGC protocol
     """
 
-    def __init__(self, host, port, partner_host, partner_port, circuit, prime, generator, uniform1, uniform2):
+    def __init__(self, host, port, partner_host, partner_port, circuit, prime, generator, uniform1, uniform2,
+                 chunk_size=CHUNK_SIZE, processes=PROCESSES, node=None, ot=None, pool=None, recorder=None):
 
         """
-        Initializes the sender protocol of the YGC
+        Initializes the sender protocol of the YGC. The protocol connects a node of its
+        own, unless it is given an open node or a channel of one.
 
         :param host:            str     The host name
         :param port:            int     The port number
         :param partner_host:    str     The host name of the partner
         :param partner_port:    int     The port number of the partner
-        :param circuit:         Circuit The circuit to be evaluated
+        :param circuit:         Circuit The circuit to be evaluated, or an instance from a Garbled_Store
         :param prime:           int     A prime
         :param generator:       int     A generator for the prime
         :param uniform1:        int     A uniform number
         :param uniform2:        int     A uniform number
+        :param chunk_size:      int     The number of gates to garble and send at a time,
+                                        or None to send the whole circuit at once
+        :param processes:       int     The number of processes to garble the chunks across, which
+                                        is also the number of processes of the given pool
+        :param node:            Node    An open node, or a channel of one, to run over
+        :param ot:              IKNP_Sender     The OT extension to transfer the evaluator's inputs with,
+                                                so that its base OTs are shared between runs
+        :param pool:            Pool    The pool of processes to garble with, instead of one of
+                                        the given number of processes
+        :param recorder:        Recorder    Records the time of each phase and the counts of
+                                            messages, bytes, gates and hashes, or None
         """
 
         # Network information
@@ -49,77 +72,189 @@ class YGC_Circuit_Generator:
         self.partner_port = partner_port
 
         # Creates a communication node
-        self.node = Node.Node(self.host, self.port)
-        self.node.connect([(self.partner_host, self.partner_port)])
+        self.recorder = recorder
+        self.own_node = node is None
+        if self.own_node:
+            node = Node.Node(self.host, self.port, recorder)
+            node.connect([(self.partner_host, self.partner_port)])
+        self.node = node
         self.round_num = 0
 
         # Sets the circuit
         self.circuit = circuit
+        self.chunk_size = chunk_size
+        self.processes = processes
+        self.pool = pool
 
         # Sets the OT information
         self.prime = prime
         self.generator = generator
         self.uniform1 = uniform1
         self.uniform2 = uniform2
+        self.ot = ot or OT_Extension.IKNP_Sender(self.node, (self.partner_host, self.partner_port), self.prime,
+                                                 self.generator, self.uniform1, self.uniform2, [], [])
 
         # Runs YGC
         try:
             self.result = self.protocol()
         finally:
-            self.node.close()
+            if self.own_node:
+                self.node.close()
+        self.report = None if recorder is None else recorder.report()
 
     def protocol(self):
 
         """
-        The protocol corresponding to the sender's side of YGC.
+        The protocol corresponding to the sender's side of YGC. The circuit is
+        garbled and streamed to the evaluator in chunks of gates, so that garbling,
+        transfer and evaluation overlap.
 
-        :return:                list    The evaluated circuit
+        :return:                dict    The outputs of the circuit
         """
 
-        # Aggregates the circuit into a sendable format
-        aggregate_garbled_table = list()
-        aggregate_output_decoding_table = list()
-        gate_possible_inputs = dict()
-        input_dict = dict()
-        for gate in self.circuit.gates:
-            aggregate_garbled_table.append(gate.garbled_table)
-            aggregate_output_decoding_table.append(gate.output_decoding_table)
-            gate_possible_inputs[gate.gate_num_str] = [(wire.k[0], wire.p[0]) for wire in gate.inputs]+\
-                                                      [(wire.k[1], wire.p[1]) for wire in gate.inputs]
-            random.shuffle(gate_possible_inputs[gate.gate_num_str])
+        recorder = self.recorder
+
+        # Counts the hashes of the gates as they are garbled
+        self.circuit.kdf = Metrics.counting_kdf(self.circuit.kdf, recorder)
+
+        # Sends the length of the labels, the KDF, the number of wires, the first output wire, the
+        # labels of the generator's inputs and the decoding bits of the outputs that EQ gates set
+        with Metrics.phase(recorder, "inputs"):
+            input_dict = dict()
+            for key in self.circuit.inputs.keys():
+                input_dict[int(key)] = self.circuit.get_wire_corresponding_to(key, self.circuit.inputs[key]).value
+            self.node.send_messages({(self.partner_host, self.partner_port):
+                                     [Wire.K, self.circuit.kdf.name, self.circuit.compiled.num_wires,
+                                      self.circuit.compiled.output_wires().start, input_dict,
+                                      self.constant_outputs(self.circuit)]})
+
+        # Receives the evaluator's input wires, and whether it shares the description of the circuit,
+        # and transfers both labels of each input wire in bulk
+        with Metrics.phase(recorder, "ot"):
+            keys, has_topology = self.node.get_message_at(self.round_num)
+            self.round_num += 1
+            if len(keys) > 0:
+                labels0 = [self.circuit.get_wire_corresponding_to(key, 0).value for key in keys]
+                labels1 = [self.circuit.get_wire_corresponding_to(key, 1).value for key in keys]
+                channel = self.node.open_channel()
+                self.ot.extend(channel, labels0, labels1)
+                channel.close()
+
+        # Streams the circuit, with at most WINDOW chunks waiting on the evaluator. A circuit
+        # from a store is already garbled, and its chunks are ranges of the store's file.
+        pool = self.pool
+        if pool is None and self.processes > 1 and isinstance(self.circuit, Circuit.Circuit):
+            pool = multiprocessing.Pool(self.processes)
+        try:
+            num_chunks = 0
+            chunks = self.circuit.chunks(self.chunk_size, pool, self.processes)
+            while True:
+                with Metrics.phase(recorder, "garble"):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                if num_chunks >= WINDOW:
+                    with Metrics.phase(recorder, "wait"):
+                        self.node.get_message_at(self.round_num, release=True)
+                    self.round_num += 1
+                with Metrics.phase(recorder, "send"):
+                    if not isinstance(chunk, list):
+                        self.node.send_file((self.partner_host, self.partner_port),
+                                            [chunk.start, chunk.stop,
+                                             None if has_topology else self.topology(self.circuit.compiled,
+                                                                                     chunk.start, chunk.stop),
+                                             chunk.decoding_bits, chunk.store.layout], chunk.store.file,
+                                            chunk.offset, chunk.count)
+                    else:
+                        self.node.send_messages({(self.partner_host, self.partner_port):
+                                                 self.aggregate(chunk, self.circuit.compiled, not has_topology)})
+                num_chunks += 1
+                if recorder is not None:
+                    recorder.count("gates", len(chunk))
+        finally:
+            if pool is not None and pool is not self.pool:
+                pool.close()
+                pool.join()
+        self.node.send_messages({(self.partner_host, self.partner_port): STOP})
+
+        # Receives the outputs after the remaining acknowledgements of the chunks
+        with Metrics.phase(recorder, "wait"):
+            outputs = self.node.get_message_at(self.round_num)
+            self.round_num += 1
+            while isinstance(outputs, int):
+                outputs = self.node.get_message_at(self.round_num)
+                self.round_num += 1
 
-        for key in self.circuit.inputs.keys():
-            input_dict[int(key)] = self.circuit.get_wire_corresponding_to(key, self.circuit.inputs[key])
+        return outputs
 
-        # Sends the circuit
-        message1 = [aggregate_garbled_table, aggregate_output_decoding_table, gate_possible_inputs, input_dict]
-        self.node.send_messages({(self.partner_host, self.partner_port): message1})
+    @staticmethod
+    def aggregate(gates, compiled, send_topology):
 
-        # Runs the OT protocols
-        while True:
-            message2 = self.node.get_message_at(self.round_num)
-            self.round_num += 1
+        """
+        Aggregates a chunk of gates into a sendable format. The chunk covers a range
+        of the gates of the compiled circuit, and its topology is sent unless the
+        evaluator has the compiled circuit already. The rows of the garbled tables
+        are sent as raw bytes, laid out as in a Garbled_Store, so that evaluators
+        that keep labels as bytes need not convert them.
+
+        :param gates:           list                The garbled gates
+        :param compiled:        Compiled_Circuit    The topology of the circuit
+        :param send_topology:   bool                Whether or not to send the topology of the chunk
+        :return:                list                The range of the gates, the topology of the range or
+                                                    None, the decoding bits of the output gates, packed
+                                                    into an int in order, the layout of the rows and
+                                                    the rows of the garbled tables
+        """
 
-            # Stops the OT
-            if not isinstance(message2, int):
-                break
+        start = gates[0].gate_num
+        stop = gates[-1].gate_num+1
 
-            # Gets the input wires
-            wire0 = self.circuit.get_wire_corresponding_to(message2, 0)
-            wire1 = self.circuit.get_wire_corresponding_to(message2, 1)
+        rows = list()
+        decoding_bits = 0
+        num_outputs = 0
+        for gate in gates:
+            rows.extend(gate.garbled_table)
+            if gate.is_output:
+                decoding_bits |= gate.decoding_bit() << num_outputs
+                num_outputs += 1
 
-            wire0_str = wire0[0]+str(wire0[1])
-            wire1_str = wire1[0]+str(wire1[1])
+        topology = YGC_Circuit_Generator.topology(compiled, start, stop) if send_topology else None
+        layout = [gates[0].output.delta is not None, gates[0].half_gates]
 
-            wire0_int = int(wire0_str, 2)
-            wire1_int = int(wire1_str, 2)
+        return [start, stop, topology, decoding_bits, layout, b"".join([Gate.label_bytes(row) for row in rows])]
 
-            OT.OT_Sender(self.host, self.port+1, self.partner_host, self.partner_port+1, self.prime, self.generator,
-                         self.uniform1, self.uniform2, wire0_int, wire1_int).protocol()
+    @staticmethod
+    def constant_outputs(circuit):
 
-        outputs = message2
+        """
+        Gets the decoding bits of the outputs that EQ gates set, whose labels are
+        sent with the generator's inputs rather than set by garbled gates
 
-        return outputs
+        :param circuit:         Circuit             The circuit, or an instance from a Garbled_Store
+        :return:                list                The gate number, output wire and decoding bit of
+                                                    each such output
+        """
+
+        return [[gate_num, wire, circuit.label_value(wire, 0) & 1]
+                for gate_num, wire in circuit.compiled.constant_outputs()]
+
+    @staticmethod
+    def topology(compiled, start, stop):
+
+        """
+        Gets the topology of a range of gates as the type and wire numbers of each
+        gate, and the wires whose labels the range uses last
+
+        :param compiled:        Compiled_Circuit    The topology of the circuit
+        :param start:           int                 The index of the first gate
+        :param stop:            int                 The index after the last gate
+        :return:                list                The types, first inputs, second inputs and outputs,
+                                                    and the wires the evaluator frees after the range
+        """
+
+        return [compiled.types[start:stop].tolist(), compiled.inputs0[start:stop].tolist(),
+                compiled.inputs1[start:stop].tolist(), compiled.outputs[start:stop].tolist(),
+                compiled.released_wires(start, stop).tolist()]
 
 
 class YGC_Circuit_Evaluator:
@@ -128,10 +263,12 @@ class YGC_Circuit_Evaluator:
     The circuit evaluator in the YGC protocol
     """
 
-    def __init__(self, host, port, partner_host, partner_port, inputs, prime, generator, uniform1, uniform2):
+    def __init__(self, host, port, partner_host, partner_port, inputs, prime, generator, uniform1, uniform2,
+                 kdf=KDF.DEFAULT, node=None, ot=None, recorder=None, compiled=None):
 
         """
-        Initializes the evaluator's protocol for the YGC.
+        Initializes the evaluator's protocol for the YGC. The protocol connects a node of
+        its own, unless it is given an open node or a channel of one.
 
         :param host:            str     The host name
         :param port:            int     The port number
@@ -142,6 +279,14 @@ class YGC_Circuit_Evaluator:
         :param generator:       int     A generator for the prime
         :param uniform1:        int     A uniform number
         :param uniform2:        int     A uniform number
+        :param kdf:             str     The name of the KDF the circuit was garbled with
+        :param node:            Node    An open node, or a channel of one, to run over
+        :param ot:              IKNP_Receiver   The OT extension to receive the inputs' labels with,
+                                                so that its base OTs are shared between runs
+        :param recorder:        Recorder    Records the time of each phase and the counts of
+                                            messages, bytes, gates and hashes, or None
+        :param compiled:        Compiled_Circuit    The description of the circuit, which both parties
+                                                    share, or None for the generator to send its topology
         """
 
         # Network information
@@ -151,18 +296,26 @@ class YGC_Circuit_Evaluator:
         self.partner_port = partner_port
 
         # Creates a communication node
-        self.node = Node.Node(self.host, self.port)
-        self.node.connect([(self.partner_host, self.partner_port)])
+        self.recorder = recorder
+        self.own_node = node is None
+        if self.own_node:
+            node = Node.Node(self.host, self.port, recorder)
+            node.connect([(self.partner_host, self.partner_port)])
+        self.node = node
         self.round_num = 0
 
         # The inputs to the protocol
         self.inputs = inputs
+        self.kdf = Metrics.counting_kdf(KDF.get(kdf), recorder)
+        self.compiled = compiled
 
         # Sets the OT information
         self.prime = prime
         self.generator = generator
         self.uniform1 = uniform1
         self.uniform2 = uniform2
+        self.ot = ot or OT_Extension.IKNP_Receiver(self.node, (self.partner_host, self.partner_port), self.prime,
+                                                   self.generator, self.uniform1, self.uniform2, [])
 
         # Runs the protocol
         try:
@@ -170,167 +323,571 @@ class YGC_Circuit_Evaluator:
 
         # Closes the node
         finally:
-            self.node.close()
+            if self.own_node:
+                self.node.close()
+        self.report = None if recorder is None else recorder.report()
 
     def protocol(self):
 
         """
-        The protocol for the YGC evaluator
+        The protocol for the YGC evaluator. The circuit is evaluated a chunk
+        of gates at a time, as the chunks arrive.
 
         :return:                dict        The outputs of the circuit
         """
 
-        # Receives the garbled table
-        garbled_table, output_decoding_table, gate_possible_inputs, inputs = self.node.get_message_at(self.round_num)
-        self.round_num += 1
+        recorder = self.recorder
+
+        # Receives the length of the labels, the KDF, the number of wires, the first output wire, the
+        # labels of the generator's inputs and the decoding bits of the outputs that EQ gates set
+        with Metrics.phase(recorder, "inputs"):
+            k, kdf, num_wires, self.first_output, inputs, constant_outputs = \
+                self.node.get_message_at(self.round_num)
+            self.round_num += 1
+            if k != Wire.K:
+                raise ValueError("The generator's labels are "+str(k)+" bits, but the evaluator's are "+
+                                 str(Wire.K)+" bits")
+            if kdf != self.kdf.name:
+                raise ValueError("The generator garbled with the "+str(kdf)+" KDF, but the evaluator hashes "
+                                 "with the "+str(self.kdf.name)+" KDF")
+
+        # Sends the wire numbers and obliviously transfers their labels in bulk
+        with Metrics.phase(recorder, "ot"):
+            keys = list(self.inputs.keys())
+            self.node.send_messages({(self.partner_host, self.partner_port): [keys, self.compiled is not None]})
+            if len(keys) > 0:
+                channel = self.node.open_channel()
+                results = self.ot.extend(channel, [self.inputs[key] for key in keys])
+                channel.close()
+                inputs.update(zip(keys, results))
+
+        self.load_inputs(num_wires, inputs)
+
+        # Feeds the inputs forward in the circuit as its chunks arrive
+        outputs = self.decode_constants(inputs, constant_outputs)
+        num_chunks = 0
+        while True:
+            with Metrics.phase(recorder, "receive"):
+                chunk = self.node.get_message_at(self.round_num, release=True)
+            self.round_num += 1
+            if chunk == STOP:
+                break
+
+            # The rows of the garbled tables are raw bytes, as they are in a store
+            start, stop, topology, decoding_bits, layout, rows = chunk
+            if topology is None:
+                topology = [self.compiled.types[start:stop], self.compiled.inputs0[start:stop],
+                            self.compiled.inputs1[start:stop], self.compiled.outputs[start:stop],
+                            self.compiled.released_wires(start, stop)]
+
+            with Metrics.phase(recorder, "evaluate"):
+                output_labels = self.evaluate(start, self.tables(rows, topology, layout), topology)
+            with Metrics.phase(recorder, "decode"):
+                outputs.update(self.decode(output_labels, decoding_bits))
+
+            # Frees the labels that no later chunk uses, so that the labels kept are only those of
+            # the wires that are still live rather than of the whole circuit
+            self.release(topology[4])
+            if recorder is not None:
+                recorder.count("gates", len(topology[0])-list(topology[0]).count(Circuit.EQ_GATE))
+
+            # Acknowledges the chunk
+            num_chunks += 1
+            with Metrics.phase(recorder, "send"):
+                self.node.send_messages({(self.partner_host, self.partner_port): num_chunks})
+
+        with Metrics.phase(recorder, "send"):
+            self.node.send_messages({(self.partner_host, self.partner_port): outputs})
+
+        return outputs
+
+    def load_inputs(self, num_wires, inputs):
+
+        """
+        Stores the labels of the inputs of the circuit, in a dict of the value of
+        the label of each live wire by wire number
+
+        :param num_wires:               int     The number of wires
+        :param inputs:                  dict    The value of the label of each input wire
+        :return:                        None
+        """
+
+        self.labels = {int(key): value for key, value in inputs.items()}
 
-        # Makes a dictionary for output decoding table mapping gates to the output
-        gate_to_output = dict()
+    def release(self, wires):
 
-        # Makes sure the keys are ints
-        keys = copy.copy(list(inputs.keys()))
-        for key in keys:
-            inputs[int(key)] = tuple(inputs.pop(key))
+        """
+        Frees the labels of wires that no later gate uses
 
-        # Oblivious transfer loop
-        for key in self.inputs:
-            # Sends the wire number
-            self.node.send_messages({(self.partner_host, self.partner_port): key})
+        :param wires:                   list    The wire numbers
+        :return:                        None
+        """
 
-            choice = self.inputs[key]+1
+        labels = self.labels
+        for wire in wires:
+            labels.pop(wire, None)
 
-            # Performs an oblivious transfer
-            result = OT.OT_Receiver(self.host, self.port+1, self.partner_host, self.partner_port+1, self.prime,
-                                    self.generator, self.uniform1, self.uniform2, choice).protocol()
+    def tables(self, rows, topology, layout):
 
-            result_bin = bin(result)[2:]
-            result_bin = ("0"*(Wire.K+1-len(result_bin)))+result_bin
-            wire = (result_bin[:-1], int(result_bin[-1]))
+        """
+        Parses the rows of a chunk into the garbled table of each gate
+
+        :param rows:                    bytes   The rows of the garbled tables of the chunk
+        :param topology:                list    The types, first inputs, second inputs and outputs
+                                                of the gates of the chunk
+        :param layout:                  list    Whether or not the circuit is garbled with Free-XOR
+                                                and with half gates
+        :return:                        list    The garbled table of each gate, less EQ gates
+        """
 
-            inputs[int(key)] = wire
+        return Circuit.parse_rows(rows, topology, layout)
 
-        # Feeds the inputs forward in the circuit
-        for gate_num_str in gate_possible_inputs.keys():
-            gate_num_int = int(gate_num_str, 2)
+    def evaluate(self, start, garbled_table, topology):
 
-            # Inverts the inputs to allow to find the wire order
-            inverted_inputs = {tuple(value): int(key) for key, value in inputs.items()}
+        """
+        Evaluates a chunk of the garbled circuit. The labels are kept by wire number
+        and the topology gives the wires of each gate, so that the inputs of each
+        gate are read directly and each gate costs at most one hash.
+
+        :param start:                   int     The number of the first gate of the chunk
+        :param garbled_table:           list    The garbled table of each gate, less EQ gates
+        :param topology:                list    The types, first inputs, second inputs and outputs
+                                                of the gates of the chunk
+        :return:                        list    The output label, as a tuple of the value of the
+                                                label and the gate number, of each output gate
+        """
 
-            # Finds the actual inputs to the gate
-            gate_inputs = list()
-            for possible_input in gate_possible_inputs[gate_num_str]:
-                if tuple(possible_input) in inverted_inputs.keys():
-                    gate_inputs.append((inverted_inputs[tuple(possible_input)], tuple(possible_input)))
+        labels = self.labels
+        kdf = self.kdf
+        first_output = self.first_output
 
-            gate_inputs.sort()
-            gate_inputs = [ipt[1] for ipt in gate_inputs]
+        output_labels = list()
+        tables = iter(garbled_table)
+        for gate_num, (gate_type, input0, input1, output_wire) in enumerate(zip(*topology[:4]), start):
 
-            # Finds the correct index in the garbled table
-            concated_wire_labels = ""
-            reverse_concated_wire_labels = ""
-            garbled_table_index = ""
-            reverse_garbled_table_index = ""
-            for ipt in gate_inputs:
-                concated_wire_labels += str(ipt[0])
-                reverse_concated_wire_labels = str(ipt[0])+reverse_concated_wire_labels
-                garbled_table_index += str(ipt[1])
-                reverse_garbled_table_index = str(ipt[1])+reverse_garbled_table_index
-            concated_wire_labels += gate_num_str
-            try:
-                garbled_table_index = int(garbled_table_index, 2)
-            except:
-                print()
-            reverse_concated_wire_labels += gate_num_str
-            reverse_garbled_table_index = int(reverse_garbled_table_index, 2)
+            # The labels of EQ gates are inputs of the generator
+            if gate_type == Circuit.EQ_GATE:
+                continue
+            gate_table = next(tables)
+            a = labels[input0]
+            b = None if gate_type in Circuit.UNARY_GATES else labels[input1]
 
+            # Free-XOR gates have no garbled table and output the XOR of their input labels
+            if len(gate_table) == 0:
+                output = a if b is None else a ^ b
 
+            # Half gates have two ciphertexts for their two inputs
+            elif b is not None and len(gate_table) == 2:
+                output = Gate.evaluate_half_gate(a, b, gate_table, gate_num, kdf)
 
-            try:
-                output = int.from_bytes(Utilities.hash(concated_wire_labels), byteorder="little", signed=False) ^ \
-                     garbled_table[gate_num_int][garbled_table_index]
-            except:
-                print()
-            output = bin(output)[2:]
-            output = ("0"*(Wire.K+1-len(output)))+output
+            # Otherwise the permute bits select the row that the hashed labels decrypt
+            elif b is None:
+                output = kdf.derive(Gate.label_bytes(a), Gate.gate_tweak(gate_num, Gate.ROW), Wire.LABEL_BYTES) ^ \
+                    gate_table[a & 1]
+            else:
+                output = kdf.derive(Gate.label_bytes(a)+Gate.label_bytes(b), Gate.gate_tweak(gate_num, Gate.ROW),
+                                    Wire.LABEL_BYTES) ^ gate_table[((a & 1) << 1) | (b & 1)]
 
-            r_output = int.from_bytes(Utilities.hash(reverse_concated_wire_labels), byteorder="little", signed=False) ^ \
-                     garbled_table[gate_num_int][reverse_garbled_table_index]
-            r_output = bin(r_output)[2:]
-            r_output = ("0" * (Wire.K + 1 - len(output))) + r_output
+            labels[output_wire] = output
+            if output_wire >= first_output:
+                output_labels.append((output, gate_num))
 
-            wire_label = output[:-1]
-            wire_activation = int(output[-1])
+        return output_labels
 
-            key = max(inputs.keys())+1
-            inputs[key] = (wire_label, wire_activation)
-            gate_to_output[gate_num_int] = (wire_label, wire_activation, gate_num_str)
+    @staticmethod
+    def decode_constants(inputs, constant_outputs):
+
+        """
+        Decodes the outputs that EQ gates set, whose labels are inputs of the
+        generator, in the same way as the outputs of the garbled gates
+
+        :param inputs:                  dict    The value of the label of each input wire
+        :param constant_outputs:        list    The gate number, output wire and decoding bit of
+                                                each output that an EQ gate sets
+        :return:                        dict    The output of each such gate by gate number
+        """
+
+        return {gate_num: (inputs[wire] ^ bit) & 1 for gate_num, wire, bit in constant_outputs}
+
+    def decode(self, output_labels, decoding_bits):
+
+        """
+        Decodes the outputs of the circuit from a chunk of gates. Each output is the
+        permute bit of its label XORed with its decoding bit, so decoding needs no
+        hashing.
+
+        :param output_labels:           list    The output label of each output gate
+        :param decoding_bits:           int     The decoding bit of each output gate, in order
+        :return:                        dict    The output of each output gate by gate number
+        """
 
         outputs = dict()
-        for element in range(len(output_decoding_table)):
-            if len(output_decoding_table[element]) != 0:
-                element_output = gate_to_output[element]
-                hashed_value = int.from_bytes(Utilities.hash(element_output[0]+Gate.OUT+element_output[-1]),
-                                              byteorder="little", signed=False)
-                for possible_output in output_decoding_table[element]:
-                    output = possible_output ^ hashed_value
-                    if output <= 1:
-                        outputs[element_output[-1]] = output
-                        break
-
-        # Stop OT communication
-        self.node.send_messages({(self.partner_host, self.partner_port): outputs})
+        for index, (value, gate_num) in enumerate(output_labels):
+            outputs[gate_num] = (value ^ (decoding_bits >> index)) & 1
 
         return outputs
 
 
-def initialize_adder(party_num, prime, generator, uniform1, uniform2, inputs):
+class YGC_Generator_Session:
 
     """
-    Initializes the protocol for the adder's circuit
+    Runs many instances of the generator's protocol over one connection. The node,
+    the base OTs and the pool of processes are set up once, and each instance runs
+    on a channel of its own with a freshly garbled circuit.
+    """
+
+    def __init__(self, host, port, partner_host, partner_port, prime, generator, uniform1, uniform2,
+                 chunk_size=CHUNK_SIZE, processes=PROCESSES, recorder=None):
+
+        """
+        Connects the generator's side of a session
+
+        :param host:            str     The host name
+        :param port:            int     The port number
+        :param partner_host:    str     The host name of the partner
+        :param partner_port:    int     The port number of the partner
+        :param prime:           int     A prime
+        :param generator:       int     A generator for the prime
+        :param uniform1:        int     A uniform number
+        :param uniform2:        int     A uniform number
+        :param chunk_size:      int     The number of gates to garble and send at a time
+        :param processes:       int     The number of processes to garble the chunks across
+        :param recorder:        Recorder    Records the phases and counts of every instance, or None
+        """
+
+        self.host = host
+        self.port = port
+        self.partner_host = partner_host
+        self.partner_port = partner_port
+        self.prime = prime
+        self.generator = generator
+        self.uniform1 = uniform1
+        self.uniform2 = uniform2
+        self.chunk_size = chunk_size
+
+        self.recorder = recorder
+        self.node = Node.Node(self.host, self.port, recorder)
+        self.node.connect([(self.partner_host, self.partner_port)])
+        self.ot = OT_Extension.IKNP_Sender(self.node, (self.partner_host, self.partner_port), self.prime,
+                                           self.generator, self.uniform1, self.uniform2, [], [])
+        self.processes = processes
+        self.pool = multiprocessing.Pool(processes) if processes > 1 else None
+
+        # The number of instances run and the time spent running them
+        self.instances = 0
+        self.elapsed = 0
+
+    def run(self, circuit):
+
+        """
+        Runs an instance of the protocol on the session's next channel. The circuit
+        must be garbled for this instance alone.
+
+        :param circuit:         Circuit The circuit to be evaluated, or an instance from a Garbled_Store
+        :return:                dict    The outputs of the circuit
+        """
+
+        channel = self.node.open_channel()
+        start = time.perf_counter()
+        try:
+            ygc = YGC_Circuit_Generator(self.host, self.port, self.partner_host, self.partner_port, circuit,
+                                        self.prime, self.generator, self.uniform1, self.uniform2, self.chunk_size,
+                                        self.processes, node=channel, ot=self.ot, pool=self.pool,
+                                        recorder=self.recorder)
+        finally:
+            channel.close()
+        self.elapsed += time.perf_counter()-start
+        self.instances += 1
+
+        return ygc.result
+
+    def run_batch(self, circuits):
+
+        """
+        Runs an instance of the protocol for each of many circuits
+
+        :param circuits:        iterable    The circuits, each garbled afresh, such as a generator
+                                            that builds each one as it is needed
+        :return:                list        The outputs of each circuit
+        """
+
+        return [self.run(circuit) for circuit in circuits]
+
+    def evaluations_per_second(self):
+
+        """
+        Gets the throughput of the session
+
+        :return:                float   The number of instances run per second
+        """
+
+        return self.instances/self.elapsed if self.elapsed > 0 else 0.0
+
+    def report(self):
+
+        """
+        Builds a report of the session's instances so far
+
+        :return:                dict    The recorder's report with the number of instances and
+                                        their throughput, or None without a recorder
+        """
+
+        if self.recorder is None:
+            return None
+        report = self.recorder.report()
+        report["instances"] = self.instances
+        report["evaluations_per_second"] = self.evaluations_per_second()
+        return report
+
+    def close(self):
+
+        """
+        Closes the session's pool and node
+
+        :return:                None
+        """
+
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+        self.node.close()
+
+
+class YGC_Evaluator_Session:
+
+    """
+    Runs many instances of the evaluator's protocol over one connection. The node
+    and the base OTs are set up once, and each instance runs on a channel of its
+    own.
+    """
+
+    def __init__(self, host, port, partner_host, partner_port, prime, generator, uniform1, uniform2,
+                 kdf=KDF.DEFAULT, recorder=None, compiled=None, evaluator=None):
+
+        """
+        Connects the evaluator's side of a session
+
+        :param host:            str     The host name
+        :param port:            int     The port number
+        :param partner_host:    str     The host name of the partner
+        :param partner_port:    int     The port number of the partner
+        :param prime:           int     A prime
+        :param generator:       int     A generator for the prime
+        :param uniform1:        int     A uniform number
+        :param uniform2:        int     A uniform number
+        :param kdf:             str     The name of the KDF the circuits are garbled with
+        :param recorder:        Recorder    Records the phases and counts of every instance, or None
+        :param compiled:        Compiled_Circuit    The description of the circuit of every instance, which
+                                                    both parties share, or None for the generator to send it
+        :param evaluator:       type    The class of the evaluator's protocol, such as YGC_Vector_Evaluator,
+                                        or None for YGC_Circuit_Evaluator
+        """
+
+        self.host = host
+        self.port = port
+        self.partner_host = partner_host
+        self.partner_port = partner_port
+        self.prime = prime
+        self.generator = generator
+        self.uniform1 = uniform1
+        self.uniform2 = uniform2
+        self.kdf = kdf
+        self.compiled = compiled
+        self.evaluator = evaluator or YGC_Circuit_Evaluator
+
+        self.recorder = recorder
+        self.node = Node.Node(self.host, self.port, recorder)
+        self.node.connect([(self.partner_host, self.partner_port)])
+        self.ot = OT_Extension.IKNP_Receiver(self.node, (self.partner_host, self.partner_port), self.prime,
+                                             self.generator, self.uniform1, self.uniform2, [])
+
+        # The number of instances run and the time spent running them
+        self.instances = 0
+        self.elapsed = 0
+
+    def run(self, inputs):
+
+        """
+        Runs an instance of the protocol on the session's next channel
+
+        :param inputs:          dict    The inputs for the evaluator
+        :return:                dict    The outputs of the circuit
+        """
+
+        channel = self.node.open_channel()
+        start = time.perf_counter()
+        try:
+            ygc = self.evaluator(self.host, self.port, self.partner_host, self.partner_port, inputs, self.prime,
+                                 self.generator, self.uniform1, self.uniform2, self.kdf, node=channel, ot=self.ot,
+                                 recorder=self.recorder, compiled=self.compiled)
+        finally:
+            channel.close()
+        self.elapsed += time.perf_counter()-start
+        self.instances += 1
+
+        return ygc.result
+
+    def run_batch(self, inputs_list):
+
+        """
+        Runs an instance of the protocol for each of many inputs
+
+        :param inputs_list:     iterable    The inputs for the evaluator in each instance
+        :return:                list        The outputs of each instance
+        """
+
+        return [self.run(inputs) for inputs in inputs_list]
+
+    def evaluations_per_second(self):
+
+        """
+        Gets the throughput of the session
+
+        :return:                float   The number of instances run per second
+        """
+
+        return self.instances/self.elapsed if self.elapsed > 0 else 0.0
+
+    def report(self):
+
+        """
+        Builds a report of the session's instances so far
+
+        :return:                dict    The recorder's report with the number of instances and
+                                        their throughput, or None without a recorder
+        """
+
+        if self.recorder is None:
+            return None
+        report = self.recorder.report()
+        report["instances"] = self.instances
+        report["evaluations_per_second"] = self.evaluations_per_second()
+        return report
+
+    def close(self):
+
+        """
+        Closes the session's node
+
+        :return:                None
+        """
+
+        self.node.close()
+
+
+def adder_circuit():
+
+    """
+    Builds the topology of the adder's circuit, whose outputs are the sum bit
+    and then the carry bit
+
+    :return:                    Compiled_Circuit    The circuit
+    """
+
+    compiled = Circuit.Compiled_Circuit(8, [3], [2])
+    compiled.add_gate(Circuit.XOR_GATE, 0, 1, 3)
+    compiled.add_gate(Circuit.AND_GATE, 2, 3, 4)
+    compiled.add_gate(Circuit.AND_GATE, 0, 1, 5)
+    compiled.add_gate(Circuit.XOR_GATE, 2, 3, 6)
+    compiled.add_gate(Circuit.OR_GATE, 4, 5, 7)
+    return compiled
+
+
+def comparator_circuit():
+
+    """
+    Builds the topology of the comparator's circuit
+
+    :return:                    Compiled_Circuit    The circuit
+    """
+
+    compiled = Circuit.Compiled_Circuit(11, [4], [1])
+    compiled.add_gate(Circuit.XOR_GATE, 0, 1, 4)
+    compiled.add_gate(Circuit.INV_GATE, 4, 4, 5)
+    compiled.add_gate(Circuit.AND_GATE, 0, 4, 6)
+    compiled.add_gate(Circuit.XOR_GATE, 2, 3, 7)
+    compiled.add_gate(Circuit.AND_GATE, 5, 7, 8)
+    compiled.add_gate(Circuit.AND_GATE, 2, 8, 9)
+    compiled.add_gate(Circuit.OR_GATE, 6, 9, 10)
+    return compiled
+
+
+def garble(compiled, inputs):
+
+    """
+    Garbles a circuit afresh for the generator's inputs
+
+    :param compiled:            Compiled_Circuit    The topology of the circuit
+    :param inputs:              dict                The inputs of the generator
+    :return:                    Circuit             The circuit
+    """
+
+    return Circuit.Circuit(compiled, inputs, Wire.random_delta() if FREE_XOR else None, HALF_GATES)
+
+
+def run_session(party_num, prime, generator, uniform1, uniform2, inputs_list, compiled, generator_wires,
+                output_gates):
+
+    """
+    Runs a circuit for each of many inputs in one session, garbling it afresh for each
 
     :param party_num:           int         The party number
     :param prime:               int         The corresponding prime
     :param generator:           int         The generator for the prime
     :param uniform1:            int         A random uniform number
     :param uniform2:            int         A random uniform number
-    :param inputs:              dict        The inputs of both parties
+    :param inputs_list:         list        The inputs of both parties in each instance
+    :param compiled:            Compiled_Circuit    The topology of the circuit
+    :param generator_wires:     list        The input wires of the generator
+    :param output_gates:        list        The gate numbers of the outputs, in the order to print them
     :return:                    None
     """
 
-    inputs_copy = copy.copy(inputs)
-
     # The Circuit generator
     if party_num == 0:
-        inputs = {0: inputs[0], 2: inputs[2]}
-        wires = [Wire.Wire() for _ in range(8)]
-        gates = [Gate.Gate("000", Gate.XOR(), [wires[0], wires[1]], wires[3]),
-                 Gate.Gate("001", Gate.XOR(), [wires[2], wires[3]], wires[4], True),
-                 Gate.Gate("010", Gate.AND(), [wires[2], wires[3]], wires[5]),
-                 Gate.Gate("011", Gate.AND(), [wires[0], wires[1]], wires[6]),
-                 Gate.Gate("100", Gate.OR(), [wires[5], wires[6]], wires[7], True)]
-        circuit = Circuit.Circuit(inputs, gates, wires)
-        ygc = YGC_Circuit_Generator(HOST, START_PORT, HOST, START_PORT+PORTS_NEEDED, circuit, prime,
-                                    generator, uniform1, uniform2)
-        result = ygc.result
-        results = str(result["100"])+str(result["001"])
-
-        result = ""
-        i_keys = list(inputs_copy.keys())
-        i_keys.sort()
-        for ipt in i_keys:
-            result += str(inputs_copy[i_keys[ipt]])
-
-        result += ": "+results
-        print(result)
+        session = YGC_Generator_Session(HOST, START_PORT, HOST, START_PORT+PORTS_NEEDED, prime, generator,
+                                        uniform1, uniform2)
+        try:
+            results = session.run_batch(garble(compiled, {wire: inputs[wire] for wire in generator_wires})
+                                        for inputs in inputs_list)
+        finally:
+            session.close()
 
+        for inputs, outputs in zip(inputs_list, results):
+            print("".join(str(inputs[key]) for key in sorted(inputs.keys()))+": "+
+                  "".join(str(outputs[gate_num]) for gate_num in output_gates))
+        print(str(round(session.evaluations_per_second(), 1))+" evaluations per second")
 
+    # The Circuit evaluator, which shares the description of the circuit
     else:
-        inputs = {1: inputs[1]}
-        ygc = YGC_Circuit_Evaluator(HOST, START_PORT + PORTS_NEEDED, HOST, START_PORT, inputs,
-                                    prime, generator, uniform1, uniform2)
+        session = YGC_Evaluator_Session(HOST, START_PORT+PORTS_NEEDED, HOST, START_PORT, prime, generator,
+                                        uniform1, uniform2, compiled=compiled)
+        try:
+            session.run_batch({wire: inputs[wire] for wire in inputs.keys() if wire not in generator_wires}
+                              for inputs in inputs_list)
+        finally:
+            session.close()
 
 
-def initialize_comparator(party_num, prime, generator, uniform1, uniform2, inputs):
+def initialize_adder(party_num, prime, generator, uniform1, uniform2, inputs_list):
+
+    """
+    Initializes the protocol for the adder's circuit
+
+    :param party_num:           int         The party number
+    :param prime:               int         The corresponding prime
+    :param generator:           int         The generator for the prime
+    :param uniform1:            int         A random uniform number
+    :param uniform2:            int         A random uniform number
+    :param inputs_list:         list        The inputs of both parties in each instance
+    :return:                    None
+    """
+
+    run_session(party_num, prime, generator, uniform1, uniform2, inputs_list, adder_circuit(), [0, 2],
+                [4, 3])
+
+
+def initialize_comparator(party_num, prime, generator, uniform1, uniform2, inputs_list):
 
     """
     Initializes the protocol for the comparator's circuit
@@ -340,52 +897,30 @@ def initialize_comparator(party_num, prime, generator, uniform1, uniform2, input
     :param generator:           int         The generator for the prime
     :param uniform1:            int         A random uniform number
     :param uniform2:            int         A random uniform number
-    :param inputs:              dict        The inputs of both parties
+    :param inputs_list:         list        The inputs of both parties in each instance
     :return:                    None
     """
 
     bits = 2
+    run_session(party_num, prime, generator, uniform1, uniform2, inputs_list, comparator_circuit(),
+                [2*i for i in range(bits)], [6])
 
-    # The Circuit generator
-    if party_num == 0:
 
-        inputs_copy = copy.copy(inputs)
-
-        # The comparator
-        wires = [Wire.Wire() for _ in range(11)]
-        inputs = {2 * i: inputs[2*i] for i in range(bits)}
-
-        gates = [Gate.Gate("000", Gate.XOR(), [wires[0], wires[1]], wires[4]),
-                 Gate.Gate("001", Gate.NOT(), [wires[4]], wires[5]),
-                 Gate.Gate("010", Gate.AND(), [wires[0], wires[4]], wires[6]),
-                 Gate.Gate("011", Gate.XOR(), [wires[2], wires[3]], wires[7]),
-                 Gate.Gate("100", Gate.AND(), [wires[5], wires[7]], wires[8]),
-                 Gate.Gate("101", Gate.AND(), [wires[2], wires[8]], wires[9]),
-                 Gate.Gate("110", Gate.OR(), [wires[6], wires[9]], wires[10], True)]
-        circuit = Circuit.Circuit(inputs, gates, wires)
-        # circuit.print_circuit()
-        ygc = YGC_Circuit_Generator(HOST, START_PORT, HOST, START_PORT + PORTS_NEEDED, circuit, prime,
-                                    generator, uniform1, uniform2)
-
-        result = ""
-        i_keys = list(inputs_copy.keys())
-        i_keys.sort()
-        for ipt in i_keys:
-            result += str(inputs_copy[i_keys[ipt]])
-        try:
-            result += ": "+str(ygc.result["110"])
-        except:
-            print()
-        print(result)
+def truth_table(num_inputs):
 
-    # The Circuit evaluator
-    else:
-        # The comparator
-        inputs = {2*i+1: inputs[2*i+1] for i in range(bits)}
-        ygc = YGC_Circuit_Evaluator(HOST, START_PORT+PORTS_NEEDED, HOST, START_PORT, inputs,
-                                    prime, generator, uniform1, uniform2)
+    """
+    Lists every assignment of the inputs
 
+    :param num_inputs:          int         The number of inputs
+    :return:                    list        The inputs of each assignment
+    """
 
+    inputs_list = list()
+    for ipt in range(2**num_inputs):
+        inputs_str = bin(ipt)[2:]
+        inputs_str = ("0"*(num_inputs-len(inputs_str)))+inputs_str
+        inputs_list.append({i: int(inputs_str[i]) for i in range(num_inputs)})
+    return inputs_list
 
 
 def main():
@@ -399,44 +934,19 @@ def main():
     if uniform1 < uniform2:
         uniform1, uniform2 = uniform2, uniform1
 
-    manager = multiprocessing.Manager()
-
-    # Starts the YGC adder processes
-    print("ADDER:")
-    for ipt in range(2**3):
-
-        inputs_str = bin(ipt)[2:]
-        inputs_str = ("0"*(3-len(inputs_str)))+inputs_str
-        inputs = {i: int(inputs_str[i]) for i in range(3)}
-
+    # Runs the adder's truth table in one session, and then the comparator's
+    for title, target, num_inputs in (("ADDER:", initialize_adder, 3), ("\n\nCOMPARATOR:", initialize_comparator, 4)):
+        print(title)
         processes = list()
         for party_num in range(2):
-            processes.append(multiprocessing.Process(target=initialize_adder, args=(party_num, prime, generator, uniform1,
-                                                                                  uniform2, inputs)))
+            processes.append(multiprocessing.Process(target=target, args=(party_num, prime, generator, uniform1,
+                                                                          uniform2, truth_table(num_inputs))))
             processes[-1].start()
 
         # Joins the the processes back to the main process to terminate
         for process in processes:
             process.join()
 
-    print("\n\nCOMPARATOR:")
-    # Starts the YGC adder processes
-    for ipt in range(2**4):
-
-        inputs_str = bin(ipt)[2:]
-        inputs_str = ("0" * (4 - len(inputs_str))) + inputs_str
-        inputs = {i: int(inputs_str[i]) for i in range(4)}
-
-        processes = list()
-        for party_num in range(2):
-            processes.append(
-                multiprocessing.Process(target=initialize_comparator, args=(party_num, prime, generator, uniform1,
-                                                                       uniform2, inputs)))
-            processes[-1].start()
-
-        # Joins the the processes back to the main process to terminate
-        for process in processes:
-            process.join()
 
 if __name__ == '__main__':
     main()
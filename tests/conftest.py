@@ -0,0 +1,48 @@
+import os
+import sys
+
+# The modules of the project are at the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Node
+
+import itertools
+import threading
+
+
+# The tests' nodes listen on ports of their own, apart from the benchmark's
+HOST = "127.0.0.1"
+PORT = 15024
+
+ports = itertools.count(PORT, 2)
+
+
+def run_pair(sender, receiver):
+
+    """
+    Runs the two parties of a protocol over a pair of connected nodes in this
+    process, with the sender in a thread of its own
+
+    :param sender:              function    Runs the sender over its node and the partner's address
+    :param receiver:            function    Runs the receiver over its node and the partner's address
+    :return:                                The receiver's result
+    """
+
+    port = next(ports)
+    addrs = [(HOST, port), (HOST, port+1)]
+    nodes = [Node.Node(*addr) for addr in addrs]
+    thread = threading.Thread(target=nodes[0].connect, args=([addrs[1]],))
+    thread.start()
+    nodes[1].connect([addrs[0]])
+    thread.join()
+
+    try:
+        thread = threading.Thread(target=sender, args=(nodes[0], addrs[1]))
+        thread.start()
+        result = receiver(nodes[1], addrs[0])
+        thread.join()
+    finally:
+        for node in nodes:
+            node.close()
+
+    return result
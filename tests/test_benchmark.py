@@ -0,0 +1,27 @@
+import Benchmark
+
+import os
+import pytest
+import time
+
+
+def test_sessions_measure_correct_outputs():
+    results = Benchmark.bench_sessions({"adder": None}, [], timeout=120)
+    assert results["adder"]["correct"]
+    assert results["adder"]["evaluations_per_second"] > 0
+
+
+def test_crashed_session_fails_rather_than_hanging():
+    # Both parties crash looking up a case that does not exist
+    start = time.monotonic()
+    results = Benchmark.bench_sessions({"missing": None}, [], timeout=60)
+    assert results["missing"]["correct"] is False
+    assert "error" in results["missing"]
+    assert time.monotonic()-start < 30
+
+
+@pytest.mark.skipif((os.cpu_count() or 1) < 4, reason="Needs at least 4 CPUs")
+def test_parallel_garbling_gets_faster_with_more_processes():
+    results = Benchmark.bench_parallel_garbling([1, 4], 1 << 14)
+    for layout in results.values():
+        assert layout[4]["gates_per_second"] > 1.5*layout[1]["gates_per_second"]
@@ -0,0 +1,62 @@
+import Bristol
+import Circuit
+
+import io
+import itertools
+import pytest
+
+
+# A 2-bit circuit in Bristol Fashion whose first output is the constant 1 and whose second is an AND
+CONSTANT_OUTPUT = """2 4
+2 1 1
+1 2
+
+1 1 1 2 EQ
+2 1 0 1 3 AND
+"""
+
+# The same AND in Bristol classic, with two 1 bit inputs and one output
+CLASSIC = """1 3
+1 1 1
+
+2 1 0 1 2 AND
+"""
+
+
+def test_full_adder():
+    compiled = Bristol.parse(io.StringIO(Bristol.EXAMPLE))
+    assert compiled.input_sizes == [1, 1, 1]
+    assert compiled.output_sizes == [1, 1]
+    for a, b, carry in itertools.product((0, 1), repeat=3):
+        assert compiled.evaluate({0: a, 1: b, 2: carry}) == [(a+b+carry) & 1, (a+b+carry) >> 1]
+
+
+def test_classic_format():
+    compiled = Bristol.parse(io.StringIO(CLASSIC))
+    assert compiled.input_sizes == [1, 1]
+    assert compiled.output_sizes == [1]
+    assert [compiled.evaluate({0: a, 1: b}) for a, b in itertools.product((0, 1), repeat=2)] == \
+        [[0], [0], [0], [1]]
+
+
+def test_mand_splits_into_and_gates():
+    compiled = Bristol.parse(io.StringIO("1 6\n2 2 2\n1 2\n\n4 2 0 1 2 3 4 5 MAND\n"))
+    assert list(compiled.types) == [Circuit.AND_GATE, Circuit.AND_GATE]
+    assert compiled.evaluate({0: 1, 1: 1, 2: 1, 3: 0}) == [1, 0]
+
+
+def test_constant_output_is_an_output_gate():
+    compiled = Bristol.parse(io.StringIO(CONSTANT_OUTPUT))
+    assert compiled.output_gates() == [0, 1]
+    assert compiled.constant_outputs() == [(0, 2)]
+    assert compiled.evaluate({0: 1, 1: 0}) == [1, 0]
+
+
+def test_gate_count_is_checked():
+    with pytest.raises(ValueError):
+        Bristol.parse(io.StringIO("2 3\n1 1 1\n\n2 1 0 1 2 AND\n"))
+
+
+def test_unsupported_gate():
+    with pytest.raises(ValueError):
+        Bristol.parse(io.StringIO("1 3\n1 1 1\n\n2 1 0 1 2 NAND\n"))
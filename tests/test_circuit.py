@@ -0,0 +1,70 @@
+import Circuit
+import Wire
+
+import random
+
+import test_garbling
+
+
+def ripple_adder(bits):
+
+    """
+    Builds a ripple-carry adder of two numbers, whose outputs are the bits of
+    the sum from the lowest
+
+    :param bits:            int                 The number of bits of each number
+    :return:                Compiled_Circuit    The circuit
+    """
+
+    internal = 1+4*(bits-1)-1
+    first_output = 2*bits+internal
+    compiled = Circuit.Compiled_Circuit(first_output+bits+1, [bits, bits], [bits+1])
+    wires = iter(range(2*bits, first_output))
+
+    compiled.add_gate(Circuit.XOR_GATE, 0, bits, first_output)
+    carry = next(wires)
+    compiled.add_gate(Circuit.AND_GATE, 0, bits, carry)
+    for bit in range(1, bits):
+        half, both, carried = next(wires), next(wires), next(wires)
+        compiled.add_gate(Circuit.XOR_GATE, bit, bits+bit, half)
+        compiled.add_gate(Circuit.XOR_GATE, half, carry, first_output+bit)
+        compiled.add_gate(Circuit.AND_GATE, bit, bits+bit, both)
+        compiled.add_gate(Circuit.AND_GATE, carry, half, carried)
+        carry = first_output+bits if bit == bits-1 else next(wires)
+        compiled.add_gate(Circuit.OR_GATE, both, carried, carry)
+    return compiled
+
+
+def number_inputs(compiled, index, number):
+    return {wire: (number >> bit) & 1 for bit, wire in enumerate(compiled.input_wires(index))}
+
+
+def test_circuits_hold_many_gates_in_arrays():
+    compiled = ripple_adder(32)
+    assert len(compiled) == 5*32-3
+    assert compiled.types.itemsize == 1 and compiled.outputs.itemsize == 4
+    assert compiled.gate_counts() == {Circuit.XOR_GATE: 63, Circuit.AND_GATE: 63, Circuit.OR_GATE: 31}
+    assert list(compiled.output_wires()) == list(range(compiled.num_wires-33, compiled.num_wires))
+
+
+def test_adder_in_the_clear():
+    compiled = ripple_adder(32)
+    rng = random.Random(0)
+    for _ in range(20):
+        a, b = rng.getrandbits(32), rng.getrandbits(32)
+        outputs = compiled.evaluate({**number_inputs(compiled, 0, a), **number_inputs(compiled, 1, b)})
+        assert sum(bit << index for index, bit in enumerate(outputs)) == a+b
+
+
+def test_outputs_are_keyed_by_gate_number():
+    compiled = ripple_adder(16)
+    gate_nums = compiled.output_gates()
+    assert all(type(gate_num) is int for gate_num in gate_nums)
+    assert [compiled.outputs[gate_num] for gate_num in gate_nums] == list(compiled.output_wires())
+
+    a, b = 40000, 30000
+    generator_inputs = number_inputs(compiled, 0, a)
+    evaluator_inputs = number_inputs(compiled, 1, b)
+    outputs = test_garbling.run_circuit(compiled, generator_inputs, evaluator_inputs, Wire.random_delta(), True,
+                                        chunk_size=10)
+    assert sum(outputs[gate_num] << index for index, gate_num in enumerate(gate_nums)) == a+b
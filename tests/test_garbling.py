@@ -0,0 +1,215 @@
+import Benchmark
+import Circuit
+import Gate
+import KDF
+import Metrics
+import Wire
+import YGC
+
+import itertools
+import multiprocessing
+import os
+import pickle
+import pytest
+
+
+def run_circuit(compiled, generator_inputs, evaluator_inputs, delta=None, half_gates=False, chunk_size=None,
+                kdf=KDF.DEFAULT, pool=None, processes=None):
+
+    """
+    Garbles a circuit and evaluates the chunks that the generator would send
+
+    :return:                dict    The output of each output gate by gate number
+    """
+
+    circuit = Circuit.Circuit(compiled, generator_inputs, delta, half_gates, KDF.get(kdf))
+    inputs = {**evaluator_inputs, **circuit.inputs}
+    messages = [YGC.YGC_Circuit_Generator.aggregate(chunk, compiled, True)
+                for chunk in circuit.chunks(chunk_size, pool, processes)]
+    return Benchmark.evaluate_chunks(YGC.YGC_Circuit_Evaluator, compiled, circuit, inputs, messages, kdf)[1]
+
+
+def expected(compiled, inputs):
+    return dict(zip(compiled.output_gates(), compiled.evaluate(inputs)))
+
+
+@pytest.mark.parametrize("delta, half_gates", [(False, False), (True, False), (True, True)])
+def test_adder_truth_table(delta, half_gates):
+    compiled = YGC.adder_circuit()
+    for bits in itertools.product((0, 1), repeat=3):
+        inputs = dict(enumerate(bits))
+        outputs = run_circuit(compiled, {0: inputs[0], 2: inputs[2]}, {1: inputs[1]},
+                              Wire.random_delta() if delta else None, half_gates)
+        assert outputs == expected(compiled, inputs)
+
+
+@pytest.mark.parametrize("kdf", KDF.available())
+@pytest.mark.parametrize("half_gates", [False, True])
+def test_every_kdf_garbles(kdf, half_gates):
+    compiled = YGC.adder_circuit()
+    for bits in itertools.product((0, 1), repeat=3):
+        inputs = dict(enumerate(bits))
+        outputs = run_circuit(compiled, {0: inputs[0], 2: inputs[2]}, {1: inputs[1]}, Wire.random_delta(),
+                              half_gates, kdf=kdf)
+        assert outputs == expected(compiled, inputs)
+
+
+@pytest.mark.parametrize("mix", sorted(Benchmark.MIXES))
+def test_synthetic_circuit_in_chunks(mix):
+    compiled = Benchmark.synthetic_circuit(300, Benchmark.MIXES[mix], seed=1)
+    bits = os.urandom(2*Benchmark.INPUT_BITS)
+    generator_inputs = {wire: bits[wire] & 1 for wire in compiled.input_wires(0)}
+    evaluator_inputs = {wire: bits[wire] & 1 for wire in compiled.input_wires(1)}
+    outputs = run_circuit(compiled, generator_inputs, evaluator_inputs, Wire.random_delta(), True, chunk_size=64)
+    assert outputs == expected(compiled, {**generator_inputs, **evaluator_inputs})
+
+
+@pytest.mark.parametrize("delta, half_gates", [(False, False), (True, True)])
+def test_evaluator_hashes_a_bounded_number_of_times_per_gate(delta, half_gates):
+    compiled = Benchmark.synthetic_circuit(2000, Benchmark.MIXES["and_heavy"], seed=6)
+    generator_inputs = {wire: 1 for wire in compiled.input_wires(0)}
+    evaluator_inputs = {wire: 0 for wire in compiled.input_wires(1)}
+    circuit = Circuit.Circuit(compiled, generator_inputs, Wire.random_delta() if delta else None, half_gates)
+    messages = [YGC.YGC_Circuit_Generator.aggregate(chunk, compiled, True) for chunk in circuit.chunks(256)]
+    recorder = Metrics.Recorder()
+
+    class Evaluator(YGC.YGC_Circuit_Evaluator):
+        def load_inputs(self, num_wires, inputs):
+            self.kdf = Metrics.Counting_KDF(self.kdf, recorder)
+            super().load_inputs(num_wires, inputs)
+
+    outputs = Benchmark.evaluate_chunks(Evaluator, compiled, circuit, {**evaluator_inputs, **circuit.inputs},
+                                        messages)[1]
+    assert outputs == expected(compiled, {**generator_inputs, **evaluator_inputs})
+
+    # A row is hashed once per gate, and a half gate hashes each of its inputs
+    counts = compiled.gate_counts()
+    if half_gates:
+        assert recorder.counters["hashes"] == 2*counts[Circuit.AND_GATE]
+    else:
+        assert recorder.counters["hashes"] == len(compiled.types)-counts.get(Circuit.EQ_GATE, 0)
+
+
+def test_free_xor_gates_have_no_table():
+    compiled = YGC.adder_circuit()
+    circuit = Circuit.Circuit(compiled, {0: 0, 2: 1}, Wire.random_delta(), True)
+    for chunk in circuit.chunks():
+        for gate in chunk:
+            if compiled.types[gate.gate_num] == Circuit.XOR_GATE:
+                assert gate.garbled_table == []
+            else:
+                assert len(gate.garbled_table) == 2
+
+
+def test_delta_has_permute_bit_and_comes_from_os_urandom(monkeypatch):
+    deltas = {Wire.random_delta().value for _ in range(64)}
+    assert len(deltas) == 64
+    assert all(delta & 1 and delta < 1 << Wire.K for delta in deltas)
+
+    # The offset must not depend on the state of the random module
+    monkeypatch.setattr(os, "urandom", lambda size: b"\xaa"*size)
+    assert Wire.random_delta().value == int.from_bytes(b"\xaa"*Wire.LABEL_BYTES, "little") | 1
+
+
+def test_every_label_is_released_once():
+    compiled = Benchmark.synthetic_circuit(300, Benchmark.MIXES["and_heavy"], seed=3)
+    released = list()
+    for start in range(0, len(compiled.types), 64):
+        released += compiled.released_wires(start, min(start+64, len(compiled.types))).tolist()
+    assert sorted(released) == list(range(compiled.num_wires))
+
+
+class Recording_Pool:
+
+    """
+    Garbles the batches of each level in this process, keeping them
+    """
+
+    def __init__(self):
+        self.levels = list()
+
+    def map(self, function, batches):
+        self.levels.append(batches)
+        return [function(batch) for batch in batches]
+
+
+@pytest.mark.parametrize("delta, half_gates", [(False, False), (True, False), (True, True)])
+def test_parallel_garbling_across_spans(monkeypatch, delta, half_gates):
+    monkeypatch.setattr(Circuit, "GARBLE_SPAN", 256)
+    compiled = Benchmark.synthetic_circuit(1000, Benchmark.MIXES["and_heavy"], seed=4)
+    bits = os.urandom(2*Benchmark.INPUT_BITS)
+    generator_inputs = {wire: bits[wire] & 1 for wire in compiled.input_wires(0)}
+    evaluator_inputs = {wire: bits[wire] & 1 for wire in compiled.input_wires(1)}
+    with multiprocessing.get_context("fork").Pool(2) as pool:
+        outputs = run_circuit(compiled, generator_inputs, evaluator_inputs, Wire.random_delta() if delta else None,
+                              half_gates, 64, pool=pool, processes=2)
+    assert outputs == expected(compiled, {**generator_inputs, **evaluator_inputs})
+
+
+@pytest.mark.parametrize("delta", [False, True])
+def test_parallel_batches_follow_the_processes_and_carry_no_fresh_labels(delta):
+    compiled = Benchmark.synthetic_circuit(2000, Benchmark.MIXES["and_heavy"], seed=5)
+    circuit = Circuit.Circuit(compiled, {}, Wire.random_delta() if delta else None, delta)
+    pool = Recording_Pool()
+    for _ in circuit.chunks(64, pool, 3):
+        pass
+
+    # The whole circuit is levelized at once, and each level is split into one batch per process
+    assert len(pool.levels) < len(compiled.types)//64
+    for batches in pool.levels:
+        gates = sum(len(batch[5]) for batch in batches)
+        assert len(batches) <= 3
+        assert all(len(batch[5]) == -(-gates//3) for batch in batches[:-1])
+
+        # Only the labels that garbling derived are sent, which none are without Free-XOR
+        for batch in batches:
+            assert all(circuit.derived[wire] for wire in batch[7])
+            if not delta:
+                assert batch[7] == {}
+    assert sum(len(pickle.dumps(batch)) for batches in pool.levels for batch in batches) < 64*len(compiled.types)
+
+
+@pytest.mark.parametrize("ones", [bits for bits in itertools.product((0, 1), repeat=4) if sum(bits) % 2 == 1])
+def test_half_gates_garble_every_and_like_gate(ones):
+    truth_table = dict(zip(itertools.product((0, 1), repeat=2), ones))
+    delta = Wire.random_delta()
+    kdf = KDF.get()
+    inputs = [Wire.Wire(delta), Wire.Wire(delta)]
+    output = Wire.Wire(delta)
+    gate = Gate.Gate(7, truth_table, inputs, output, half_gates=True, kdf=kdf)
+    assert gate.half_gate
+    assert len(gate.garbled_table) == 2
+    for (a, b), value in truth_table.items():
+        label = Gate.evaluate_half_gate(inputs[0].k[a].value, inputs[1].k[b].value, gate.garbled_table, 7, kdf)
+        assert label == output.k[value].value
+
+
+def test_half_gates_need_free_xor():
+    with pytest.raises(ValueError):
+        Gate.Gate(0, Gate.AND(), [Wire.Wire(), Wire.Wire()], Wire.Wire(), half_gates=True)
+    with pytest.raises(ValueError):
+        Circuit.Circuit(YGC.adder_circuit(), {}, None, True)
+
+
+@pytest.mark.parametrize("free_xor, half_gates, rows", [(False, False, 4), (True, False, 4), (True, True, 2)])
+def test_table_rows(free_xor, half_gates, rows):
+    assert Circuit.table_rows(Circuit.AND_GATE, free_xor, half_gates) == rows
+    assert Circuit.table_rows(Circuit.OR_GATE, free_xor, half_gates) == rows
+    assert Circuit.table_rows(Circuit.XOR_GATE, free_xor, half_gates) == (0 if free_xor else 4)
+    assert Circuit.table_rows(Circuit.INV_GATE, free_xor, half_gates) == (0 if free_xor else 2)
+
+
+@pytest.mark.parametrize("delta", [False, True])
+def test_outputs_decode_from_one_bit_each(delta):
+    compiled = YGC.adder_circuit()
+    circuit = Circuit.Circuit(compiled, {}, Wire.random_delta() if delta else None, delta)
+    evaluator = YGC.YGC_Circuit_Evaluator.__new__(YGC.YGC_Circuit_Evaluator)
+    for chunk in circuit.chunks(2):
+        output_gates = [gate for gate in chunk if gate.is_output]
+        decoding_bits = YGC.YGC_Circuit_Generator.aggregate(chunk, compiled, True)[3]
+        assert decoding_bits < 1 << len(output_gates)
+
+        # The permute bit of either label of an output wire, XORed with its decoding bit, is its value
+        for value in (0, 1):
+            labels = [(gate.output.k[value].value, gate.gate_num) for gate in output_gates]
+            assert evaluator.decode(labels, decoding_bits) == {gate.gate_num: value for gate in output_gates}
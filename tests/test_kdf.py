@@ -0,0 +1,44 @@
+import KDF
+
+import os
+import pytest
+
+
+@pytest.mark.parametrize("name", KDF.available())
+@pytest.mark.parametrize("size", [16, 40, 72])
+def test_batches_match_single_rows(name, size):
+    kdf = KDF.get(name)
+    rows = [(os.urandom(32), tweak) for tweak in range(20)]
+    masks = kdf.derive_batch(rows, size)
+    assert masks == [kdf.derive(labels, tweak, size) for labels, tweak in rows]
+    assert all(mask < 1 << (8*size) for mask in masks)
+    assert kdf.derive_bytes(rows, size) == b"".join(mask.to_bytes(size, "little") for mask in masks)
+
+
+@pytest.mark.parametrize("name", KDF.available())
+def test_packed_rows_match_rows(name):
+    kdf = KDF.get(name)
+    rows = [(os.urandom(32), (tweak << 2) | 1) for tweak in range(20)]
+    labels = b"".join(labels for labels, _ in rows)
+    tweaks = b"".join(tweak.to_bytes(KDF.TWEAK_BYTES, "little") for _, tweak in rows)
+    assert kdf.derive_packed(labels, 32, tweaks, 16) == kdf.derive_bytes(rows, 16)
+
+
+@pytest.mark.parametrize("name", KDF.available())
+def test_tweaks_separate_rows(name):
+    kdf = KDF.get(name)
+    labels = os.urandom(32)
+    assert len({kdf.derive(labels, tweak, 16) for tweak in range(64)}) == 64
+
+
+def test_fixed_key_counter_is_separate_from_the_tweak():
+    if "fixed_key_aes" not in KDF.available():
+        pytest.skip("The fixed-key cipher needs the cryptography package")
+    kdf = KDF.get("fixed_key_aes")
+    labels = os.urandom(32)
+    tweak = 5
+    # The second block of a row could only collide with a row whose tweak sets the counter's byte
+    second_block = kdf.derive(labels, tweak, 32) >> (8*KDF.BLOCK_BYTES)
+    assert second_block != kdf.derive(labels, tweak, 16)
+    with pytest.raises(ValueError):
+        kdf.derive(labels, tweak ^ (1 << KDF.COUNTER_SHIFT), 16)
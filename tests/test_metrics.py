@@ -0,0 +1,83 @@
+import KDF
+import Metrics
+import YGC
+
+import os
+
+import conftest
+import test_protocol
+
+
+class Keeping_Hook(Metrics.Hook):
+
+    """
+    Keeps every measurement it receives
+    """
+
+    def __init__(self):
+        self.phases = list()
+        self.counts = list()
+
+    def phase(self, name, wall, cpu):
+        self.phases.append(name)
+
+    def count(self, name, amount):
+        self.counts.append((name, amount))
+
+
+def test_phases_and_counters_add_up():
+    hook = Keeping_Hook()
+    recorder = Metrics.Recorder([hook])
+    for _ in range(3):
+        with recorder.phase("garble"):
+            pass
+    recorder.count("gates", 10)
+    recorder.count("gates", 5)
+
+    report = recorder.report()
+    assert report["phases"]["garble"]["calls"] == 3
+    assert report["phases"]["garble"]["wall"] >= 0
+    assert report["counters"] == {"gates": 15}
+    assert hook.phases == ["garble"]*3
+    assert hook.counts == [("gates", 10), ("gates", 5)]
+
+
+def test_counting_kdf_counts_every_row():
+    recorder = Metrics.Recorder()
+    kdf = Metrics.counting_kdf(KDF.get(), recorder)
+    rows = [(os.urandom(16), tweak) for tweak in range(8)]
+    assert kdf.derive_batch(rows, 16) == KDF.get().derive_batch(rows, 16)
+    kdf.derive_bytes(rows, 16)
+    kdf.derive_packed(os.urandom(16*8), 16, bytes(KDF.TWEAK_BYTES*8), 16)
+    recorder.count("gates", 12)
+    assert recorder.report()["counters"]["hashes"] == 24
+    assert recorder.report()["hashes_per_gate"] == 2
+
+
+def test_disabled_recorder_costs_nothing():
+    assert Metrics.phase(None, "garble") is Metrics.NULL_PHASE
+    kdf = KDF.get()
+    assert Metrics.counting_kdf(kdf, None) is kdf
+
+
+def test_protocol_phases_and_bytes():
+    compiled = YGC.adder_circuit()
+    recorders = [Metrics.Recorder(), Metrics.Recorder()]
+
+    def generator(node, partner_addr):
+        node.recorder = recorders[0]
+        YGC.YGC_Circuit_Generator(None, None, *partner_addr, YGC.garble(compiled, {0: 1, 2: 1}),
+                                  test_protocol.PRIME, test_protocol.GENERATOR, 2, 1, node=node,
+                                  recorder=recorders[0])
+
+    def evaluator(node, partner_addr):
+        node.recorder = recorders[1]
+        return YGC.YGC_Circuit_Evaluator(None, None, *partner_addr, {1: 0}, test_protocol.PRIME,
+                                         test_protocol.GENERATOR, 2, 1, node=node, recorder=recorders[1]).result
+
+    conftest.run_pair(generator, evaluator)
+    generated, evaluated = [recorder.report() for recorder in recorders]
+    assert {"garble", "send"} <= set(generated["phases"])
+    assert {"evaluate", "decode"} <= set(evaluated["phases"])
+    assert generated["counters"]["gates"] == evaluated["counters"]["gates"] == len(compiled.types)
+    assert generated["counters"]["bytes_sent"] == evaluated["counters"]["bytes_received"]
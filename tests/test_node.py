@@ -0,0 +1,185 @@
+import Node
+
+import asyncio
+import pytest
+
+import conftest
+
+
+MESSAGES = [None, True, False, 0, 7, -300, 1 << 200, "wire", b"\x00\xff", [], [1, 2, 3], [1 << 64, 1 << 100],
+            [[1, 2], [], [3]], (1, "a"), {1: [2], "k": None}, [0, "mixed", [b"row"]]]
+
+
+@pytest.mark.parametrize("message", MESSAGES)
+def test_codec_round_trips(message):
+    buffer = bytearray(Node.frame(message, 3))
+    assert Node.read_frames(buffer) == [(3, message)]
+    assert buffer == bytearray()
+
+
+def test_partial_frames_wait_for_the_rest():
+    data = Node.frame([1, b"rows"])+Node.frame("next")
+    buffer = bytearray(data[:-2])
+    assert Node.read_frames(buffer) == [(0, [1, b"rows"])]
+    buffer += data[-2:]
+    assert Node.read_frames(buffer) == [(0, "next")]
+
+
+def test_label_lists_are_packed():
+    labels = [(1 << 127)+index for index in range(64)]
+    assert len(Node.frame(labels)) < Node.FRAME_HEADER.size+16+16*len(labels)
+
+
+def test_codec_rejects_what_it_cannot_encode():
+    with pytest.raises(TypeError):
+        Node.frame(object())
+    with pytest.raises(ValueError):
+        Node.read_frames(bytearray(Node.FRAME_HEADER.pack(1, 0)+b"?"))
+
+
+def test_messages_arrive_in_order():
+    def sender(node, partner_addr):
+        for message in range(3):
+            node.send_messages({partner_addr: [message, b"row"]})
+
+    def receiver(node, partner_addr):
+        return [node.get_message_at(index, timeout=10) for index in range(3)]
+
+    assert conftest.run_pair(sender, receiver) == [[0, b"row"], [1, b"row"], [2, b"row"]]
+
+
+def test_channels_keep_their_own_messages():
+    def sender(node, partner_addr):
+        first = node.open_channel()
+        second = node.open_channel()
+        second.send_messages({partner_addr: "second"})
+        node.send_messages({partner_addr: "node"})
+        first.send_messages({partner_addr: "first"})
+
+    def receiver(node, partner_addr):
+        # Channels opened in the same order on both sides have the same numbers
+        first = node.open_channel()
+        second = node.open_channel()
+        return [node.get_message_at(0, timeout=10), first.get_message_at(0, timeout=10),
+                second.get_message_at(0, timeout=10)]
+
+    assert conftest.run_pair(sender, receiver) == ["node", "first", "second"]
+
+
+def test_waiting_receiver_raises_when_the_partner_closes():
+    def sender(node, partner_addr):
+        node.send_messages({partner_addr: "only"})
+        node.close()
+
+    def receiver(node, partner_addr):
+        first = node.get_message_at(0, timeout=10)
+        with pytest.raises(ConnectionError):
+            node.get_message_at(1, timeout=10)
+        return first
+
+    assert conftest.run_pair(sender, receiver) == "only"
+
+
+def test_waiting_receiver_raises_when_the_listener_fails():
+    def sender(node, partner_addr):
+        # A frame with a tag that no message has
+        node.socket_clients[partner_addr].sendall(Node.FRAME_HEADER.pack(1, 0)+b"?")
+
+    def receiver(node, partner_addr):
+        with pytest.raises(ConnectionError) as raised:
+            node.get_message_at(0, timeout=10)
+        return raised.value.__cause__
+
+    # The receiver is told why the listener stopped
+    assert isinstance(conftest.run_pair(sender, receiver), ValueError)
+
+
+async def async_pair(high_water=None):
+
+    """
+    Connects a pair of async nodes
+
+    :return:                tuple   The nodes and their addresses
+    """
+
+    port = next(conftest.ports)
+    addrs = [(conftest.HOST, port), (conftest.HOST, port+1)]
+    nodes = [Node.Async_Node(*addrs[0]), Node.Async_Node(*addrs[1], high_water=high_water)]
+    await asyncio.gather(*[node.connect(addrs) for node in nodes])
+    return nodes, addrs
+
+
+def test_async_node_stops_reading_at_the_high_water_mark():
+    message = bytes(1 << 14)
+    count = 256
+
+    async def run():
+        (sender, receiver), addrs = await async_pair(4*len(message))
+        try:
+            sending = asyncio.create_task(send_all(sender, addrs[1]))
+            await asyncio.sleep(.5)
+
+            # The receiver holds a bounded number of messages while none are gotten
+            assert receiver.pending <= receiver.high_water+len(message)+64
+            assert len(receiver.message_list) < count
+
+            # The rest arrive as the messages are gotten
+            for index in range(count):
+                assert await receiver.get_message_at(index, release=True, timeout=10) == message
+            await sending
+            assert receiver.pending == 0
+        finally:
+            await sender.close()
+            await receiver.close()
+
+    async def send_all(node, addr):
+        for _ in range(count):
+            await node.send_messages({addr: message})
+
+    asyncio.run(run())
+
+
+def test_async_waiting_receiver_raises_when_the_partner_closes():
+    async def run():
+        (sender, receiver), addrs = await async_pair()
+        try:
+            await sender.send_messages({addrs[1]: "only"})
+            waiting = asyncio.create_task(receiver.get_message_at(1))
+            assert await receiver.get_message_at(0, timeout=10) == "only"
+            await sender.close()
+            with pytest.raises(ConnectionError):
+                await asyncio.wait_for(waiting, 10)
+        finally:
+            await receiver.close()
+
+    asyncio.run(run())
+
+
+def test_async_close_wakes_waiting_receivers():
+    async def run():
+        (sender, receiver), _ = await async_pair()
+        waiting = asyncio.create_task(receiver.get_message_at(0))
+        await asyncio.sleep(.1)
+        await receiver.close()
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(waiting, 10)
+        await sender.close()
+
+    asyncio.run(run())
+
+
+def test_async_send_file(tmp_path):
+    path = tmp_path/"rows"
+    path.write_bytes(bytes(range(256))*64)
+
+    async def run():
+        (sender, receiver), addrs = await async_pair()
+        try:
+            with open(path, "rb") as file:
+                await sender.open_channel().send_file(addrs[1], [7, "rows"], file, 100, 5000)
+            return await receiver.open_channel().get_message_at(0, timeout=10)
+        finally:
+            await sender.close()
+            await receiver.close()
+
+    assert asyncio.run(run()) == [7, "rows", (bytes(range(256))*64)[100:5100]]
@@ -0,0 +1,67 @@
+import Bristol
+import Circuit
+import Optimizer
+import Wire
+import YGC
+
+import io
+import itertools
+import random
+import pytest
+
+import test_garbling
+
+
+def random_circuit(rng, num_inputs=4, num_gates=8, num_outputs=3):
+
+    """
+    Builds a small random circuit of every gate type, whose outputs are set by its last gates
+    """
+
+    types = [Circuit.XOR_GATE, Circuit.AND_GATE, Circuit.OR_GATE, Circuit.INV_GATE, Circuit.BUF_GATE,
+             Circuit.EQ_GATE]
+    compiled = Circuit.Compiled_Circuit(num_inputs+num_gates, [num_inputs//2, num_inputs-num_inputs//2],
+                                        [num_outputs])
+    for output in range(num_inputs, num_inputs+num_gates):
+        gate_type = rng.choice(types)
+        if gate_type == Circuit.EQ_GATE:
+            compiled.add_gate(gate_type, rng.randint(0, 1), 0, output)
+        else:
+            compiled.add_gate(gate_type, rng.randrange(output), rng.randrange(output), output)
+    return compiled
+
+
+def same_outputs(compiled, optimized, num_inputs):
+    return all(compiled.evaluate(dict(enumerate(bits))) == optimized.evaluate(dict(enumerate(bits)))
+               for bits in itertools.product((0, 1), repeat=num_inputs))
+
+
+@pytest.mark.parametrize("free_xor", [False, True])
+def test_random_circuits(free_xor):
+    rng = random.Random(0)
+    for _ in range(500):
+        compiled = random_circuit(rng)
+        optimized = Optimizer.optimize(compiled, free_xor=free_xor)
+        assert same_outputs(compiled, optimized, 4)
+        assert Optimizer.non_free_gates(optimized, free_xor) <= Optimizer.non_free_gates(compiled, free_xor)
+
+
+def test_constant_inputs():
+    compiled = Bristol.parse(io.StringIO(Bristol.EXAMPLE))
+    optimized = Optimizer.optimize(compiled, {2: 0})
+    assert Optimizer.non_free_gates(optimized) == 1
+    for a, b in itertools.product((0, 1), repeat=2):
+        assert optimized.evaluate({0: a, 1: b, 2: 0}) == compiled.evaluate({0: a, 1: b, 2: 0})
+
+
+def test_constant_output_is_garbled():
+    # The AND of an input and its negation is the constant 0, which an EQ gate sets
+    compiled = Circuit.Compiled_Circuit(5, [1, 1], [2])
+    compiled.add_gate(Circuit.INV_GATE, 0, 0, 2)
+    compiled.add_gate(Circuit.AND_GATE, 0, 2, 3)
+    compiled.add_gate(Circuit.AND_GATE, 0, 1, 4)
+    optimized = Optimizer.optimize(compiled)
+    assert Optimizer.type_counts(optimized) == {"AND": 1, "EQ": 1}
+    for a, b in itertools.product((0, 1), repeat=2):
+        outputs = test_garbling.run_circuit(optimized, {0: a}, {1: b}, Wire.random_delta(), True)
+        assert [outputs[gate] for gate in optimized.output_gates()] == [0, a & b]
@@ -0,0 +1,104 @@
+import EC_OT
+import OT_Extension
+import Utilities
+
+import secrets
+import pytest
+
+import conftest
+
+
+# The group of each engine's base OTs; the Parakh OTs run in a small group, as in OT.main, to keep them quick
+GROUPS = {"parakh": (2903, 5), "ec": (Utilities.MODP_2048_PRIME, Utilities.MODP_2048_GENERATOR)}
+
+
+def run_extension(batches, base_ot=OT_Extension.BASE_OT):
+
+    """
+    Runs batches of OTs over one set of base OTs
+
+    :param batches:         list    The first secrets, second secrets and choices of each batch
+    :return:                tuple   The sender and the chosen secrets of each batch
+    """
+
+    prime, generator = GROUPS[base_ot]
+    ots = dict()
+
+    def sender(node, partner_addr):
+        ots["sender"] = OT_Extension.IKNP_Sender(node, partner_addr, prime, generator, 2, 1, [], [],
+                                                 base_ot=base_ot)
+        for secrets1, secrets2, _ in batches:
+            ots["sender"].extend(node.open_channel(), secrets1, secrets2)
+
+    def receiver(node, partner_addr):
+        ot = OT_Extension.IKNP_Receiver(node, partner_addr, prime, generator, 2, 1, [], base_ot=base_ot)
+        return [ot.extend(node.open_channel(), choices) for _, _, choices in batches]
+
+    results = conftest.run_pair(sender, receiver)
+    return ots["sender"], results
+
+
+def random_batch(m, bits=128):
+    return ([secrets.randbits(bits) for _ in range(m)], [secrets.randbits(bits) for _ in range(m)],
+            [secrets.randbits(1) for _ in range(m)])
+
+
+@pytest.mark.parametrize("base_ot", sorted(OT_Extension.BASE_OTS))
+def test_receiver_gets_chosen_secrets(base_ot):
+    batches = [random_batch(200), random_batch(37)]
+    _, results = run_extension(batches, base_ot)
+    for (secrets1, secrets2, choices), result in zip(batches, results):
+        assert result == [secret2 if choice else secret1
+                          for secret1, secret2, choice in zip(secrets1, secrets2, choices)]
+
+
+def test_sender_choice_string_is_fresh():
+    first, _ = run_extension([random_batch(8)])
+    second, _ = run_extension([random_batch(8)])
+    assert len(first.s) == OT_Extension.KAPPA
+    assert first.s != second.s
+
+
+def test_wide_secrets_are_masked():
+    # Secrets of 72 bytes, as the labels are with K=576, are wider than a SHA-512 digest
+    batches = [random_batch(16, 576)]
+    sender, results = run_extension(batches)
+    secrets1, secrets2, choices = batches[0]
+    assert results[0] == [secret2 if choice else secret1 for secret1, secret2, choice in zip(secrets1, secrets2,
+                                                                                               choices)]
+    masked = OT_Extension.mask(0, 1, 72, OT_Extension.KAPPA)
+    assert masked >> (8*64) != 0
+    assert OT_Extension.mask(0, 1, 64, OT_Extension.KAPPA) == masked & ((1 << (8*64))-1)
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_ec_ot(batch):
+    secrets1 = [secrets.randbits(128) for _ in range(16)]
+    secrets2 = [secrets.randbits(128) for _ in range(16)]
+    choices = [1+secrets.randbits(1) for _ in range(16)]
+    if not batch:
+        secrets1, secrets2, choices = secrets1[0], secrets2[0], choices[0]
+
+    def sender(node, partner_addr):
+        EC_OT.EC_OT_Sender(node, partner_addr, None, None, None, None, secrets1, secrets2).protocol()
+
+    def receiver(node, partner_addr):
+        return EC_OT.EC_OT_Receiver(node, partner_addr, None, None, None, None, choices).protocol()
+
+    result = conftest.run_pair(sender, receiver)
+    if batch:
+        assert result == [secret2 if choice == 2 else secret1
+                          for secret1, secret2, choice in zip(secrets1, secrets2, choices)]
+    else:
+        assert result == (secrets2 if choices == 2 else secrets1)
+
+
+def test_ec_ot_rejects_invalid_points():
+    def sender(node, partner_addr):
+        node.send_messages({partner_addr: bytes(32)})
+
+    def receiver(node, partner_addr):
+        with pytest.raises(ValueError):
+            EC_OT.EC_OT_Receiver(node, partner_addr, None, None, None, None, [1]).protocol()
+
+    conftest.run_pair(sender, receiver)
@@ -0,0 +1,138 @@
+import Bristol
+import Circuit
+import Metrics
+import Node
+import Utilities
+import Wire
+import YGC
+
+import io
+import itertools
+import pytest
+import threading
+
+import conftest
+import test_bristol
+import test_circuit
+
+
+PRIME = Utilities.MODP_2048_PRIME
+GENERATOR = Utilities.MODP_2048_GENERATOR
+
+
+def run_protocol(circuit, evaluator_inputs, compiled=None, evaluator=YGC.YGC_Circuit_Evaluator, chunk_size=None):
+
+    """
+    Runs both parties of the protocol over a pair of nodes in this process
+
+    :return:                tuple   The generator's and the evaluator's outputs
+    """
+
+    results = dict()
+
+    def generator(node, partner_addr):
+        results["generator"] = YGC.YGC_Circuit_Generator(None, None, *partner_addr, circuit, PRIME, GENERATOR, 2, 1,
+                                                         chunk_size=chunk_size, node=node).result
+
+    def receiver(node, partner_addr):
+        return evaluator(None, None, *partner_addr, evaluator_inputs, PRIME, GENERATOR, 2, 1, node=node,
+                         compiled=compiled).result
+
+    evaluated = conftest.run_pair(generator, receiver)
+    return results["generator"], evaluated
+
+
+@pytest.mark.parametrize("share_topology", [False, True])
+def test_adder(share_topology):
+    compiled = YGC.adder_circuit()
+    for a, b, c in itertools.product((0, 1), repeat=3):
+        outputs = run_protocol(YGC.garble(compiled, {0: a, 2: c}), {1: b},
+                               compiled if share_topology else None, chunk_size=2)
+        assert outputs[0] == outputs[1] == dict(zip(compiled.output_gates(), compiled.evaluate({0: a, 1: b, 2: c})))
+
+
+@pytest.mark.parametrize("free_xor", [False, True])
+def test_constant_output(free_xor):
+    compiled = Bristol.parse(io.StringIO(test_bristol.CONSTANT_OUTPUT))
+    delta = Wire.random_delta() if free_xor else None
+    for a, b in itertools.product((0, 1), repeat=2):
+        circuit = Circuit.Circuit(compiled, {0: a}, delta, free_xor)
+        outputs = run_protocol(circuit, {1: b})
+        assert outputs[0] == outputs[1] == {0: 1, 1: a & b}
+
+
+@pytest.mark.parametrize("k", [80, 576])
+def test_label_lengths(k):
+    compiled = YGC.adder_circuit()
+    Wire.set_k(k)
+    try:
+        outputs = run_protocol(YGC.garble(compiled, {0: 1, 2: 1}), {1: 0})
+    finally:
+        Wire.set_k(128)
+    assert outputs[0] == outputs[1] == dict(zip(compiled.output_gates(), compiled.evaluate({0: 1, 1: 0, 2: 1})))
+
+
+def test_ots_run_over_the_session_connection(monkeypatch):
+    nodes = list()
+    init = Node.Node.__init__
+
+    def counting_init(self, *args, **kwargs):
+        nodes.append(self)
+        init(self, *args, **kwargs)
+
+    # The only nodes are the two that the parties are given
+    monkeypatch.setattr(Node.Node, "__init__", counting_init)
+    compiled = YGC.adder_circuit()
+    outputs = run_protocol(YGC.garble(compiled, {0: 1, 2: 0}), {1: 1})
+    assert outputs[0] == outputs[1] == dict(zip(compiled.output_gates(), compiled.evaluate({0: 1, 1: 1, 2: 0})))
+    assert len(nodes) == 2
+
+
+def test_session_runs_many_instances_over_one_connection():
+    compiled = YGC.adder_circuit()
+    cases = list(itertools.product((0, 1), repeat=3))
+    port = next(conftest.ports)
+    results = dict()
+
+    def generator():
+        session = YGC.YGC_Generator_Session(conftest.HOST, port, conftest.HOST, port+1, PRIME, GENERATOR, 2, 1)
+        try:
+            results["generator"] = session.run_batch([YGC.garble(compiled, {0: a, 2: c}) for a, _, c in cases])
+        finally:
+            session.close()
+
+    thread = threading.Thread(target=generator)
+    thread.start()
+    session = YGC.YGC_Evaluator_Session(conftest.HOST, port+1, conftest.HOST, port, PRIME, GENERATOR, 2, 1,
+                                        recorder=Metrics.Recorder(), compiled=compiled)
+    try:
+        evaluated = session.run_batch([{1: b} for _, b, _ in cases])
+    finally:
+        session.close()
+    thread.join()
+
+    expected = [dict(zip(compiled.output_gates(), compiled.evaluate({0: a, 1: b, 2: c}))) for a, b, c in cases]
+    assert evaluated == results["generator"] == expected
+    report = session.report()
+    assert report["instances"] == len(cases)
+    assert report["evaluations_per_second"] > 0
+
+
+@pytest.mark.parametrize("free_xor", [False, True])
+def test_chunks_send_wire_indices_and_rows(free_xor):
+    compiled = test_circuit.ripple_adder(8)
+    circuit = Circuit.Circuit(compiled, {}, Wire.random_delta() if free_xor else None, free_xor)
+    for chunk in circuit.chunks(12):
+        start, stop, topology, _, layout, rows = YGC.YGC_Circuit_Generator.aggregate(chunk, compiled, True)
+
+        # The topology is the type and wire numbers of each gate, and holds no labels
+        assert topology[:4] == [list(compiled.types[start:stop]), list(compiled.inputs0[start:stop]),
+                                list(compiled.inputs1[start:stop]), list(compiled.outputs[start:stop])]
+        assert max(max(wires) for wires in topology[1:4]) < compiled.num_wires
+        assert layout == [free_xor, free_xor]
+        assert len(rows) == Wire.LABEL_BYTES*sum(Circuit.table_rows(gate_type, *layout)
+                                                 for gate_type in topology[0])
+        assert Circuit.parse_rows(rows, topology, layout) == [gate.garbled_table for gate in chunk]
+
+        # An evaluator that has the circuit is sent no topology
+        assert YGC.YGC_Circuit_Generator.aggregate(chunk, compiled, False)[2] is None
@@ -0,0 +1,107 @@
+import Circuit
+import Garbled_Store
+import YGC
+
+import itertools
+import multiprocessing
+import os
+import pytest
+import stat
+
+import conftest
+import test_protocol
+
+
+INSTANCES = 40
+
+
+def take_all(path):
+
+    """
+    Takes instances from a store through a handle of its own until none are left
+
+    :return:                list    The numbers of the instances taken
+    """
+
+    store = Garbled_Store.Garbled_Store(path, YGC.adder_circuit())
+    taken = list()
+    try:
+        while True:
+            taken.append(store.take({}).instance)
+    except ValueError:
+        pass
+    finally:
+        store.close()
+    return taken
+
+
+def test_processes_never_take_the_same_instance(tmp_path):
+    path = str(tmp_path/"adder.ygcs")
+    Garbled_Store.Garbled_Store.create(path, YGC.adder_circuit(), INSTANCES).close()
+    with multiprocessing.get_context("fork").Pool(4) as pool:
+        taken = pool.map(take_all, [path]*4)
+    instances = [instance for worker in taken for instance in worker]
+    assert sorted(instances) == list(range(INSTANCES))
+
+
+def test_protocol_from_store(tmp_path):
+    compiled = YGC.adder_circuit()
+    store = Garbled_Store.Garbled_Store.create(str(tmp_path/"adder.ygcs"), compiled, 8, half_gates=False)
+    try:
+        for a, b, c in itertools.product((0, 1), repeat=3):
+            outputs = test_protocol.run_protocol(store.take({0: a, 2: c}), {1: b})
+            assert outputs[0] == outputs[1] == dict(zip(compiled.output_gates(), compiled.evaluate({0: a, 1: b, 2: c})))
+        assert store.remaining() == 0
+    finally:
+        store.close()
+
+
+def test_evaluator_rejects_another_kdf(tmp_path):
+    store = Garbled_Store.Garbled_Store.create(str(tmp_path/"adder.ygcs"), YGC.adder_circuit(), 1, kdf="sha512")
+    circuit = store.take({0: 1, 2: 0})
+
+    def generator(node, partner_addr):
+        # The evaluator gives up before its inputs are transferred
+        with pytest.raises(ConnectionError):
+            YGC.YGC_Circuit_Generator(None, None, *partner_addr, circuit, test_protocol.PRIME,
+                                      test_protocol.GENERATOR, 2, 1, node=node)
+
+    def evaluator(node, partner_addr):
+        YGC.YGC_Circuit_Evaluator(None, None, *partner_addr, {1: 1}, test_protocol.PRIME, test_protocol.GENERATOR,
+                                  2, 1, node=node)
+
+    try:
+        with pytest.raises(ValueError, match="KDF"):
+            conftest.run_pair(generator, evaluator)
+    finally:
+        store.close()
+
+
+def test_store_is_only_readable_by_its_owner(tmp_path):
+    path = tmp_path/"adder.ygcs"
+    Garbled_Store.Garbled_Store.create(str(path), YGC.adder_circuit(), 1).close()
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_failed_garbling_leaves_no_store(tmp_path, monkeypatch):
+    path = tmp_path/"adder.ygcs"
+    Garbled_Store.Garbled_Store.create(str(path), YGC.adder_circuit(), 2).close()
+    before = path.read_bytes()
+
+    # Garbling crashes after the first instance
+    circuits = list()
+    circuit = Circuit.Circuit
+
+    def crashing(*args):
+        if circuits:
+            raise RuntimeError("Crashed while garbling")
+        circuits.append(circuit(*args))
+        return circuits[-1]
+
+    monkeypatch.setattr(Circuit, "Circuit", crashing)
+    with pytest.raises(RuntimeError):
+        Garbled_Store.Garbled_Store.create(str(path), YGC.adder_circuit(), 2)
+
+    # The old store is untouched, and no partial one is left behind
+    assert path.read_bytes() == before
+    assert os.listdir(tmp_path) == ["adder.ygcs"]
@@ -0,0 +1,52 @@
+import Utilities
+
+import secrets
+import pytest
+
+
+PRIME = Utilities.MODP_2048_PRIME
+GENERATOR = Utilities.MODP_2048_GENERATOR
+
+
+def test_fixed_base_matches_pow():
+    table = Utilities.fixed_base(GENERATOR, PRIME, PRIME-1)
+    exponents = [0, 1, PRIME-2, -5]+[secrets.randbelow(PRIME) for _ in range(8)]
+    assert table.pow_batch(exponents) == [pow(GENERATOR, exponent % (PRIME-1), PRIME) for exponent in exponents]
+
+
+def test_batch_exp_matches_pow():
+    bases = [secrets.randbelow(PRIME) for _ in range(4)]
+    exponents = [secrets.randbelow(PRIME) for _ in range(4)]
+    assert Utilities.batch_exp(bases, exponents, PRIME) == [pow(base, exponent, PRIME)
+                                                           for base, exponent in zip(bases, exponents)]
+
+
+@pytest.mark.parametrize("count", [1, 2, 5])
+@pytest.mark.parametrize("window", [1, 4, 6])
+def test_multi_exp_matches_product_of_pows(count, window):
+    bases = [secrets.randbelow(PRIME) for _ in range(count)]
+    exponents = [secrets.randbelow(PRIME)-PRIME//2 for _ in range(count)]
+    expected = 1
+    for base, exponent in zip(bases, exponents):
+        expected = expected*pow(base, exponent % (PRIME-1), PRIME) % PRIME
+    assert Utilities.multi_exp(bases, exponents, PRIME, PRIME-1, window) == expected
+
+
+def test_multi_exp_of_nothing_is_one():
+    assert Utilities.multi_exp([], [], PRIME) == 1
+    assert Utilities.multi_exp([7], [0], PRIME) == 1
+
+
+@pytest.mark.parametrize("columns, rows", [(1, 1), (3, 5), (9, 17), (128, 1), (80, 1000), (128, 4096)])
+def test_transpose(columns, rows):
+    matrix = [secrets.randbits(rows) for _ in range(columns)]
+    transposed = Utilities.transpose(matrix, rows)
+    assert len(transposed) == rows
+    for j, row in enumerate(transposed):
+        assert row == sum(((column >> j) & 1) << i for i, column in enumerate(matrix))
+    assert Utilities.transpose(transposed, columns) == matrix
+
+
+def test_transpose_of_empty_matrices():
+    assert Utilities.transpose([], 3) == [0, 0, 0]
+    assert Utilities.transpose([5], 0) == []
@@ -0,0 +1,82 @@
+import Benchmark
+import Bristol
+import Circuit
+import Vector_Evaluator
+import Wire
+import YGC
+
+import io
+import os
+import pytest
+
+import test_bristol
+import test_protocol
+
+
+pytest.importorskip("numpy")
+
+
+def evaluate(compiled, circuit, inputs, chunk_size, evaluator=Vector_Evaluator.YGC_Vector_Evaluator):
+    messages = [YGC.YGC_Circuit_Generator.aggregate(chunk, compiled, True) for chunk in circuit.chunks(chunk_size)]
+    return Benchmark.evaluate_chunks(evaluator, compiled, circuit, {**inputs, **circuit.inputs}, messages)[1]
+
+
+@pytest.mark.parametrize("free_xor", [False, True])
+def test_matches_loop_evaluator(free_xor):
+    compiled = Benchmark.synthetic_circuit(400, Benchmark.MIXES["and_heavy"], seed=2)
+    bits = os.urandom(2*Benchmark.INPUT_BITS)
+    generator_inputs = {wire: bits[wire] & 1 for wire in compiled.input_wires(0)}
+    evaluator_inputs = {wire: bits[wire] & 1 for wire in compiled.input_wires(1)}
+    circuit = Circuit.Circuit(compiled, generator_inputs, Wire.random_delta() if free_xor else None, free_xor)
+    expected = dict(zip(compiled.output_gates(), compiled.evaluate({**generator_inputs, **evaluator_inputs})))
+    assert evaluate(compiled, circuit, evaluator_inputs, 128) == expected
+    assert evaluate(compiled, circuit, evaluator_inputs, 128, YGC.YGC_Circuit_Evaluator) == expected
+
+
+def test_plans_follow_the_chunk_size():
+    compiled = Vector_Evaluator.and_circuit(160)
+    inputs = {wire: 1 for wire in compiled.input_wires(1)}
+    for chunk_size in (100, 60, 100):
+        circuit = YGC.garble(compiled, {wire: 1 for wire in compiled.input_wires(0)})
+        assert evaluate(compiled, circuit, inputs, chunk_size) == {gate: 1 for gate in range(160)}
+
+
+def test_constant_output_over_the_network():
+    compiled = Bristol.parse(io.StringIO(test_bristol.CONSTANT_OUTPUT))
+    outputs = test_protocol.run_protocol(YGC.garble(compiled, {0: 1}), {1: 1}, compiled,
+                                         Vector_Evaluator.YGC_Vector_Evaluator)
+    assert outputs[0] == outputs[1] == {0: 1, 1: 1}
+
+
+def chain_circuit(num_gates):
+
+    """
+    Builds a circuit of a chain of gates, each of which reads the output of the
+    gate before it, so that few labels are needed at once
+    """
+
+    compiled = Circuit.Compiled_Circuit(num_gates+2, [1, 1], [1])
+    compiled.add_gate(Circuit.AND_GATE, 0, 1, 2)
+    for wire in range(3, num_gates+2):
+        compiled.add_gate(Circuit.XOR_GATE if wire % 3 else Circuit.INV_GATE, wire-1, wire % 2, wire)
+    return compiled
+
+
+@pytest.mark.parametrize("evaluator_class", [Vector_Evaluator.YGC_Vector_Evaluator, YGC.YGC_Circuit_Evaluator])
+def test_labels_are_freed_after_their_last_use(evaluator_class):
+    compiled = chain_circuit(3000)
+    circuit = YGC.garble(compiled, {0: 1})
+    held = list()
+
+    class Evaluator(evaluator_class):
+        def release(self, wires):
+            held.append(len(getattr(self, "live_wires", self.labels)))
+            super().release(wires)
+            held.append(len(getattr(self, "live_wires", self.labels)))
+
+    outputs = evaluate(compiled, circuit, {1: 1}, 100, Evaluator)
+    assert outputs == dict(zip(compiled.output_gates(), compiled.evaluate({0: 1, 1: 1})))
+
+    # At most the labels of a chunk and the three it reads are held, and none once the last chunk is decoded
+    assert max(held) <= 103
+    assert held[-1] == 0
@@ -0,0 +1,38 @@
+import Wire
+
+import pytest
+
+
+def test_label_round_trips_through_bytes():
+    label = Wire.Label.random(1)
+    data = label.to_bytes()
+    assert len(data) == Wire.LABEL_BYTES
+    assert Wire.Label.from_bytes(data) == label
+    assert label.value < 1 << Wire.K
+
+
+@pytest.mark.parametrize("p", [0, 1])
+def test_permute_bit_is_the_low_bit(p):
+    label = Wire.Label.random(p)
+    assert label.p == p == label.value & 1
+
+
+def test_labels_of_a_wire_have_opposite_permute_bits():
+    for _ in range(32):
+        wire = Wire.Wire()
+        assert wire.k[0] != wire.k[1]
+        assert sorted(wire.p) == [0, 1]
+
+
+def test_free_xor_labels_differ_by_delta():
+    delta = Wire.random_delta()
+    wire = Wire.Wire(delta)
+    assert wire.k[0] ^ delta == wire.k[1]
+    assert sorted(wire.p) == [0, 1]
+
+
+@pytest.mark.parametrize("k", [Wire.MIN_K-8, 129])
+def test_security_parameter_is_checked(k):
+    with pytest.raises(ValueError):
+        Wire.set_k(k)
+    assert Wire.K == 128